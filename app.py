@@ -11,18 +11,22 @@ from datetime import datetime
 import requests
 import glob
 import random
-from generator import model_loader, lora_selector
+from generator import model_loader, model_index, lora_selector, lora_watcher, lora_dedupe
 from generator.wildcard_loader import resolve_prompt
+from generator.prompt_template import SeededPrompts
+from generator.unique_prompts import unique_prompts
+from generator.wildcard_store import WILDCARD_STORE
+from generator.wildcard_graph import template_graph
 from generator.model_loader import normalize_model_name
 from send_to_forge import send_jobs
 from utils.model_tools import load_model_preset
-from utils.llm_enhance import enhance_prompt_with_llm
+from utils.http_client import client as http_client, http_stats
+from utils.llm_enhance import enhance_prompt_with_llm, enhance_prompts_with_llm, LLM_WORKERS, LLM_CACHE
 from utils.wildcard_refresher import refresh_wildcards_claude
 from utils.model_tools import load_model_preset, sanitize_model_name
 from utils.wildcard_prompts import get_prompt_template
 from utils.wildcard_cleaner import smart_clean_wildcards
 from generator.favorite_combo_selector import load_favorite_combos, pick_random_favorite_combo
-from generator.lora_selector import extract_keywords
 from generator.update_lora_wildcards import main as update_wildcards_main
 
 
@@ -36,6 +40,12 @@ openai_api_key = config.get("api_keys", {}).get("openai")
 
 MODEL_DIR = config["paths"]["model_folder"]
 LORA_DIR = config["paths"]["lora_folder"]
+SCAN_WORKERS = config.get("scan", {}).get("workers")  # thread pool for model folders on slow drives
+WATCH_LORAS = config.get("scan", {}).get("watch_loras", True)  # keep the LORA catalog live instead of rescanning
+HASH_FILES = config.get("scan", {}).get("hashes", False)  # SHA256/AutoV2 on entries (first pass reads every file)
+COLLAPSE_DUPLICATES = config.get("scan", {}).get("collapse_duplicates", False)  # one copy per identical LORA file
+LLM_PARALLEL = config.get("llm", {}).get("parallel", LLM_WORKERS)  # concurrent enhancement requests (LM Studio slots)
+LLM_MODEL = config.get("llm", {}).get("model")  # sent to LM Studio and part of the cache key (default: the served model)
 
 FN_INDEX = 465
 SESSION_HASH = "uuhnqx1qqor"  # scrape from UI dynamically later
@@ -45,9 +55,26 @@ st.set_page_config(page_title="Orchestrator", layout="wide")
 st.title("🎼 Orchestrator")
 st.caption("Modular Prompt and LORA Batch Engine for SD Forge")
 
-# Load models and LORAs
-raw_models = model_loader.get_available_models(MODEL_DIR)
-loras = model_loader.get_available_loras(LORA_DIR)
+# Load models and LORAs (served from data/model_index.db, only changed sidecars are re-read)
+raw_models = model_index.get_indexed_models(MODEL_DIR, workers=SCAN_WORKERS, with_hashes=HASH_FILES)
+
+@st.cache_resource
+def get_lora_catalog(lora_dir):
+    # One catalog + watcher per server process; reruns read from memory
+    catalog, _ = lora_watcher.start_lora_watcher(
+        lora_dir, loras=model_index.get_indexed_loras(lora_dir, workers=SCAN_WORKERS, with_hashes=HASH_FILES)
+    )
+    return catalog
+
+if WATCH_LORAS:
+    lora_catalog = get_lora_catalog(LORA_DIR)
+    loras = lora_catalog.loras()
+else:
+    lora_catalog = None
+    loras = model_index.get_indexed_loras(LORA_DIR, workers=SCAN_WORKERS, with_hashes=HASH_FILES)
+
+if COLLAPSE_DUPLICATES:
+    loras = lora_dedupe.collapse_duplicates(loras)
 
 unique_models = {}
 for m in raw_models:
@@ -97,6 +124,15 @@ with col4:
         st.sidebar.warning("No super prompts found. Please add `.txt` files to `wildcards/super_prompts/`.")
         prompt_file = None
 
+# Missing wildcard files and reference cycles of the selected template, before anything is generated
+if prompt_file:
+    with open(os.path.join(WILDCARD_BASE, "super_prompts", prompt_file), "r", encoding="utf-8") as f:
+        template_problems = template_graph(f.read().replace("{genre}", genre), genre, prompt_file).problems()
+    if template_problems:
+        with st.sidebar.expander(f"⚠️ {len(template_problems)} wildcard problems in {prompt_file}"):
+            for problem in template_problems:
+                st.caption(problem)
+
 reroll_prompt = st.sidebar.button("🎲 Create New Prompt", key="reroll_prompt", use_container_width=True)
 
 st.sidebar.markdown("")  # blank space
@@ -134,7 +170,7 @@ st.sidebar.markdown("---")
 
 selection_mode = st.sidebar.radio(
     "🎛️ Selection Mode",
-    ["✨ Favourites", "✍️ Keyword Selection", "🧪 Discovery", "🧾 Prompt LORAs"],
+    ["✨ Favourites", "✍️ Keyword Selection", "🔮 Semantic Selection", "🧪 Discovery", "🧾 Prompt LORAs"],
     index=1,  # default to Keyword
     horizontal=True,
 )
@@ -142,11 +178,13 @@ st.sidebar.markdown("**How it works:**")
 st.sidebar.caption("""
 - ✨ Favourites: Picks from curated combos.
 - ✍️ Keyword: Matches tags from prompt.
+- 🔮 Semantic: Finds LORAs with similar tags, descriptions and example prompts.
 - 🧪 Discovery: Prioritizes underused LORAs.
 """)
 
 use_favs = selection_mode == "✨ Favourites"
-use_smart_matching = selection_mode == "✍️ Keyword Selection"
+use_smart_matching = selection_mode in ("✍️ Keyword Selection", "🔮 Semantic Selection")
+match_mode = "semantic" if selection_mode == "🔮 Semantic Selection" else "keywords"
 use_discovery = selection_mode == "🧪 Discovery"
 use_prompt_loras = selection_mode == "🧾 Prompt LORAs"
 
@@ -167,6 +205,7 @@ if st.sidebar.button("🔁 Refresh with LLM", use_container_width=True):
         wildcard_dir = "wildcards"
 
         added, err = refresh_wildcards_claude(claude_api_key, refresh_genre, refresh_category, wildcard_dir)
+        WILDCARD_STORE.invalidate()
         if err:
             st.error(err)
         elif added:
@@ -176,6 +215,23 @@ if st.sidebar.button("🔁 Refresh with LLM", use_container_width=True):
         else:
             st.info("No new entries added — Claude returned all known items.")
 
+wildcard_stats = WILDCARD_STORE.stats()
+st.sidebar.caption(
+    f"🗃️ Wildcard cache: {wildcard_stats['files']} files, {wildcard_stats['hits']} hits / "
+    f"{wildcard_stats['misses']} reads ({wildcard_stats['hit_rate']:.0%} from memory)"
+)
+llm_cache_stats = LLM_CACHE.stats()
+st.sidebar.caption(
+    f"💬 LLM cache: {llm_cache_stats['keys']} prompts ({llm_cache_stats['entries']} variants), "
+    f"{llm_cache_stats['hits']} hits / {llm_cache_stats['misses']} calls ({llm_cache_stats['hit_rate']:.0%}), "
+    f"~{llm_cache_stats['saved_seconds']:.0f}s of LLM time saved"
+)
+for service, service_stats in http_stats().items():
+    st.sidebar.caption(
+        f"🌐 {service}: {service_stats['requests']} requests, {service_stats['errors']} errors, "
+        f"avg {service_stats['avg_ms']:.0f} ms (max {service_stats['max_ms']:.0f} ms)"
+    )
+
 st.sidebar.markdown("### 🔄 LORA Wildcard Sync")
 if st.sidebar.button("🔄 Update LORA Wildcards", use_container_width=True):
     try:
@@ -240,6 +296,7 @@ if st.session_state.get("ready_to_save") and "cleaned_entries" in st.session_sta
             with open(clean_file, "w", encoding="utf-8") as f:
                 for entry in st.session_state["cleaned_entries"]:
                     f.write(entry + "\n")
+            WILDCARD_STORE.invalidate(clean_file)
             st.success("✅ Wildcard file updated successfully.")
             with st.expander("📂 Updated File Contents"):
                 st.text("\n".join(st.session_state["cleaned_entries"]))
@@ -272,7 +329,7 @@ if reroll_prompt and prompt_file:
     raw_prompt = resolve_prompt(base_prompt, genre, resolve_loras=use_prompt_loras)
 
     if use_gpt:
-        enhanced_prompt = enhance_prompt_with_llm(raw_prompt, genre)
+        enhanced_prompt = enhance_prompt_with_llm(raw_prompt, genre, model=LLM_MODEL)
     else:
         enhanced_prompt = raw_prompt
 
@@ -290,7 +347,24 @@ elif "enhanced_prompt" in st.session_state:
     enhanced_prompt = st.session_state.get("enhanced_prompt", "")
     resolved_prompt = enhanced_prompt
 
-categorized_loras = lora_selector.categorize_loras(loras)
+if lora_catalog and not COLLAPSE_DUPLICATES:
+    categorized_loras = lora_catalog.categorized()
+else:
+    categorized_loras = lora_selector.categorize_loras(loras)
+
+@st.cache_resource
+def get_semantic_index(_loras, key):
+    # Keyed on the catalog/index version and lora_tags.json's mtime, so a rerun doesn't restat the
+    # library; load_or_build checks the saved index's full signature only when the key changes
+    from generator import semantic_index
+    return semantic_index.load_or_build(_loras)
+
+if match_mode == "semantic":
+    from generator.semantic_index import library_key
+    library_version = lora_catalog.version if lora_catalog else model_index.index_version(LORA_DIR)
+    lora_semantic_index = get_semantic_index(loras, library_key(library_version))
+else:
+    lora_semantic_index = None
 
 
 # Model configuration
@@ -316,6 +390,7 @@ with colA:
     width, height = res_options[selected_res]
     steps = st.slider("Steps", 10, 100, model_defaults.get("steps", 30))
     batch_size = st.slider("Total Jobs", min_value=1, max_value=50, value=config["defaults"].get("batch_size", 1))
+    unique_only = st.checkbox("🧬 Unique prompts", value=False, help="No two jobs in a batch repeat the same wildcard choices")
     # Helper for debugging model preset loading
     def sanitize_model_name(name: str) -> str:
         return name.replace("/", "_").replace("\\", "_")
@@ -355,7 +430,7 @@ if reroll_prompt or "initial_lora_pick" not in st.session_state:
         picked = pick_random_favorite_combo(
             favorite_combos,
             genre=genre,
-            prompt_keywords=extract_keywords(resolved_prompt)
+            prompt=resolved_prompt
         )
         selected_loras = picked["loras"]
         lora_debug_log = [
@@ -370,7 +445,7 @@ if reroll_prompt or "initial_lora_pick" not in st.session_state:
     elif use_smart_matching:
         selected_loras, lora_debug_log = lora_selector.select_loras_for_prompt(
             categorized_loras, model_base, resolved_prompt,
-            use_smart_matching, genre=genre
+            use_smart_matching, genre=genre, match_mode=match_mode, semantic_index=lora_semantic_index
         )
 
     elif use_discovery:
@@ -456,10 +531,16 @@ with st.sidebar.expander("🧠 LORA Selection Debug Info"):
     else:
         st.write("No debug info available.")
 
+    # Full sidecar metadata is only read from disk when asked for
+    if selected_loras and st.checkbox("Show sidecar metadata", key="show_lora_metadata"):
+        for l in selected_loras:
+            st.markdown(f"**{l['name']}**")
+            st.json(l.get("metadata") or {})
+
 lora_roots = sorted(set(
     l["name"].split("/")[0]
     for l in loras
-    if isinstance(l, dict) and "name" in l and "/" in l["name"]
+    if isinstance(l, (dict, model_loader.LoraRecord)) and "name" in l and "/" in l["name"]
 ))
 
 selected_root = st.sidebar.selectbox("Filter by Folder", ["All"] + lora_roots)
@@ -471,7 +552,7 @@ with st.sidebar.expander("📚 LORA List", expanded=False):
     for lora in loras:
         if selected_root != "All" and not lora["name"].startswith(selected_root + "/"):
             continue
-        if not isinstance(lora, dict):
+        if not isinstance(lora, (dict, model_loader.LoraRecord)):
             continue
         if not lora.get("base_model") or not lora["base_model"].startswith(model_base):
             continue
@@ -533,20 +614,55 @@ with col1:
 
         
         with st.spinner(f"🧠 Enhancing {batch_size} prompts..."):
+            # Load every wildcard file the template can reach now, and say what would come out as [MISSING:...]
+            graph = template_graph(base_prompt, genre, prompt_file)
+            for problem in graph.problems():
+                st.warning(f"⚠️ {problem}")
+            graph.prefetch()
+            # Parsed once for the whole batch; prompt i can be regenerated from sources[i] alone
+            template = SeededPrompts(base_prompt, genre, seed=random.getrandbits(32))
+            lookup = template.template.lookup()
+            raw_prompts = []
+            sources = []
+            if unique_only:
+                needed = batch_size - (1 if last_prompt else 0)
+                unique_batch, space_info = unique_prompts(template, needed, resolve_loras=use_prompt_loras)
+                st.caption(f"🧬 {space_info['space'] if space_info['space'] is not None else 'Unbounded'} possible prompts "
+                           f"({space_info['mode']}, {space_info['rejected']} repeats skipped)")
+                if len(unique_batch) < needed:
+                    st.warning(f"⚠️ Only {len(unique_batch)} unique prompts available from this template.")
             for i in range(batch_size):
                 if i == 0 and last_prompt:
-                    enhanced_prompt = last_prompt
+                    sources.append(None)
+                    continue
+                if unique_only:
+                    if not unique_batch:
+                        break
+                    raw_prompt, address = unique_batch.pop(0)
                 else:
-                    raw_prompt = resolve_prompt(base_prompt, genre, resolve_loras=use_prompt_loras)
-                    enhanced_prompt = enhance_prompt_with_llm(raw_prompt, genre) if use_gpt else raw_prompt
-
-                resolved = enhanced_prompt
+                    raw_prompt = template.prompt(i, resolve_loras=use_prompt_loras, lookup=lookup)
+                    address = {"index": i}
+                source = {k: v for k, v in template.source(i).items() if k != "index"}
+                sources.append({**source, **address, "template": prompt_file, "llm_enhanced": bool(use_gpt)})
+                raw_prompts.append(raw_prompt)
+
+            # Enhance the whole batch concurrently; order is kept and failures fall back to the raw prompt
+            if use_gpt:
+                enhanced_prompts, enhance_warnings = enhance_prompts_with_llm(raw_prompts, genre, max_workers=LLM_PARALLEL,
+                                                                            model=LLM_MODEL)
+                for warning in enhance_warnings:
+                    st.warning(warning)
+            else:
+                enhanced_prompts = raw_prompts
+            resolved_prompts = ([last_prompt] if last_prompt else []) + enhanced_prompts
 
-                # Get new LORAs
-                loras_this_round, _ = lora_selector.select_loras_for_prompt(
-                    categorized_loras, model_base, resolved, use_smart_matching, genre=genre
-                )
+            # Get new LORAs for the whole batch at once
+            batch_selections = lora_selector.select_loras_for_prompts(
+                categorized_loras, model_base, resolved_prompts, use_smart_matching, genre=genre,
+                match_mode=match_mode, semantic_index=lora_semantic_index
+            )
 
+            for i, (resolved, (loras_this_round, _)) in enumerate(zip(resolved_prompts, batch_selections)):
                 # Build LORA string
                 lora_injections = []
                 for lora in loras_this_round:
@@ -593,7 +709,8 @@ with col1:
                 payload = build_forge_payload(final_prompt, ui_config)
 
                 batch_payload.append({
-                    "payload": payload
+                    "payload": payload,
+                    "source": sources[i],
                 })
          # Save to file
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -758,8 +875,8 @@ with col2:
                 "event_id": event_id
             }
 
-            res = requests.post(
-                "http://127.0.0.1:7860/cancel",
+            res = http_client("forge").post(
+                "/cancel",
                 json=cancel_payload,
                 headers={"Content-Type": "application/json"}
             )
@@ -0,0 +1,113 @@
+# Benchmark: scoring a batch of prompts against every category pool, one prompt at a time
+# (score_lora_relevance / TagIndex per pool, as select_loras_for_prompt does) vs one sparse matrix
+# product for the whole batch (LoraTagMatrix.top_k_per_category). Also checks the top-k lists agree.
+# Uses the real lora_tags.json; prompts are random mixes of tag words and filler.
+# Usage: python benchmarks/bench_lora_matrix.py [--sizes 50 500 5000] [--loras-per-category 0]
+
+import os
+import sys
+import time
+import random
+import argparse
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from generator.lora_selector import (
+    TAGS, CONFIG, extract_keywords, score_lora_relevance, get_tag_index, get_tag_matrix,
+)
+
+FILLER = ("a lone figure standing in the rain at night, neon reflections on wet streets, "
+          "oil painting of an old castle on a hill, portrait with dramatic lighting").split()
+
+
+def build_library(loras_per_category):
+    """categorized_loras-style pools from the tag keys (padded with untagged LORAs if asked)."""
+    folders = list(CONFIG["categories"].items())
+    categorized = defaultdict(list)
+    for i, key in enumerate(TAGS):
+        folder, category = folders[i % len(folders)]
+        categorized[("flux", category)].append({"name": key.replace("\\", "/"), "weight": 1.0})
+    for folder, category in folders:
+        pool = categorized[("flux", category)]
+        for i in range(max(0, loras_per_category - len(pool))):
+            pool.append({"name": f"Flux/{folder}/untagged_{i}", "weight": 1.0})
+    return categorized
+
+
+def build_prompts(n, rng):
+    vocab = sorted({
+        word
+        for entry in TAGS.values() if isinstance(entry, dict)
+        for group in ("genre", "style", "subject", "tone")
+        for tag in entry.get(group, [])
+        for word in str(tag).lower().split()
+    }) or FILLER
+    return [" ".join(rng.sample(vocab, min(8, len(vocab))) + rng.sample(FILLER, 10)) for _ in range(n)]
+
+
+def top5(scored):
+    scored.sort(key=lambda x: -x[1])
+    return [(l["name"], s, m) for l, s, m in scored if s > 0][:5]
+
+
+def per_prompt(categorized, prompts, scorer):
+    results = []
+    for prompt in prompts:
+        keywords = extract_keywords(prompt)
+        ranked = {}
+        for (model, category), pool in categorized.items():
+            if model != "flux":
+                continue
+            if scorer == "legacy":
+                best = top5([(l, *score_lora_relevance(l, keywords)) for l in pool])
+            else:
+                best = top5(get_tag_index().score_pool(pool, keywords))
+            if best:
+                ranked[category] = best
+        results.append(ranked)
+    return results
+
+
+def batched(categorized, prompts):
+    keyword_sets = [extract_keywords(p) for p in prompts]
+    results = get_tag_matrix().top_k_per_category(keyword_sets, categorized, "flux")
+    return [
+        {cat: [(l["name"], s, m) for l, s, m in best] for cat, best in ranked.items()}
+        for ranked in results
+    ]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--loras-per-category", type=int, default=0)
+    args = parser.parse_args()
+
+    categorized = build_library(args.loras_per_category)
+    n_loras = sum(len(p) for p in categorized.values())
+    rng = random.Random(42)
+
+    start = time.perf_counter()
+    matrix = get_tag_matrix()
+    print(f"[🧮] {n_loras} LORAs in {len(categorized)} pools, matrix {len(matrix.keys)} x {len(matrix.tokens)} tokens "
+          f"built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for n in args.sizes:
+        prompts = build_prompts(n, rng)
+        t_legacy, legacy = timed(per_prompt, categorized, prompts, "legacy")
+        t_index, indexed = timed(per_prompt, categorized, prompts, "index")
+        t_matrix, matrix_results = timed(batched, categorized, prompts)
+
+        same = legacy == indexed == matrix_results
+        print(f"{n:>6} prompts: legacy {t_legacy * 1000:8.1f} ms | TagIndex {t_index * 1000:8.1f} ms | "
+              f"matrix {t_matrix * 1000:8.1f} ms ({t_legacy / t_matrix:.1f}x)  identical={same}")
+
+
+if __name__ == "__main__":
+    main()
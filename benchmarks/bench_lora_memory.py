@@ -0,0 +1,123 @@
+# Benchmark: resident memory of the LORA catalog with full dict entries vs compact LoraRecords.
+# Builds a synthetic library with civitai-style sidecars (image lists, HTML descriptions) and loads it
+# once per mode in a fresh subprocess, reporting RSS and traced Python allocations for the loaded list.
+# Usage: python benchmarks/bench_lora_memory.py [--loras 1000] [--lora-dir PATH]
+
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from generator.model_loader import get_available_loras
+
+FOLDERS = ["Artist Styles", "General Styles", "Detailers", "Characters", "Textures & Looks"]
+
+
+def build_synthetic_library(root, n_loras):
+    rng = random.Random(7)
+    for i in range(n_loras):
+        folder = os.path.join(root, rng.choice(["Flux", "SDXL"]), rng.choice(FOLDERS))
+        os.makedirs(folder, exist_ok=True)
+        stem = os.path.join(folder, f"lora_{i:04d}")
+
+        with open(stem + ".safetensors", "wb") as f:
+            f.write(b"\0" * 64)
+
+        with open(stem + ".json", "w", encoding="utf-8") as f:
+            json.dump({
+                "activation text": f"lora_{i} style",
+                "preferred weight": 0.8,
+                "sd version": "Flux",
+                "notes": "trained on " + "assorted imagery " * 20,
+            }, f)
+
+        with open(stem + ".info", "w", encoding="utf-8") as f:
+            json.dump({
+                "model": {"baseModel": "Flux.1 D", "name": f"LORA {i}"},
+                "description": "<p>" + "<b>A detailed</b> style LORA. " * 60 + "</p>",
+                "trainedWords": [f"lora_{i} style", "masterpiece"],
+                "images": [
+                    {
+                        "url": f"https://image.civitai.com/{i}/{n}.jpeg",
+                        "width": 832, "height": 1216, "nsfw": "None",
+                        "meta": {"prompt": "a lone warrior in ornate armor, " * 6, "seed": n, "steps": 30},
+                    }
+                    for n in range(rng.randint(10, 40))
+                ],
+            }, f)
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss // 1024
+    except ImportError:
+        return None
+
+
+def measure(lora_dir, compact):
+    before = rss_kb()
+    tracemalloc.start()
+    loras = get_available_loras(lora_dir, compact=compact)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    after = rss_kb()
+    print(json.dumps({"count": len(loras), "traced_kb": traced // 1024,
+                      "rss_before_kb": before, "rss_after_kb": after}))
+
+
+def run_mode(lora_dir, compact):
+    out = subprocess.run(
+        [sys.executable, __file__, "--measure", lora_dir] + (["--compact"] if compact else []),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loras", type=int, default=1000)
+    parser.add_argument("--lora-dir", help="measure an existing LORA folder instead of a synthetic one")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--compact", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.compact)
+        return
+
+    tmp = None
+    lora_dir = args.lora_dir
+    if not lora_dir:
+        tmp = tempfile.mkdtemp(prefix="lora_mem_")
+        lora_dir = tmp
+        print(f"Building synthetic library with {args.loras} LORAs in {tmp}...")
+        build_synthetic_library(tmp, args.loras)
+
+    try:
+        for label, compact in (("dict entries (full metadata)", False), ("LoraRecord (lazy metadata)", True)):
+            r = run_mode(lora_dir, compact)
+            rss = ""
+            if r["rss_before_kb"] is not None:
+                rss = f"RSS {r['rss_before_kb'] / 1024:6.1f} → {r['rss_after_kb'] / 1024:6.1f} MB"
+            print(f"{label:<30} {r['count']} LORAs  traced {r['traced_kb'] / 1024:7.2f} MB  {rss}")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Benchmark: category sampling in select_loras_for_prompt on sparse libraries.
+# Compares the old redraw-until-it-fits loop (weighted_choice + `continue` on empty categories,
+# repeat characters and duplicate picks; reproduced here with a draw cap since it can spin forever)
+# against the alias-table sampler that drops empty/used-up categories, plus raw draw throughput.
+# Usage: python benchmarks/bench_lora_sampler.py [--calls 2000] [--cap 100000]
+
+import os
+import sys
+import time
+import random
+import argparse
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from generator.lora_selector import CONFIG, select_loras_for_prompt, selection_context, weighted_choice
+from generator.alias_sampler import AliasTable
+
+LIBRARIES = {
+    # Pony with one detailer and one character LORA: the old loop can never fill 3+ slots
+    "pony: 1 detailer + 1 character": {"detailer": 1, "characters": 1},
+    # A couple of tiny, rarely-drawn pools: the old loop terminates, but only after many redraws
+    "pony: 1 detailer, 2 nsfw, 1 people": {"detailer": 1, "nsfw": 2, "people": 1},
+    "flux: full library (200 per category)": {
+        "detailer": 200, "artist": 200, "general": 200, "people": 200, "fx": 200, "characters": 200, "nsfw": 200,
+    },
+}
+
+
+def build_library(model, sizes):
+    categorized = defaultdict(list)
+    for category, n in sizes.items():
+        for i in range(n):
+            categorized[(model, category)].append({"name": f"{model}/{category}/lora_{i}", "weight": 1.0})
+    return categorized
+
+
+def legacy_draws(categorized, base_model, genre, rng, cap):
+    """Category draws the old loop made for one prompt (no smart matching), stopped at `cap`."""
+    ctx = selection_context(genre)
+    total = rng.choices(CONFIG["preferred_lora_count"], weights=CONFIG["preferred_lora_weights"])[0]
+    selected = set()
+    if categorized.get((base_model, "detailer")):
+        selected.add(rng.choice(categorized[(base_model, "detailer")])["name"])
+        total -= 1
+
+    draws = 0
+    character_used = False
+    while total > 0:
+        if draws >= cap:
+            return draws, False
+        draws += 1
+        category = weighted_choice(ctx["weighted_categories"], rng)
+        if category == "characters" and character_used:
+            continue
+        pool = categorized.get((base_model, category), [])
+        if not pool:
+            continue
+        candidate = rng.choice(pool)
+        if candidate["name"] in selected:
+            continue
+        selected.add(candidate["name"])
+        total -= 1
+        if category == "characters":
+            character_used = True
+    return draws, True
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--cap", type=int, default=100000, help="draw cap for the old loop")
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    choices = selection_context(None)["weighted_categories"]
+    table = AliasTable([c for c, _ in choices], [w for _, w in choices])
+    n = 200000
+    start = time.perf_counter()
+    for _ in range(n):
+        weighted_choice(choices, rng)
+    t_linear = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        table.draw(rng)
+    t_alias = time.perf_counter() - start
+    print(f"[🎲] {n} category draws: weighted_choice {t_linear * 1000:.0f} ms | alias table {t_alias * 1000:.0f} ms")
+
+    for label, sizes in LIBRARIES.items():
+        model = label.split(":")[0]
+        categorized = build_library(model, sizes)
+
+        draws, stuck = [], 0
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            d, finished = legacy_draws(categorized, model, "anime", rng, args.cap)
+            draws.append(d)
+            stuck += not finished
+        t_legacy = time.perf_counter() - start
+
+        latencies, picked = [], 0
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            selected, _ = select_loras_for_prompt(categorized, model, genre="anime", rng=rng)
+            latencies.append(time.perf_counter() - start)
+            picked += len(selected)
+
+        print(f"\n{label}")
+        print(f"  old loop : {t_legacy / args.calls * 1e6:9.1f} µs/prompt, draws p50 {percentile(draws, 0.5)} "
+              f"max {max(draws)}, {stuck}/{args.calls} hit the {args.cap}-draw cap (would never finish)")
+        print(f"  sampler  : p50 {percentile(latencies, 0.5) * 1e6:.1f} µs, p99 {percentile(latencies, 0.99) * 1e6:.1f} µs, "
+              f"max {max(latencies) * 1e6:.1f} µs, {picked / args.calls:.2f} LORAs/prompt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Benchmark: serial vs parallel LORA folder scanning (model_loader.get_available_loras).
+# Builds a synthetic LORA tree (safetensors + .json + .info sidecars) in a temp folder and times each scan mode.
+# Usage: python benchmarks/bench_model_scan.py [--loras 4000] [--workers 8] [--process-workers 2] [--lora-dir PATH]
+# Pass --lora-dir to benchmark against a real library (e.g. the Forge folder on the external drive) instead.
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from generator.model_loader import get_available_loras
+
+MODELS = ["Flux", "SDXL", "Pony"]
+FOLDERS = ["Artist Styles", "General Styles", "Detailers", "Characters", "People Styles", "Textures & Looks"]
+
+
+def build_synthetic_tree(root, n_loras, large_every=50):
+    rng = random.Random(42)
+    for i in range(n_loras):
+        folder = os.path.join(root, rng.choice(MODELS), rng.choice(FOLDERS))
+        os.makedirs(folder, exist_ok=True)
+        stem = os.path.join(folder, f"lora_{i:05d}")
+
+        with open(stem + ".safetensors", "wb") as f:
+            f.write(b"\0" * 512)
+
+        with open(stem + ".json", "w", encoding="utf-8") as f:
+            json.dump({"activation text": f"lora_{i}", "preferred weight": 0.7, "sd version": "SDXL"}, f)
+
+        # civitai-style dump; every `large_every`-th one is multi-MB like the real ones
+        images = 2000 if i % large_every == 0 else 20
+        with open(stem + ".info", "w", encoding="utf-8") as f:
+            json.dump({
+                "model": {"baseModel": "SDXL 1.0"},
+                "description": "<p>" + "lorem ipsum " * 200 + "</p>",
+                "images": [{"url": f"https://example/{i}/{n}.png", "meta": {"prompt": "a warrior " * 40}}
+                           for n in range(images)],
+            }, f)
+
+
+def timed(label, fn, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<40} {best * 1000:9.1f} ms  ({len(result)} entries)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loras", type=int, default=4000, help="synthetic LORAs (x3 files each)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--process-workers", type=int, default=2)
+    parser.add_argument("--lora-dir", help="scan an existing folder instead of a synthetic one")
+    args = parser.parse_args()
+
+    tmp = None
+    lora_dir = args.lora_dir
+    if not lora_dir:
+        tmp = tempfile.mkdtemp(prefix="lora_bench_")
+        lora_dir = tmp
+        print(f"Building synthetic tree with {args.loras} LORAs ({args.loras * 3} files) in {tmp}...")
+        build_synthetic_tree(tmp, args.loras)
+
+    try:
+        serial = timed("serial", lambda: get_available_loras(lora_dir))
+        threaded = timed(f"threads={args.workers}", lambda: get_available_loras(lora_dir, workers=args.workers))
+        mixed = timed(
+            f"threads={args.workers} + processes={args.process_workers}",
+            lambda: get_available_loras(lora_dir, workers=args.workers, process_workers=args.process_workers),
+            repeat=1,
+        )
+        assert serial == threaded == mixed, "parallel scan returned different entries"
+        print("✅ Parallel results identical to serial scan.")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
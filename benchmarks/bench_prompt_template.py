@@ -0,0 +1,80 @@
+# Benchmark: generating many prompts from one super prompt.
+# Compares resolve_prompt (regex passes over the template and every chosen line, per prompt)
+# against a PromptTemplate compiled once, on a synthetic wildcard tree in a temp folder, and
+# checks both produce identical prompts for the same seeds.
+# Usage: python benchmarks/bench_prompt_template.py [--prompts 5000] [--lines 200] [--plain]
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from generator.wildcard_loader import resolve_prompt
+from generator.wildcard_store import WildcardStore
+from generator.prompt_template import PromptTemplate
+
+TEMPLATE = (
+    "{A|An epic|A moody} {portrait|full body shot|close-up} of ^^hero^^, "
+    "wearing ^^outfit^^, 2$$^^setting^^, {dawn|dusk|night} lighting, "
+    "^^mood^^, {oil painting|photograph|digital art}, highly detailed"
+)
+
+FILES = {
+    "fantasy/hero": "{elven|dwarven|human} {ranger|knight|mage} {#} holding ^^weapon^^",
+    "fantasy/weapon": "{rusted|gleaming} {sword|axe|staff} {#}",
+    "fantasy/outfit": "{leather|plate|silk} {armor|robes} with ^^color^^ trim {#}",
+    "common/setting": "{ancient|ruined|misty} {forest|castle|harbor} {#}",
+    "common/color": "{crimson|azure|golden} {#}",
+    "common/mood": "{serene|ominous|triumphant} atmosphere {#}",
+}
+
+
+def build_tree(root, lines, plain=False):
+    for name, pattern in FILES.items():
+        if plain:  # most real wildcard files: plain phrases, no pipes
+            pattern = re.sub(r"\{([^{}|]+)\|[^{}]*\}", r"\1", pattern)
+        path = os.path.join(root, name + ".txt")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(lines):
+                f.write(pattern.replace("{#}", str(i)) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prompts", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=200, help="lines per wildcard file")
+    parser.add_argument("--plain", action="store_true", help="wildcard lines without {a|b} pipes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        build_tree(root, args.lines, args.plain)
+        store = WildcardStore(root, check_interval=60.0)
+        store.lookup("hero", "fantasy")  # both runs start with a warm file cache
+
+        rng = random.Random(1)
+        start = time.perf_counter()
+        legacy = [resolve_prompt(TEMPLATE, "fantasy", rng=rng, store=store) for _ in range(args.prompts)]
+        t_legacy = time.perf_counter() - start
+
+        rng = random.Random(1)
+        start = time.perf_counter()
+        template = PromptTemplate(TEMPLATE, "fantasy", store=store)
+        compiled = template.generate_many(args.prompts, rng=rng)
+        t_compiled = time.perf_counter() - start
+
+    print(f"[📜] {args.prompts} prompts, {len(FILES)} wildcard files x {args.lines} lines"
+          f"{' (plain lines)' if args.plain else ''}")
+    print(f"  resolve_prompt : {t_legacy * 1000:8.1f} ms ({t_legacy / args.prompts * 1e6:.1f} µs/prompt)")
+    print(f"  PromptTemplate : {t_compiled * 1000:8.1f} ms ({t_compiled / args.prompts * 1e6:.1f} µs/prompt), "
+          f"{t_legacy / t_compiled:.1f}x")
+    print(f"  identical output: {'✅' if legacy == compiled else '❌'}")
+    print(f"  example: {compiled[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Benchmark: wildcard .txt files (WildcardStore) vs the packed mmap bundle (BundleStore).
+# Cold start = fresh store, every list looked up once (text: open + parse each file; bundle:
+# tree signature check + mmap + list table). Per-sample = rng.choice on a looked-up list, and a
+# full resolve_prompt through each store. Runs on a synthetic tree in a temp folder.
+# Usage: python benchmarks/bench_wildcard_bundle.py [--genres 8] [--files 60] [--lines 200]
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from generator.wildcard_store import WildcardStore
+from generator.wildcard_bundle import BundleStore, WildcardBundle
+from generator.wildcard_loader import resolve_prompt
+
+
+def build_tree(root, genres, files, lines):
+    names = []
+    for g in ["common"] + [f"genre{i}" for i in range(genres)]:
+        os.makedirs(os.path.join(root, g), exist_ok=True)
+        for j in range(files):
+            name = f"list{j}"
+            with open(os.path.join(root, g, name + ".txt"), "w", encoding="utf-8") as f:
+                f.write("# generated\n")
+                for k in range(lines):
+                    f.write(f"{g} {name} option {k} with a few more words\n")
+            names.append((g, name))
+    return names
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--genres", type=int, default=8)
+    parser.add_argument("--files", type=int, default=60, help="lists per genre folder")
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        wildcards = os.path.join(root, "wildcards")
+        names = build_tree(wildcards, args.genres, args.files, args.lines)
+        t_build, built = timed(lambda: BundleStore(wildcards, os.path.join(root, "wildcards.bundle")).bundle())
+        bundle_path = built.path  # versioned file the stores below find and open
+        n_lists, n_lines = len(built.lists), built.n_lines
+        size_kb = os.path.getsize(bundle_path) / 1024
+        print(f"[📦] {n_lists} lists, {n_lines} lines, bundle {size_kb:.0f} KB built in {t_build * 1000:.0f} ms")
+
+        def cold_text():
+            store = WildcardStore(wildcards)
+            return [store.lookup(name, genre) for genre, name in names]
+
+        def cold_bundle():
+            store = BundleStore(wildcards, os.path.join(root, "wildcards.bundle"))
+            return [store.lookup(name, genre) for genre, name in names]
+
+        def cold_open():
+            bundle = WildcardBundle(bundle_path)
+            lists = [bundle.get(f"{genre}/{name}") for genre, name in names]
+            return bundle, lists
+
+        t_text, text_lists = timed(cold_text, 3)
+        t_bundle, bundle_lists = timed(cold_bundle, 3)
+        t_open, (bundle, _) = timed(cold_open, 3)
+        print(f"\ncold start ({len(names)} lists)")
+        print(f"  text files          : {t_text * 1000:8.1f} ms")
+        print(f"  bundle (w/ check)   : {t_bundle * 1000:8.1f} ms ({t_text / t_bundle:.1f}x)")
+        print(f"  bundle (open only)  : {t_open * 1000:8.1f} ms ({t_text / t_open:.1f}x)")
+        assert all(list(a) == list(b) for a, b in zip(text_lists, bundle_lists))
+
+        rng = random.Random(1)
+        picks = [rng.randrange(len(names)) for _ in range(args.samples)]
+        t_choice_text, _ = timed(lambda: [rng.choice(text_lists[i]) for i in picks])
+        t_choice_bundle, _ = timed(lambda: [rng.choice(bundle_lists[i]) for i in picks])
+        print(f"\nper sample ({args.samples} rng.choice on looked-up lists)")
+        print(f"  text (tuple)        : {t_choice_text / args.samples * 1e6:6.2f} µs")
+        print(f"  bundle (mmap decode): {t_choice_bundle / args.samples * 1e6:6.2f} µs")
+
+        template = "^^list1^^, ^^list2^^, 2$$^^list3^^, ^^list4^^, ^^genre0/list5^^"
+        text_store, bundle_store = WildcardStore(wildcards), BundleStore(wildcards, os.path.join(root, "wildcards.bundle"))
+        n = args.samples // 20
+        t_resolve_text, a = timed(lambda: [resolve_prompt(template, "genre1", rng=random.Random(i), store=text_store)
+                                           for i in range(n)])
+        t_resolve_bundle, b = timed(lambda: [resolve_prompt(template, "genre1", rng=random.Random(i), store=bundle_store)
+                                             for i in range(n)])
+        print(f"\nresolve_prompt ({n} prompts, warm)")
+        print(f"  text store          : {t_resolve_text / n * 1e6:6.1f} µs/prompt")
+        print(f"  bundle store        : {t_resolve_bundle / n * 1e6:6.1f} µs/prompt  identical={a == b}")
+        bundle.close()
+
+
+if __name__ == "__main__":
+    main()
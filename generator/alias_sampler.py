@@ -0,0 +1,74 @@
+# Weighted sampling with Vose's alias method: O(n) to build a table, O(1) per draw afterwards,
+# instead of weighted_choice's walk over the whole list on every draw.
+# WeightedSampler adds draws without replacement on top (remove an item, the table is rebuilt
+# over what's left), which the LORA category loop uses to drop empty or exhausted categories.
+
+
+class AliasTable:
+    def __init__(self, items, weights):
+        self.items = list(items)
+        n = len(self.items)
+        if n == 0:
+            raise ValueError("AliasTable needs at least one item")
+
+        weights = [max(float(w), 0.0) for w in weights]
+        total = sum(weights)
+        if total <= 0:
+            weights, total = [1.0] * n, float(n)  # all-zero weights: fall back to uniform
+
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Whatever is left is 1.0 up to float error
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw_index(self, rng):
+        i = int(rng.random() * len(self.items))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+    def draw(self, rng):
+        return self.items[self.draw_index(rng)]
+
+
+class WeightedSampler:
+    """Weighted draws from a shrinking set: remove() takes an item out of every later draw."""
+
+    def __init__(self, items, weights, table=None):
+        self._weights = dict(zip(items, weights))
+        self._table = table if table is not None else (AliasTable(items, weights) if self._weights else None)
+
+    def __len__(self):
+        return len(self._weights)
+
+    def __contains__(self, item):
+        return item in self._weights
+
+    def draw(self, rng):
+        return self._table.draw(rng)
+
+    def remove(self, item):
+        if self._weights.pop(item, None) is None:
+            return
+        self._table = AliasTable(self._weights, self._weights.values()) if self._weights else None
+
+    def sample(self, k, rng):
+        """Up to k distinct items, each drawn by weight from what's left."""
+        picked = []
+        while self._weights and len(picked) < k:
+            item = self.draw(rng)
+            picked.append(item)
+            self.remove(item)
+        return picked
@@ -0,0 +1,185 @@
+# Bulk prompt generation straight to JSONL, outside the Streamlit batch loop (capped at 50).
+# Prompts are generated lazily from a compiled super prompt (see prompt_template) and written one
+# line at a time, so memory stays flat whatever --count is. With --workers > 1 the run is split into
+# shards, each generated by a worker process into its own temp file with its own RNG, and the shard
+# files are appended to the output in order as they finish.
+# Shard seeds come from --seed, so the same seed (and --shard-size) gives the same file for any number of workers.
+# With --addressable each prompt gets its own seed instead (see SeededPrompts): prompt i depends only
+# on the template, the wildcard snapshot, --seed and i, so a crashed run resumes with --start and
+# any single prompt can be regenerated from the "snapshot"/"seed"/"index" stored on its line.
+#
+# --bundle serves wildcard lists from the packed mmap bundle (see wildcard_bundle), so workers start
+# without parsing the .txt tree and share one copy of it in memory.
+#
+# --unique skips prompts that repeat an earlier one's wildcard choices (see unique_prompts); it runs
+# in one process and keeps the seen hashes in memory.
+#
+# Usage: python -m generator.bulk_generate <super_prompt> --genre fantasy --count 100000 \
+#            --workers 8 --seed 42 --out prompts.jsonl [--addressable --start 50000] [--bundle] [--unique]
+# Each line: {"index": 0, "genre": "fantasy", "prompt": "..."} (+ "seed", "snapshot" if addressable)
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from generator.wildcard_store import WILDCARD_ROOT, WILDCARD_STORE
+from generator.prompt_template import PromptTemplate, SeededPrompts
+from generator.wildcard_bundle import BundleStore
+from generator.unique_prompts import unique_prompts
+
+SUPER_PROMPT_DIR = os.path.join(WILDCARD_ROOT, "super_prompts")
+SHARD_SIZE = 5000  # prompts per shard (and per wildcard lookup batch)
+
+
+def load_template(name, genre):
+    """Super prompt text with {genre} filled in; `name` is a path or a file in wildcards/super_prompts."""
+    path = name if os.path.isfile(name) else os.path.join(SUPER_PROMPT_DIR, name)
+    if not os.path.isfile(path) and not path.endswith(".txt"):
+        path += ".txt"
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().replace("{genre}", genre)
+
+
+def iter_prompts(template, count=None, rng=random, resolve_loras=False):
+    """Prompts from a PromptTemplate, lazily (forever if count is None); wildcard files are re-checked every SHARD_SIZE."""
+    i = 0
+    lookup = None
+    while count is None or i < count:
+        if i % SHARD_SIZE == 0:
+            lookup = template.lookup()
+        yield template.generate(rng, resolve_loras, lookup)
+        i += 1
+
+
+def shard_plan(count, seed=None, shard_size=SHARD_SIZE):
+    """[(start, n, shard_seed), ...] covering `count` prompts."""
+    master = random.Random(seed)
+    return [(start, min(shard_size, count - start), master.getrandbits(64)) for start in range(0, count, shard_size)]
+
+
+def _write_records(f, template, genre, start, n, seed, resolve_loras):
+    if isinstance(template, SeededPrompts):
+        prompts = template.prompts(start, start + n, resolve_loras)
+        extra = {"seed": template.seed, "snapshot": template.snapshot}
+    else:
+        prompts = iter_prompts(template, n, random.Random(seed), resolve_loras)
+        extra = {}
+    for i, prompt in enumerate(prompts, start):
+        record = {"index": i, "genre": genre, "prompt": prompt.strip(), **extra}
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _make_template(text, genre, seed, snapshot, use_bundle=False):
+    store = BundleStore() if use_bundle else WILDCARD_STORE
+    if snapshot is None:
+        return PromptTemplate(text, genre, store=store)
+    return SeededPrompts(text, genre, seed, store=store, snapshot=snapshot)
+
+
+def _write_shard(text, genre, start, n, seed, resolve_loras, path, snapshot=None, use_bundle=False):
+    """Worker: one shard to its own file."""
+    template = _make_template(text, genre, seed, snapshot, use_bundle)
+    with open(path, "w", encoding="utf-8") as f:
+        _write_records(f, template, genre, start, n, seed, resolve_loras)
+    return path
+
+
+def generate_to_jsonl(text, out_path, genre="fantasy", count=1000, seed=None, workers=1,
+                      shard_size=SHARD_SIZE, resolve_loras=False, addressable=False, start=0, use_bundle=False):
+    """
+    Write `count` prompts from template `text` to `out_path` (JSONL). Returns the number written.
+    addressable: seed each prompt from its index (see SeededPrompts); `start` is the first index.
+    use_bundle: read wildcards from the packed bundle, rebuilt here first if the .txt files changed.
+    """
+    if use_bundle:
+        BundleStore().bundle()  # (re)build once here rather than in every worker
+    if addressable:
+        seed = 0 if seed is None else seed
+        snapshot = WILDCARD_STORE.snapshot()  # taken once here so every worker uses the same one
+        plan = [(start + offset, n, seed) for offset, n, _ in shard_plan(count, seed, shard_size)]
+    else:
+        snapshot = None
+        plan = [(start + offset, n, s) for offset, n, s in shard_plan(count, seed, shard_size)]
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    part_path = out_path + ".part"  # the real file only appears once it's complete
+
+    with open(part_path, "w", encoding="utf-8") as out:
+        if workers <= 1 or len(plan) <= 1:
+            template = _make_template(text, genre, seed, snapshot, use_bundle)
+            for first, n, shard_seed in plan:
+                _write_records(out, template, genre, first, n, shard_seed, resolve_loras)
+        else:
+            shard_dir = tempfile.mkdtemp(prefix="shards_", dir=out_dir)
+            try:
+                paths = [os.path.join(shard_dir, f"{first:09d}.jsonl") for first, _, _ in plan]
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    # map() yields in submission order, so shards are appended in index order as they finish
+                    results = pool.map(
+                        _write_shard,
+                        *zip(*[(text, genre, first, n, s, resolve_loras, path, snapshot, use_bundle)
+                               for (first, n, s), path in zip(plan, paths)]),
+                    )
+                    for path in results:
+                        with open(path, "r", encoding="utf-8") as shard:
+                            shutil.copyfileobj(shard, out)
+                        os.remove(path)
+            finally:
+                shutil.rmtree(shard_dir, ignore_errors=True)
+
+    os.replace(part_path, out_path)
+    return count
+
+
+def write_unique_jsonl(text, out_path, genre="fantasy", count=1000, seed=None, resolve_loras=False, use_bundle=False):
+    """Like generate_to_jsonl, but no two prompts share a choice vector. Returns (written, info)."""
+    seed = 0 if seed is None else seed
+    template = _make_template(text, genre, seed, WILDCARD_STORE.snapshot(), use_bundle)
+    prompts, info = unique_prompts(template, count, resolve_loras)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path + ".part", "w", encoding="utf-8") as out:
+        for prompt, address in prompts:
+            record = {**address, "genre": genre, "prompt": prompt.strip(), "seed": seed, "snapshot": template.snapshot}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(out_path + ".part", out_path)
+    return len(prompts), info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate prompts from a super prompt into a JSONL file.")
+    parser.add_argument("template", help="super prompt file (path or name in wildcards/super_prompts)")
+    parser.add_argument("--genre", default="fantasy")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--resolve-loras", action="store_true", help="also resolve {{lora::...}} blocks")
+    parser.add_argument("--addressable", action="store_true", help="prompt i depends only on --seed and i")
+    parser.add_argument("--start", type=int, default=0, help="first index (resume an addressable run)")
+    parser.add_argument("--bundle", action="store_true", help="read wildcards from the packed mmap bundle")
+    parser.add_argument("--unique", action="store_true", help="no two prompts with the same wildcard choices")
+    parser.add_argument("--out", default="prompts.jsonl")
+    args = parser.parse_args()
+
+    text = load_template(args.template, args.genre)
+    start = time.perf_counter()
+    if args.unique:
+        written, info = write_unique_jsonl(text, args.out, args.genre, args.count, args.seed,
+                                           args.resolve_loras, args.bundle)
+        print(f"[🧬] {info['space'] if info['space'] is not None else 'unbounded'} possible prompts, "
+              f"{info['mode']}, {info['rejected']} repeats skipped")
+    else:
+        written = generate_to_jsonl(text, args.out, args.genre, args.count, args.seed, args.workers,
+                                    args.shard_size, args.resolve_loras, args.addressable, args.start, args.bundle)
+    elapsed = time.perf_counter() - start
+    print(f"[📜] {written} prompts -> {args.out} in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f}/s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
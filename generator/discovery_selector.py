@@ -7,11 +7,6 @@ from collections import defaultdict
 import json
 import os
 
-# Load tag data
-TAGS_PATH = os.path.join(os.path.dirname(__file__), "lora_tags.json")
-with open(TAGS_PATH, "r") as f:
-    TAGS = json.load(f)
-
 # Load config
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "lora_config.json")
 with open(CONFIG_PATH, "r") as f:
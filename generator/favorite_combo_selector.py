@@ -7,6 +7,7 @@ import os
 from copy import deepcopy
 
 from utils.lora_audit import get_unused_loras_grouped_by_model_and_category
+from generator.text_analysis import extract_keywords
 
 
 
@@ -55,8 +56,10 @@ def prompt_matches_tags(prompt_keywords, tag_string):
     tags = set(tag_string.lower().split(","))
     return any(kw in tags for kw in prompt_keywords)
 
-def pick_random_favorite_combo(combos, genre=None, prompt_keywords=None, discovery_mode=False):
-    
+def pick_random_favorite_combo(combos, genre=None, prompt_keywords=None, discovery_mode=False, prompt=None):
+    # Callers can hand over the prompt itself; keywords come from the shared (memoized) extractor
+    if prompt_keywords is None and prompt:
+        prompt_keywords = extract_keywords(prompt)
 
     if not prompt_keywords:
         prompt_keywords = set()
@@ -0,0 +1,221 @@
+# Content hashes (SHA256 / AutoV2) for models and LORAs, used to match files against civitai data,
+# the hash column in data/orchestrator_metadata.db and the hashes Forge prints in its logs.
+# Files are streamed in large chunks across a bounded process pool, and every hash is persisted
+# keyed by path + mtime + size, so only new or changed files are ever re-read.
+#
+# Usage: python -m generator.hash_cache <folder> [--workers 4]
+
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+HASH_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "model_index.db")
+HASH_CHUNK_BYTES = 8 * 1024 * 1024
+DEFAULT_HASH_WORKERS = min(4, os.cpu_count() or 1)
+HASHABLE_EXTS = (".safetensors", ".ckpt", ".pt")
+
+_LOCK = threading.Lock()
+
+
+def _connect(db_path):
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS hashes (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS hashes_sha256 ON hashes (sha256)")
+    return conn
+
+
+def sha256_file(path, chunk_size=HASH_CHUNK_BYTES):
+    """Stream a file through SHA256 without ever holding more than one chunk in memory."""
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def autov2(sha256):
+    """The 10-character short hash A1111/Forge and civitai show for models and LORAs."""
+    return sha256[:10] if sha256 else None
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def get_cached_hashes(paths, db_path=HASH_DB_PATH):
+    """{path: sha256} for the paths whose cached hash is still valid. Never reads file contents."""
+    paths = list(paths)
+    if not paths:
+        return {}
+
+    with _LOCK:
+        conn = _connect(db_path)
+        try:
+            rows = {}
+            for i in range(0, len(paths), 500):
+                batch = paths[i:i + 500]
+                rows.update({
+                    path: (mtime_ns, size, sha)
+                    for path, mtime_ns, size, sha in conn.execute(
+                        f"SELECT path, mtime_ns, size, sha256 FROM hashes WHERE path IN ({','.join('?' * len(batch))})",
+                        batch
+                    )
+                })
+        finally:
+            conn.close()
+
+    valid = {}
+    for path in paths:
+        row = rows.get(path)
+        if row and _stat(path) == row[:2]:
+            valid[path] = row[2]
+    return valid
+
+
+def _store(conn, results):
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO hashes (path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)",
+            results
+        )
+
+
+def compute_hashes(paths, workers=DEFAULT_HASH_WORKERS, db_path=HASH_DB_PATH, progress=None):
+    """
+    {path: sha256} for every readable path, hashing only files that are new or changed since they
+    were last hashed. Work is spread over `workers` processes with a bounded number of files in flight,
+    and results are persisted as they complete so an interrupted first pass isn't lost.
+    `progress(done, total, path)` is called after each newly hashed file.
+    """
+    paths = list(dict.fromkeys(paths))
+    hashes = get_cached_hashes(paths, db_path)
+    todo = [(p, _stat(p)) for p in paths if p not in hashes]
+    todo = [(p, st) for p, st in todo if st is not None]
+    if not todo:
+        return hashes
+
+    # Biggest files first so one huge checkpoint doesn't end up alone at the tail of the run
+    todo.sort(key=lambda item: -item[1][1])
+
+    max_in_flight = max(1, workers) * 2
+    pending = {}
+    done_count = 0
+    results = []
+
+    conn = _connect(db_path)
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            queue = iter(todo)
+            while True:
+                for path, st in queue:
+                    pending[pool.submit(sha256_file, path)] = (path, st)
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path, st = pending.pop(future)
+                    try:
+                        sha = future.result()
+                    except OSError as e:
+                        print(f"[⚠️ HASH] Could not hash {path}: {e}")
+                        continue
+                    # File changed while we were reading it: don't cache, it'll be re-hashed next time
+                    if _stat(path) == st:
+                        results.append((path, st[0], st[1], sha))
+                    hashes[path] = sha
+                    done_count += 1
+                    if progress:
+                        progress(done_count, len(todo), path)
+
+                if len(results) >= 50:
+                    with _LOCK:
+                        _store(conn, results)
+                    results = []
+        if results:
+            with _LOCK:
+                _store(conn, results)
+    finally:
+        conn.close()
+
+    return hashes
+
+
+def attach_hashes(entries, compute=False, workers=DEFAULT_HASH_WORKERS, db_path=HASH_DB_PATH):
+    """
+    Set "sha256" and "autov2" on model_loader entries (dicts or LoraRecords).
+    By default only already-cached hashes are used; `compute=True` hashes whatever is missing.
+    """
+    paths = [e["file"] for e in entries]
+    hashes = compute_hashes(paths, workers, db_path) if compute else get_cached_hashes(paths, db_path)
+    for entry in entries:
+        sha = hashes.get(entry["file"])
+        entry["sha256"] = sha
+        if isinstance(entry, dict):
+            entry["autov2"] = autov2(sha)
+    return entries
+
+
+def find_by_hash(hash_prefix, db_path=HASH_DB_PATH):
+    """Paths whose SHA256 starts with `hash_prefix` (full hash or AutoV2, case-insensitive)."""
+    with _LOCK:
+        conn = _connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT path FROM hashes WHERE sha256 LIKE ?", (hash_prefix.lower() + "%",)
+            ).fetchall()
+        finally:
+            conn.close()
+    return [path for (path,) in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash every model/LORA file under a folder.")
+    parser.add_argument("folder")
+    parser.add_argument("--workers", type=int, default=DEFAULT_HASH_WORKERS)
+    args = parser.parse_args()
+
+    paths = [
+        os.path.join(root, f)
+        for root, _, files in os.walk(args.folder)
+        for f in files if f.endswith(HASHABLE_EXTS)
+    ]
+    total_bytes = sum((_stat(p) or (0, 0))[1] for p in paths)
+    print(f"[🔑] {len(paths)} files, {total_bytes / 1024 ** 3:.1f} GB")
+
+    start = time.perf_counter()
+
+    def progress(done, total, path):
+        print(f"  [{done}/{total}] {os.path.relpath(path, args.folder)}")
+
+    hashes = compute_hashes(paths, workers=args.workers, progress=progress)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(hashes)} hashes in {elapsed:.1f}s ({total_bytes / 1024 ** 2 / max(elapsed, 1e-9):.0f} MB/s incl. cached)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 
 import os
 import json
-import requests
+from utils.http_client import client
 from pathlib import Path
 import re
 from bs4 import BeautifulSoup
@@ -10,15 +10,16 @@ from bs4 import BeautifulSoup
 # It extracts metadata from JSON and info files, cleans the data, and formats it for the LLM API.
 # It also handles the discovery of LORA pairs in a specified directory and manages the output of tagged data to a JSON file.
 # It is important to ensure that the paths and API configurations are set correctly for the script to function as intended.
-# The script uses BeautifulSoup for HTML parsing, requests for API calls, and JSON for data handling.
+# The script uses BeautifulSoup for HTML parsing, the shared lm_studio client (utils/http_client) for API calls, and JSON for data handling.
 
 
 # Configuration
 LORA_DIR = "F:/03_Gen AI tools/webui_forge_cu121_torch231/webui/models/Lora"  # Adjust this path if needed 
 OUTPUT_FILE = "lora_tags.json"
-LLM_API_URL = "http://127.0.0.1:1234/v1/chat/completions"
+LLM_API_PATH = "/v1/chat/completions"  # on the lm_studio client (utils/http_client)
 MODEL_NAME = "gryphe.mythomax-l2-13b"
 MAX_PROMPTS = 3
+LLM_TIMEOUT = 60  # seconds; longer than the lm_studio client's default read timeout
 
 HEADERS = {
     "Content-Type": "application/json"
@@ -110,7 +111,7 @@ def send_to_llm_chat(prompt, temperature=0.2, max_tokens=300, stop=["###", "\n\n
 
     print(f"[🧠] Sending prompt to LLM (first 500 chars):\n{prompt[:500]}...\n")
 
-    response = requests.post(LLM_API_URL, headers=HEADERS, json=payload, timeout=60)
+    response = client("lm_studio").post(LLM_API_PATH, headers=HEADERS, json=payload, timeout=LLM_TIMEOUT)
 
     if not response.ok:
         print(f"[!] LLM API Error {response.status_code}: {response.text}")
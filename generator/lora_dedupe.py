@@ -0,0 +1,169 @@
+# Finds LORA files that are copies of each other (same file in several category folders, renamed copies),
+# which otherwise inflate the categorize_loras() pools and skew the weighted picks.
+# Files are first bucketed by size; only same-size files are compared, by SHA256 content hash
+# (hash_cache) or by a cheap fingerprint of the safetensors header plus the first/last data bytes.
+#
+# Usage: python -m generator.lora_dedupe <lora_folder> [--mode auto|hash|header]
+
+import os
+import sys
+import hashlib
+import argparse
+from collections import defaultdict
+
+from generator.hash_cache import compute_hashes, get_cached_hashes
+from generator.safetensors_header import read_header_bytes
+from generator.lora_selector import CONFIG, TAGS
+
+SAMPLE_BYTES = 1024 * 1024  # tensor bytes sampled from each end of the file for header fingerprints
+
+# (path, mtime_ns, size) -> fingerprint, so repeat reports don't re-read headers
+_FINGERPRINTS = {}
+
+
+def header_fingerprint(path):
+    """
+    SHA256 over the safetensors header plus the first and last SAMPLE_BYTES of tensor data.
+    Renamed copies share it; different LORAs trained with the same settings don't, because
+    their tensor bytes differ.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    if key in _FINGERPRINTS:
+        return _FINGERPRINTS[key]
+
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            header = read_header_bytes(f)
+            if header is None:
+                return None
+            digest.update(header)
+            digest.update(f.read(SAMPLE_BYTES))
+            tail_start = max(f.tell(), st.st_size - SAMPLE_BYTES)
+            f.seek(tail_start)
+            digest.update(f.read(SAMPLE_BYTES))
+    except OSError:
+        return None
+
+    fingerprint = "hdr:" + digest.hexdigest()
+    _FINGERPRINTS[key] = fingerprint
+    return fingerprint
+
+
+def _size_buckets(loras):
+    buckets = defaultdict(list)
+    for lora in loras:
+        try:
+            buckets[os.path.getsize(lora["file"])].append(lora)
+        except OSError:
+            continue
+    return {size: group for size, group in buckets.items() if len(group) > 1}
+
+
+def find_duplicate_groups(loras, mode="auto", workers=None):
+    """
+    Groups (lists of 2+ entries) of LORAs with identical content.
+    mode="hash" hashes every same-size candidate (exact, reads whole files the first time),
+    mode="header" uses header fingerprints only, mode="auto" uses cached hashes where every
+    file in a size bucket has one and header fingerprints otherwise.
+    """
+    buckets = _size_buckets(loras)
+    candidates = [lora["file"] for group in buckets.values() for lora in group]
+
+    hashes = {}
+    if mode == "hash":
+        kwargs = {"workers": workers} if workers else {}
+        hashes = compute_hashes(candidates, **kwargs)
+    elif mode == "auto":
+        hashes = get_cached_hashes(candidates)
+
+    groups = []
+    for size in sorted(buckets):
+        bucket = buckets[size]
+        use_hashes = mode == "hash" or (mode == "auto" and all(l["file"] in hashes for l in bucket))
+
+        by_fingerprint = defaultdict(list)
+        for lora in bucket:
+            fingerprint = hashes.get(lora["file"]) if use_hashes else header_fingerprint(lora["file"])
+            if fingerprint:
+                by_fingerprint[fingerprint].append(lora)
+
+        groups.extend(group for group in by_fingerprint.values() if len(group) > 1)
+
+    return groups
+
+
+def _folder_category(lora):
+    parts = lora["name"].split("/")
+    return CONFIG["categories"].get(parts[-2]) if len(parts) >= 2 else None
+
+
+def choose_canonical(group):
+    """
+    The copy to keep: one filed in a known category folder, then one with a lora_tags.json
+    entry (hand-curated), then the most common category among the copies, then the shortest name.
+    """
+    category_votes = defaultdict(int)
+    for lora in group:
+        category_votes[_folder_category(lora)] += 1
+
+    def rank(lora):
+        category = _folder_category(lora)
+        tagged = lora["name"].replace("/", "\\") in TAGS
+        return (category is None, not tagged, -category_votes[category], len(lora["name"]), lora["name"])
+
+    return min(group, key=rank)
+
+
+def dedupe_report(loras, mode="auto", workers=None):
+    """One dict per duplicate group: the canonical copy, its category and the shadowed copies."""
+    report = []
+    for group in find_duplicate_groups(loras, mode, workers):
+        canonical = choose_canonical(group)
+        report.append({
+            "canonical": canonical["name"],
+            "category": _folder_category(canonical) or "unknown",
+            "size": os.path.getsize(canonical["file"]),
+            "duplicates": sorted(l["name"] for l in group if l is not canonical),
+        })
+    return report
+
+
+def collapse_duplicates(loras, mode="auto", workers=None):
+    """`loras` with every duplicate group reduced to its canonical copy (order otherwise unchanged)."""
+    shadowed = set()
+    for group in find_duplicate_groups(loras, mode, workers):
+        canonical = choose_canonical(group)
+        shadowed.update(l["file"] for l in group if l is not canonical)
+    return [l for l in loras if l["file"] not in shadowed]
+
+
+def main():
+    from generator.model_loader import get_available_loras
+
+    parser = argparse.ArgumentParser(description="Report duplicate LORA files.")
+    parser.add_argument("lora_folder")
+    parser.add_argument("--mode", choices=["auto", "hash", "header"], default="auto")
+    args = parser.parse_args()
+
+    loras = get_available_loras(args.lora_folder, compact=True)
+    report = dedupe_report(loras, mode=args.mode)
+
+    wasted = 0
+    for group in report:
+        print(f"📦 {group['canonical']}  [{group['category']}]")
+        for dup in group["duplicates"]:
+            print(f"   ↳ {dup}")
+        wasted += group["size"] * len(group["duplicates"])
+
+    shadowed = sum(len(g["duplicates"]) for g in report)
+    print(f"\n✅ {len(loras)} LORAs, {len(report)} duplicate groups, {shadowed} shadowed copies "
+          f"({wasted / 1024 ** 2:.0f} MB)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# Sparse LORA x tag-token matrix built from lora_tags.json, for scoring a whole batch of prompts in one go.
+# Instead of re-scoring every candidate per prompt in Python, a batch's keyword sets become a sparse
+# prompt x keyword matrix and keyword matches become a keyword x LORA matrix, so every prompt/LORA
+# relevance count comes out of a single sparse matrix product.
+#
+# Scores match lora_selector.score_lora_relevance (substring matching, TAG_STOP_WORDS ignored), and
+# top_k_per_category returns candidates in the same order select_loras_for_prompt would rank them.
+
+import re
+from bisect import bisect_right
+
+import numpy as np
+from scipy import sparse
+
+from generator.lora_tag_store import normalize_key
+
+
+class LoraTagMatrix:
+    def __init__(self, tags, stop_words=(), substring=True):
+        self.substring = substring
+        self.stop_words = frozenset(stop_words)
+        self.keys = []
+        self._col = {}
+        token_ids = {}
+        rows, cols = [], []
+
+        # Keyed like LoraTagStore lookups, so "Flux/x" and "Flux\\x" name the same LORA (last one wins)
+        for key, entry in {normalize_key(k): v for k, v in tags.items()}.items():
+            if not isinstance(entry, dict) or not entry:
+                continue
+            col = len(self.keys)
+            self.keys.append(key)
+            self._col[key] = col
+
+            all_tags = []
+            for group in ("genre", "style", "subject", "tone"):
+                all_tags.extend(entry.get(group, []))
+            for token in set(" ".join(str(tag).lower() for tag in all_tags).split()):
+                rows.append(token_ids.setdefault(token, len(token_ids)))
+                cols.append(col)
+
+        self.tokens = list(token_ids)
+        self._token_ids = token_ids
+        # All tokens in one newline-joined string so a substring lookup is a single regex scan
+        self._token_text = "\n".join(self.tokens)
+        self._token_starts = []
+        offset = 0
+        for token in self.tokens:
+            self._token_starts.append(offset)
+            offset += len(token) + 1
+        # token x LORA incidence (the transpose of the LORA x tag matrix)
+        self.token_lora = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(self.tokens), len(self.keys)),
+        )
+        self._keyword_tokens = {}
+
+    @staticmethod
+    def key_for(lora):
+        return normalize_key(lora["name"])  # tag keys use backslashes
+
+    def _tokens_for(self, keyword):
+        """Token ids a keyword matches: itself in exact mode, every token containing it in substring mode."""
+        ids = self._keyword_tokens.get(keyword)
+        if ids is None:
+            if self.substring:
+                # Keywords never contain whitespace, so a match can't straddle two tokens
+                ids = sorted({
+                    bisect_right(self._token_starts, m.start()) - 1
+                    for m in re.finditer(re.escape(keyword), self._token_text)
+                })
+            else:
+                ids = [self._token_ids[keyword]] if keyword in self._token_ids else []
+            self._keyword_tokens[keyword] = ids
+        return ids
+
+    def score_matrix(self, keyword_sets):
+        """
+        (scores, keyword_lora, vocab): scores is a dense prompts x LORAs array of match counts, one row
+        per keyword set, columns in self.keys order. keyword_lora is the (CSC) keyword x LORA match matrix
+        and vocab maps each keyword to its row in it.
+        """
+        vocab = {}
+        q_rows, q_cols = [], []
+        for row, keywords in enumerate(keyword_sets):
+            for kw in keywords:
+                if kw in self.stop_words:
+                    continue
+                q_rows.append(row)
+                q_cols.append(vocab.setdefault(kw, len(vocab)))
+
+        k_rows, k_cols = [], []
+        for kw, row in vocab.items():
+            ids = self._tokens_for(kw)
+            k_rows.extend([row] * len(ids))
+            k_cols.extend(ids)
+
+        query = sparse.csr_matrix(
+            (np.ones(len(q_rows), dtype=np.int32), (q_rows, q_cols)),
+            shape=(len(keyword_sets), len(vocab)),
+        )
+        keyword_token = sparse.csr_matrix(
+            (np.ones(len(k_rows), dtype=np.int32), (k_rows, k_cols)),
+            shape=(len(vocab), len(self.tokens)),
+        )
+
+        # A keyword counts once per LORA however many of its tokens it hits
+        keyword_lora = (keyword_token @ self.token_lora).tocsr()
+        keyword_lora.data[:] = 1
+
+        scores = (query @ keyword_lora).toarray()
+        return scores, keyword_lora.tocsc(), vocab
+
+    def top_k_per_category(self, keyword_sets, categorized_loras, base_model, k=5):
+        """
+        For each keyword set, {category: [(lora, score, matched_keywords), ...]} holding the top `k`
+        LORAs with score > 0 in every (base_model, category) pool, best first, ties in pool order.
+        """
+        keyword_sets = [list(keywords) for keywords in keyword_sets]
+        scores, keyword_lora, vocab = self.score_matrix(keyword_sets)
+        # Extra all-zero column for LORAs without a tag entry
+        scores = np.hstack([scores, np.zeros((scores.shape[0], 1), dtype=scores.dtype)])
+        untagged = len(self.keys)
+
+        prompt_ids = [
+            [(kw, vocab[kw]) for kw in keywords if kw not in self.stop_words] for keywords in keyword_sets
+        ]
+        lora_keywords = {}
+
+        results = [dict() for _ in keyword_sets]
+        for (model, category), pool in categorized_loras.items():
+            if model != base_model or not pool:
+                continue
+            cols = np.array([self._col.get(self.key_for(l), untagged) for l in pool])
+            pool_scores = scores[:, cols]
+            order = np.argsort(-pool_scores, axis=1, kind="stable")[:, :k]
+
+            for row, picks in enumerate(order):
+                ranked = []
+                for idx in picks:
+                    score = int(pool_scores[row, idx])
+                    if score <= 0:
+                        break
+                    ranked.append((pool[idx], score, self._matched(prompt_ids[row], cols[idx], keyword_lora, lora_keywords)))
+                if ranked:
+                    results[row][category] = ranked
+        return results
+
+    @staticmethod
+    def _matched(prompt_ids, col, keyword_lora, lora_keywords):
+        """Keywords of one prompt that hit LORA column `col`, in the prompt's keyword order."""
+        hits = lora_keywords.get(col)
+        if hits is None:
+            hits = lora_keywords[col] = set(
+                keyword_lora.indices[keyword_lora.indptr[col]:keyword_lora.indptr[col + 1]].tolist()
+            )
+        return [kw for kw, i in prompt_ids if i in hits]
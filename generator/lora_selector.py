@@ -4,16 +4,23 @@
 # It also includes functions to load configurations and tag data from JSON files, and to handle LORA selection
 # based on user preferences and model types.
 import os
+import copy
 import random
 import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 import json
 import yaml
 
-# Load tag data
-TAGS_PATH = os.path.join(os.path.dirname(__file__), "lora_tags.json")
-with open(TAGS_PATH, "r") as f:
-    TAGS = json.load(f)
+from generator.tag_index import TagIndex
+from generator.text_analysis import extract_keywords
+from generator.alias_sampler import AliasTable, WeightedSampler
+from generator.lora_tag_store import LORA_TAGS, TAGS_PATH, normalize_key
+
+# Tag data: the shared store, loaded on first use and reloaded when lora_tags.json changes
+TAGS = LORA_TAGS
 
 # Load config
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "lora_config.json")
@@ -21,22 +28,30 @@ with open(CONFIG_PATH, "r") as f:
     CONFIG = json.load(f)
 
 
+def lora_bucket(lora):
+    """(base_model, category) key a LORA is filed under, or None if it isn't inside a category folder."""
+    folder_parts = lora['name'].split("/")
+    if len(folder_parts) < 2:
+        return None
+    folder_name = folder_parts[-2]
+    category = CONFIG["categories"].get(folder_name, "unknown")
+    base_model = lora.get("base_model", "unknown")
+    return (base_model, category)
+
+
 def categorize_loras(lora_list):
     categorized = defaultdict(list)
     for lora in lora_list:
-        folder_parts = lora['name'].split("/")
-        if len(folder_parts) < 2:
+        bucket = lora_bucket(lora)
+        if bucket is None:
             continue
-        folder_name = folder_parts[-2]
-        category = CONFIG["categories"].get(folder_name, "unknown")
-        base_model = lora.get("base_model", "unknown")
-        categorized[(base_model, category)].append(lora)
+        categorized[bucket].append(lora)
     return categorized
 
 
-def weighted_choice(choices):
+def weighted_choice(choices, rng=random):
     total = sum(weight for _, weight in choices)
-    r = random.uniform(0, total)
+    r = rng.uniform(0, total)
     upto = 0
     for choice, weight in choices:
         if upto + weight >= r:
@@ -49,51 +64,49 @@ TAG_STOP_WORDS = set([
         "art", "design", "form", "sketch", "painting", "digital", "details"
     ])
 
-def extract_keywords(text):
-    stop_words = {
-        "the", "a", "an", "in", "on", "at", "with", "by", "for", "of", "to", "is", "are",
-        "and", "or", "be", "this", "that", "it", "as", "from", "was", "were", "has", "have",
-        "but", "not", "their", "them", "he", "she", "they", "we", "you", "your", "i", "my",
-        "his", "her", "its", "our", "us", "also", "which", "one", "other", "some", "any", 
-        "all", "image", "prompt", "leg", "body", "face", "eyes", "hair", "skin", "clothes",
-        "scene", "background", "appears", "color", "style", "art", "character", "can", "like",
-        "figure", "green", "blue", "red", "yellow", "black", "white", "brown", "pink", "purple",
-        "arm", "hand", "foot", "head", "mouth", "nose", "ear", "smile", "expression", "pose",
-        "line", "shape", "form", "size", "proportion", "detail", "texture", "into", "out",
-        "over", "under", "between", "above", "below", "near", "far", "close", "around", "about",
-        "theme", "mood", "feeling", "emotion", "action", "movement", "dynamic", "static", "behind",
-        "hands", "shoulder", "covered", "who", "hip", "waist", "thigh", "knee", "calf", "ankle", "footwear",
-        "sleeve", "collar", "neck", "earrings", "necklace", "bracelet", "ring", "watch", "belt",
-        "pocket", "button", "zipper", "pattern", "piece", "should", "scheme", "creating", "create", "made",
-        "features", "yet", "unique", "captivating", "stunning", "beautiful", "gorgeous", "breathtaking",
-        "amazing", "fantastic", "incredible", "wonderful", "spectacular", "extraordinary", "exceptional",
-        "remarkable", "outstanding", "impressive", "striking", "eye-catching", "visually", "appealing",
-        "aesthetic", "artistic", "stylish", "trendy", "charming", "adding", "side", "front", "back", "top",
-        "-", "quality", "high", "low", "medium", "soft", "hard", "bright", "dark", "light", "dim",
-        "appearance", "solid", "torso", "dim", "yet", "while", "air", "each", "environment",  "surrounding",
-        "reminiscent", "accents", "piercing", "adorned", "long", "resting", "air", "against", "sky", 
-        "vibrant", "filled", "forward", "tones", "contrast", "vibrant", "viewer", "sharp", "tree", "when", 
-        "weight", "before", "after", "during", "while", "between", "along", "across", "through", "past", "towards",
-        " short", "slightly", "tall", "lashes", "even", "both", "seem", "if", "not", "just", "like", "as", "such",
-        "more", "less", "than", "very", "much", "many", "few", "several", "each", "every", "any", "no",
-        "none", "some", "all", "most", "both", "either", "neither", "one", "two", "three", "four",
-        "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve", "thirteen", "fourteen",
-        "fifteen", "sixteen", "seventeen", "eighteen", "nineteen", "twenty", "hundred", "thousand",
-        "used", "use", "using", "utilize", "utilizing", "utilized", "utilizes", "utilize", "utilizing",
-        "own", "stand"
+# Keyword -> LORA lookups over TAGS (substring mode matches score_lora_relevance) and the sparse
+# LORA x tag matrix for batch scoring (needs numpy/scipy); both built on first use and rebuilt
+# when lora_tags.json is reloaded. Stored as (tags version, index).
+_TAG_INDEX = None
+_TAG_MATRIX = None
+
+
+def get_tag_index():
+    global _TAG_INDEX
+    version = TAGS.current_version()
+    if _TAG_INDEX is None or _TAG_INDEX[0] != version:
+        _TAG_INDEX = (version, TagIndex(TAGS, TAG_STOP_WORDS))
+    return _TAG_INDEX[1]
+
+
+def get_tag_matrix():
+    global _TAG_MATRIX
+    version = TAGS.current_version()
+    if _TAG_MATRIX is None or _TAG_MATRIX[0] != version:
+        from generator.lora_matrix import LoraTagMatrix
+        _TAG_MATRIX = (version, LoraTagMatrix(TAGS, TAG_STOP_WORDS))
+    return _TAG_MATRIX[1]
 
-    }
-   
 
-    text = text.lower()
-    words = set(text.replace(",", " ").replace(".", " ").split())
-    keywords = {word for word in words if word and word not in stop_words}
-    return keywords
+# Saved semantic index (python -m generator.semantic_index), loaded on first use of match_mode="semantic"
+_SEMANTIC_INDEX = None
 
 
+def get_semantic_index():
+    """The saved SemanticIndex, or None if it hasn't been built (or numpy/scipy are missing)."""
+    global _SEMANTIC_INDEX
+    if _SEMANTIC_INDEX is None:
+        try:
+            from generator.semantic_index import SemanticIndex, SEMANTIC_INDEX_PATH
+            if os.path.exists(SEMANTIC_INDEX_PATH):
+                _SEMANTIC_INDEX = SemanticIndex.load(SEMANTIC_INDEX_PATH)
+        except (ImportError, OSError, ValueError) as e:
+            print(f"[⚠️ SEMANTIC] Index unavailable, using keyword matching: {e}")
+    return _SEMANTIC_INDEX
+
 
 def score_lora_relevance(lora, keywords):
-    name = lora["name"].replace("/", "\\")  # tag keys use backslashes
+    name = normalize_key(lora["name"])  # tag keys use backslashes
     tag_entry = TAGS.get(name)
 
     if not tag_entry:
@@ -111,9 +124,106 @@ def score_lora_relevance(lora, keywords):
 
 
 
-def select_loras_for_prompt(categorized_loras, base_model, resolved_prompt=None, use_smart_matching=False, genre=None):
-    DEFAULT_WEIGHTS = CONFIG.get("default_lora_weights", {})
-    fuzz = CONFIG.get("weight_fuzz_range", 0.05)
+def rank_loras_for_prompts(categorized_loras, base_model, prompts, k=5):
+    """
+    Top-k keyword matches per category for a whole batch of prompts in one sparse matrix product.
+    One {category: [(lora, score, matched_keywords), ...]} per prompt, to pass as `ranked`
+    to select_loras_for_prompt.
+    """
+    keyword_sets = [extract_keywords(p) if p else set() for p in prompts]
+    return get_tag_matrix().top_k_per_category(keyword_sets, categorized_loras, base_model, k=k)
+
+
+CINEMATIC_KEYWORDS = frozenset({
+    "cinematic", "film", "movie", "lighting", "bokeh", "natural light", "photographic", "lens", "vintage",
+    "cinema", "realistic", "photo", "photorealistic", "realism", "documentary", "cinematography",
+    "analog", "film grain", "depth of field", "analogue", "grainy", "filmic", "shadows"
+})
+
+
+@lru_cache(maxsize=1)
+def _cinematic_keys(version):
+    """Tag keys of LORAs whose style/tone tags include a cinematic keyword (per tags version)."""
+    keys = set()
+    for key, entry in TAGS.items():
+        if not isinstance(entry, dict):
+            continue
+        tag_values = []
+        for group in ("style", "tone"):
+            tag_values.extend(entry.get(group, []))
+        if set(t.lower() for t in tag_values if isinstance(t, str)) & CINEMATIC_KEYWORDS:
+            keys.add(normalize_key(key))
+    return frozenset(keys)
+
+
+@lru_cache(maxsize=None)
+def selection_context(genre=None):
+    """Per-genre settings select_loras_for_prompt needs on every pick, computed once."""
+    weighted_categories = []
+
+    for cat, wt in CONFIG["weights"].items():
+        if cat.lower() == "detailer":
+            continue  # already handled
+
+        # Bias artist/general when NOT realism
+        if genre != "realism" and cat in ("artist", "general"):
+            wt *= 1.4  # or whatever bias feels right
+
+        # Bias characters/fx when realism
+        elif genre == "realism" and cat in ("characters", "fx"):
+            wt *= 1.3
+
+        weighted_categories.append((cat, wt))
+
+    return {
+        "default_weights": CONFIG.get("default_lora_weights", {}),
+        "fuzz": CONFIG.get("weight_fuzz_range", 0.05),
+        "count_table": AliasTable(CONFIG["preferred_lora_count"], CONFIG["preferred_lora_weights"]),
+        "weighted_categories": tuple(weighted_categories),
+    }
+
+
+@lru_cache(maxsize=256)
+def _category_table(genre, categories):
+    weights = dict(selection_context(genre)["weighted_categories"])
+    return AliasTable(categories, [weights[cat] for cat in categories])
+
+
+def category_sampler(genre, categories):
+    """
+    Fresh without-replacement sampler over `categories` (a tuple of non-empty category names) with
+    the genre's biased weights. Alias tables are cached per (genre, categories), i.e. per base model.
+    """
+    if not categories:
+        return WeightedSampler((), ())
+    weights = dict(selection_context(genre)["weighted_categories"])
+    return WeightedSampler(categories, [weights[cat] for cat in categories], _category_table(genre, categories))
+
+
+def _pick(lora, weight):
+    """A copy of a catalog entry carrying this selection's weight; the catalog itself is never touched."""
+    picked = copy.copy(lora)
+    picked["weight"] = weight
+    return picked
+
+
+def select_loras_for_prompt(categorized_loras, base_model, resolved_prompt=None, use_smart_matching=False, genre=None,
+                            tag_index=None, ranked=None, rng=random, match_mode="keywords", semantic_index=None):
+    """
+    Pick LORAs for one prompt. Returns (selected, selection_log); `selected` holds copies of the
+    catalog entries with the chosen "weight" set, so the shared catalog is left untouched.
+    With smart matching, match_mode="keywords" matches prompt words against lora_tags.json and
+    match_mode="semantic" ranks by similarity in the semantic index (keywords if none is built).
+    """
+    ctx = selection_context(genre)
+    DEFAULT_WEIGHTS = ctx["default_weights"]
+    fuzz = ctx["fuzz"]
+
+    semantic_scores = None
+    if match_mode == "semantic" and use_smart_matching and resolved_prompt:
+        semantic_index = semantic_index or get_semantic_index()
+        if semantic_index is not None:
+            semantic_scores = semantic_index.scores(resolved_prompt)
 
     prompt_keywords = extract_keywords(resolved_prompt) if use_smart_matching and resolved_prompt else set()
     selection_log = []
@@ -121,19 +231,19 @@ def select_loras_for_prompt(categorized_loras, base_model, resolved_prompt=None,
     category_usage_count = defaultdict(int)
 
     # Decide total number of LORAs
-    counts = CONFIG["preferred_lora_count"]
-    weights = CONFIG["preferred_lora_weights"]
-    total_loras = random.choices(counts, weights=weights)[0]
+    total_loras = ctx["count_table"].draw(rng)
 
     selected = []
+    selected_names = set()
 
     # ✅ Always include one detailer
     detailers = categorized_loras.get((base_model, "detailer"), [])
     if detailers:
-        chosen = random.choice(detailers)
         base_weight = DEFAULT_WEIGHTS.get("detailer", 0.9)
-        chosen["weight"] = round(random.uniform(base_weight - fuzz, base_weight + (fuzz * 2)), 2)
+        chosen = rng.choice(detailers)
+        chosen = _pick(chosen, round(rng.uniform(base_weight - fuzz, base_weight + (fuzz * 2)), 2))
         selected.append(chosen)
+        selected_names.add(chosen["name"])
 
         selection_log.append({
             "name": chosen["name"],
@@ -149,71 +259,62 @@ def select_loras_for_prompt(categorized_loras, base_model, resolved_prompt=None,
     if remaining <= 0:
         return selected, selection_log
 
-    weighted_categories = []
-
-    for cat, wt in CONFIG["weights"].items():
-        if cat.lower() == "detailer":
-            continue  # already handled
-
-        # Bias artist/general when NOT realism
-        if genre != "realism" and cat in ("artist", "general"):
-            wt *= 1.4  # or whatever bias feels right
+    # Only categories this base model actually has LORAs in; each one drops out once it's used up,
+    # so every pass through the loop either picks a LORA or removes a category and the loop
+    # ends after at most total_loras + len(categories) passes.
+    available = tuple(
+        cat for cat, wt in ctx["weighted_categories"]
+        if wt > 0 and categorized_loras.get((base_model, cat))
+    )
+    sampler = category_sampler(genre, available)
 
-        # Bias characters/fx when realism
-        elif genre == "realism" and cat in ("characters", "fx"):
-            wt *= 1.3
-
-        weighted_categories.append((cat, wt))
-
-    recent_character_used = False
-
-    while remaining > 0:
-        category = weighted_choice(weighted_categories)
-
-        if category.lower() == "characters" and recent_character_used:
-            continue
-
-        lora_pool = categorized_loras.get((base_model, category), [])
-        if not lora_pool:
-            continue
+    while remaining > 0 and len(sampler):
+        category = sampler.draw(rng)
+        lora_pool = categorized_loras[(base_model, category)]
 
         reasons = []
         candidate = None
 
-        if prompt_keywords and use_smart_matching:
-            scored = [(l, *score_lora_relevance(l, prompt_keywords)) for l in lora_pool]
+        if semantic_scores is not None:
+            top_semantic = [
+                x for x in semantic_index.score_pool(lora_pool, semantic_scores)[:5] if x[0]["name"] not in selected_names
+            ]
+            if top_semantic:
+                candidate, similarity = rng.choice(top_semantic)
+                reasons.append(f"Semantic match: {similarity:.2f}")
+
+        elif ranked is not None and use_smart_matching:
+            # Pre-ranked by rank_loras_for_prompts: already the top 5 with score > 0
+            top_ranked = [x for x in ranked.get(category, [])[:5] if x[0]["name"] not in selected_names]
+            if top_ranked:
+                candidate, _, matched_keywords = rng.choice(top_ranked)
+                reasons.append(f"Matched tags: {', '.join(matched_keywords)}" if matched_keywords else "Matched tags: None")
+
+        elif prompt_keywords and use_smart_matching:
+            scored = (tag_index or get_tag_index()).score_pool(lora_pool, prompt_keywords)
             scored.sort(key=lambda x: -x[1])
-            top_scored = [l for l, score, _ in scored if score > 0]
+            top_scored = [x for x in scored if x[1] > 0][:5]
+            top_scored = [x for x in top_scored if x[0]["name"] not in selected_names]
 
             if top_scored:
-                candidate = random.choice(top_scored[:5])
-                _, _, matched_keywords = next((x for x in scored if x[0] == candidate), (None, 0, []))
+                candidate, _, matched_keywords = rng.choice(top_scored)
                 reasons.append(f"Matched tags: {', '.join(matched_keywords)}" if matched_keywords else "Matched tags: None")
 
         # 🔍 Boost cinematic-style LORAs for realism
         if genre == "realism" and candidate:
-            cinematic_keywords = {
-                "cinematic", "film", "movie", "lighting", "bokeh", "natural light", "photographic", "lens", "vintage", 
-                "cinema", "realistic", "photo", "photorealistic", "realism", "documentary", "cinematography",
-                "analog", "film grain", "depth of field", "analogue", "grainy", "filmic", "shadows"
-                }
-            name_key = candidate["name"].replace("/", "\\")
-            tag_entry = TAGS.get(name_key)
-            if tag_entry:
-                tag_values = []
-                for group in ("style", "tone"):
-                    tag_values.extend(tag_entry.get(group, []))
-                tag_set = set(t.lower() for t in tag_values)
-                if tag_set & cinematic_keywords:
-                    reasons.append("🎥 Boosted for realism (cinematic tag match)")
+            if normalize_key(candidate["name"]) in _cinematic_keys(TAGS.current_version()):
+                reasons.append("🎥 Boosted for realism (cinematic tag match)")
 
         if not candidate:
-            candidate = random.choice(lora_pool)
+            candidate = rng.choice(lora_pool)
+            if candidate["name"] in selected_names:
+                unused = [l for l in lora_pool if l["name"] not in selected_names]
+                if not unused:
+                    sampler.remove(category)  # every LORA in it is already picked
+                    continue
+                candidate = rng.choice(unused)
             reasons.append("Random fallback (no match or smart matching disabled)")
 
-        if candidate in selected:
-            continue
-
         base_weight = DEFAULT_WEIGHTS.get(category, 0.6)
         usage_count = category_usage_count[category]
 
@@ -221,9 +322,9 @@ def select_loras_for_prompt(categorized_loras, base_model, resolved_prompt=None,
         if usage_count > 0:
             base_weight = max(base_weight - (0.1 * usage_count), 0.3)  # Don’t drop too low
 
-        weight = round(random.uniform(base_weight - 0.05, base_weight + 0.05), 2)
-        candidate["weight"] = weight
-        selected.append(candidate)
+        weight = round(rng.uniform(base_weight - 0.05, base_weight + 0.05), 2)
+        selected.append(_pick(candidate, weight))
+        selected_names.add(candidate["name"])
         category_usage_count[category] += 1
         selection_log.append({
             "name": candidate["name"],
@@ -234,6 +335,78 @@ def select_loras_for_prompt(categorized_loras, base_model, resolved_prompt=None,
 
         remaining -= 1
         if category.lower() == "characters":
-            recent_character_used = True
+            sampler.remove(category)  # at most one character per prompt
 
     return selected, selection_log
+
+
+# Process-pool workers get the catalog once through the initializer instead of once per task
+_WORKER_CATALOG = None
+
+
+def _init_selection_worker(categorized_loras, semantic_index=None):
+    global _WORKER_CATALOG, _SEMANTIC_INDEX
+    _WORKER_CATALOG = categorized_loras
+    _SEMANTIC_INDEX = semantic_index
+
+
+def _select_chunk(categorized_loras, base_model, jobs, use_smart_matching, genre, match_mode="keywords",
+                  semantic_index=None):
+    """Selections for a list of (prompt, seed) jobs, ranked together in one matrix product when possible."""
+    if categorized_loras is None:
+        categorized_loras = _WORKER_CATALOG
+
+    ranked = [None] * len(jobs)
+    if use_smart_matching and match_mode != "semantic":
+        try:
+            ranked = rank_loras_for_prompts(categorized_loras, base_model, [prompt for prompt, _ in jobs])
+        except ImportError:
+            pass  # no numpy/scipy: fall back to TagIndex scoring per prompt
+
+    return [
+        select_loras_for_prompt(
+            categorized_loras, base_model, prompt, use_smart_matching, genre=genre,
+            ranked=job_ranked, rng=random.Random(seed), match_mode=match_mode, semantic_index=semantic_index
+        )
+        for (prompt, seed), job_ranked in zip(jobs, ranked)
+    ]
+
+
+def select_loras_for_prompts(categorized_loras, base_model, prompts, use_smart_matching=False, genre=None,
+                             seed=None, workers=1, executor="thread", chunk_size=64, match_mode="keywords",
+                             semantic_index=None):
+    """
+    Batch version of select_loras_for_prompt: one (selected, selection_log) per prompt, in order.
+    Category weights and keyword rankings are computed once for the whole batch, every job gets
+    its own random.Random (seeded from `seed`, or from the global random state), and with
+    workers > 1 chunks of the batch run on a thread or process pool.
+    """
+    master = random.Random(seed) if seed is not None else random
+    jobs = [(prompt, master.getrandbits(64)) for prompt in prompts]
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    if match_mode == "semantic" and semantic_index is None:
+        semantic_index = get_semantic_index()
+
+    if workers <= 1 or len(chunks) <= 1:
+        results = [
+            _select_chunk(categorized_loras, base_model, chunk, use_smart_matching, genre, match_mode, semantic_index)
+            for chunk in chunks
+        ]
+    elif executor == "process":
+        # Plain dicts/lists only, so the catalog pickles cheaply into each worker
+        catalog = {bucket: list(pool) for bucket, pool in categorized_loras.items()}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_selection_worker,
+                                 initargs=(catalog, semantic_index)) as pool:
+            results = list(pool.map(
+                _select_chunk, repeat(None), repeat(base_model), chunks, repeat(use_smart_matching), repeat(genre),
+                repeat(match_mode)
+            ))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                _select_chunk, repeat(categorized_loras), repeat(base_model), chunks,
+                repeat(use_smart_matching), repeat(genre), repeat(match_mode), repeat(semantic_index)
+            ))
+
+    return [selection for chunk in results for selection in chunk]
@@ -0,0 +1,127 @@
+# Shared, lazily loaded view of lora_tags.json.
+# lora_selector and discovery_selector used to parse their own copy at import, and
+# resolve_lora_blocks re-read the whole file for every prompt with a {{lora::...}} block.
+# The store loads the file on first use, re-stats it at most every `check_interval` seconds and
+# reloads it when it changed (mtime + size). Lookups go through a dict keyed on normalized keys,
+# so "Flux/Artist Styles/x", "Flux\\Artist Styles\\x" and "Flux\\\\Artist Styles\\\\x" all find the
+# same entry. `version` goes up on every reload, for code that builds indexes over the tags.
+
+import os
+import re
+import json
+import time
+import copy
+import threading
+from collections.abc import Mapping
+
+TAGS_PATH = os.path.join(os.path.dirname(__file__), "lora_tags.json")
+CHECK_INTERVAL = 2.0  # seconds the loaded tags are trusted before the file is re-checked
+
+_SEPARATORS_RE = re.compile(r"[\\/]+")
+
+
+def normalize_key(key):
+    """Tag key in the file's format: single backslashes between folders."""
+    return _SEPARATORS_RE.sub(r"\\", key)
+
+
+class LoraTagStore(Mapping):
+    def __init__(self, path=TAGS_PATH, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._tags = {}  # as in the file
+        self._by_key = {}  # normalized key -> entry
+        self._signature = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.version = 0
+        self.loads = 0
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _current(self):
+        """The loaded tags, reloading them first if the file changed."""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._tags
+
+        with self._lock:
+            signature = self._stat()
+            if self._checked_at is None or signature != self._signature:
+                tags = {}
+                if signature is not None:
+                    try:
+                        with open(self.path, "r", encoding="utf-8") as f:
+                            tags = json.load(f)
+                    except (OSError, ValueError) as e:
+                        print(f"[⚠️ TAGS] Could not load {self.path}: {e}")
+                        tags = self._tags  # keep the last good copy
+                self._tags = tags
+                self._by_key = {normalize_key(k): v for k, v in tags.items()}
+                self._signature = signature
+                self.version += 1
+                self.loads += 1
+            self._checked_at = now
+        return self._tags
+
+    def exists(self):
+        self._current()
+        return self._signature is not None
+
+    def current_version(self):
+        """`version` after checking the file, for caches built over the tags."""
+        self._current()
+        return self.version
+
+    def get(self, key, default=None):
+        self._current()
+        entry = self._by_key.get(key)
+        if entry is None:
+            entry = self._by_key.get(normalize_key(key), default)
+        return entry
+
+    def __getitem__(self, key):
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self._current())
+
+    def __len__(self):
+        return len(self._current())
+
+    def keys(self):
+        return self._current().keys()
+
+    def items(self):
+        return self._current().items()
+
+    def values(self):
+        return self._current().values()
+
+    def snapshot(self):
+        """A deep copy of the tags, safe to modify and pass to save()."""
+        return copy.deepcopy(self._current())
+
+    def save(self, tags):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(tags, f, indent=2)
+        self.invalidate()
+
+    def invalidate(self):
+        """Reload the file on next use (after it was written)."""
+        self._checked_at = None
+
+
+# Shared by everything that reads lora_tags.json
+LORA_TAGS = LoraTagStore()
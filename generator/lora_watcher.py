@@ -0,0 +1,235 @@
+# Keeps the LORA catalog live while the app is running, so new downloads show up without a full rescan.
+# File events (watchdog/inotify where installed, otherwise a polling loop over the index signatures) are
+# applied incrementally to the in-memory LORA list, the categorize_loras() buckets and the
+# wildcards/loras/<model>/<category>.txt files.
+
+import os
+import time
+import queue
+import threading
+from collections import defaultdict
+
+from generator.model_loader import build_lora_record
+from generator.model_index import get_indexed_loras, walk_model_files, LORA_EXTS, SIDECAR_EXTS
+from generator.lora_selector import lora_bucket
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAS_WATCHDOG = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    HAS_WATCHDOG = False
+
+POLL_INTERVAL = 5.0  # seconds between rescans when watchdog isn't available
+SETTLE_DELAY = 1.0  # wait for a burst of events (e.g. a download in progress) to go quiet
+
+
+class LoraCatalog:
+    """In-memory LORA entries plus their (base_model, category) buckets, updated one file at a time."""
+
+    def __init__(self, lora_dir, loras=None, sync_wildcards=True):
+        self.lora_dir = lora_dir
+        self.sync_wildcards = sync_wildcards
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._buckets = defaultdict(list)
+        self.version = 0  # bumped on every upsert/remove
+
+        for lora in (loras if loras is not None else get_indexed_loras(lora_dir)):
+            self._add(lora)
+
+    # --- Read side ---
+
+    # New lists over the shared entries: readers don't modify entries (the selector sets weights on
+    # copies, see lora_selector._pick), and a watcher update replaces an entry rather than editing it
+
+    def loras(self):
+        with self._lock:
+            return list(self._entries.values())
+
+    def categorized(self):
+        """Same shape as lora_selector.categorize_loras(self.loras())."""
+        with self._lock:
+            return defaultdict(list, {k: list(v) for k, v in self._buckets.items() if v})
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Write side ---
+
+    def _add(self, lora):
+        path = os.path.normpath(lora["file"])
+        self._entries[path] = lora
+        bucket = lora_bucket(lora)
+        if bucket is not None:
+            self._buckets[bucket].append(lora)
+
+    def _drop(self, path):
+        lora = self._entries.pop(path, None)
+        if lora is None:
+            return None
+        bucket = lora_bucket(lora)
+        if bucket is not None:
+            self._buckets[bucket] = [l for l in self._buckets[bucket] if l is not lora]
+        return lora
+
+    def upsert(self, path):
+        path = os.path.normpath(path)
+        lora = build_lora_record(path, self.lora_dir)
+        with self._lock:
+            is_new = self._drop(path) is None
+            self._add(lora)
+            self.version += 1
+        if is_new and self.sync_wildcards:
+            self._sync_wildcard(path, present=True)
+        return lora
+
+    def remove(self, path):
+        path = os.path.normpath(path)
+        with self._lock:
+            removed = self._drop(path)
+            if removed is not None:
+                self.version += 1
+        if removed is not None and self.sync_wildcards:
+            self._sync_wildcard(path, present=False)
+        return removed
+
+    def _sync_wildcard(self, path, present):
+        # Imported here: update_lora_wildcards reads config.yaml at import time
+        from generator import update_lora_wildcards
+        try:
+            if present:
+                update_lora_wildcards.add_wildcard_entry(path)
+            else:
+                update_lora_wildcards.remove_wildcard_entry(path)
+        except Exception as e:
+            print(f"[⚠️ WATCHER] Failed to sync wildcard for {path}: {e}")
+
+    def reconcile(self, path):
+        """
+        Bring the catalog in line with whatever is on disk at `path` now.
+        Works for LORA files, their sidecars and whole directories, so every
+        create/delete/move/modify event reduces to reconciling the paths it touched.
+        """
+        path = os.path.normpath(path)
+
+        if path.endswith(SIDECAR_EXTS):
+            path = os.path.splitext(path)[0] + LORA_EXTS[0]
+            if path in self._entries and os.path.exists(path):
+                self.upsert(path)
+            return
+
+        if path.endswith(LORA_EXTS):
+            if os.path.isfile(path):
+                self.upsert(path)
+            else:
+                self.remove(path)
+            return
+
+        if os.path.isfile(path):
+            return  # some other file (partial download, preview image...)
+
+        # Directory: drop anything under it that's gone, pick up anything new
+        prefix = path + os.sep
+        with self._lock:
+            known = [p for p in self._entries if p.startswith(prefix)]
+        for p in known:
+            if not os.path.exists(p):
+                self.remove(p)
+        if os.path.isdir(path):
+            for p, _ in walk_model_files(path, LORA_EXTS):
+                if os.path.normpath(p) not in self._entries:
+                    self.upsert(p)
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, pending):
+        super().__init__()
+        self.pending = pending
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        self.pending.put(event.src_path)
+        dest = getattr(event, "dest_path", None)
+        if dest:
+            self.pending.put(dest)
+
+
+class LoraWatcher:
+    """
+    Watches `catalog.lora_dir` and reconciles changed paths into the catalog on a background thread.
+    Uses watchdog (inotify / ReadDirectoryChangesW / FSEvents) when installed, else polls.
+    """
+
+    def __init__(self, catalog, poll_interval=POLL_INTERVAL, use_watchdog=None):
+        self.catalog = catalog
+        self.poll_interval = poll_interval
+        self.use_watchdog = HAS_WATCHDOG if use_watchdog is None else use_watchdog
+        self._pending = queue.Queue()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def start(self):
+        if self.use_watchdog:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self._pending), self.catalog.lora_dir, recursive=True)
+            self._observer.start()
+            target = self._drain_events
+        else:
+            self._snapshot = dict(walk_model_files(self.catalog.lora_dir, LORA_EXTS))
+            target = self._poll
+        self._thread = threading.Thread(target=target, name="lora-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread:
+            self._thread.join()
+
+    def _drain_events(self):
+        while not self._stop.is_set():
+            try:
+                first = self._pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Coalesce a burst of events into one reconcile per path
+            paths = {first}
+            deadline = time.monotonic() + SETTLE_DELAY
+            while time.monotonic() < deadline:
+                try:
+                    paths.add(self._pending.get(timeout=max(deadline - time.monotonic(), 0.01)))
+                except queue.Empty:
+                    break
+
+            for path in sorted(paths):
+                try:
+                    self.catalog.reconcile(path)
+                except Exception as e:
+                    print(f"[⚠️ WATCHER] Failed to apply change for {path}: {e}")
+
+    def _poll(self):
+        snapshot = self._snapshot
+        while not self._stop.wait(self.poll_interval):
+            current = dict(walk_model_files(self.catalog.lora_dir, LORA_EXTS))
+            for path in snapshot.keys() - current.keys():
+                self.catalog.remove(path)
+            for path, signature in current.items():
+                if snapshot.get(path) != signature:
+                    self.catalog.upsert(path)
+            snapshot = current
+
+
+def start_lora_watcher(lora_dir, loras=None, poll_interval=POLL_INTERVAL, sync_wildcards=True):
+    """Build a catalog for `lora_dir` and start watching it. Returns (catalog, watcher)."""
+    catalog = LoraCatalog(lora_dir, loras=loras, sync_wildcards=sync_wildcards)
+    watcher = LoraWatcher(catalog, poll_interval=poll_interval).start()
+    return catalog, watcher
@@ -0,0 +1,190 @@
+# Persistent index of model/LORA entries so a Streamlit rerun doesn't have to re-read every sidecar.
+# Each file is keyed by its path plus the mtime/size of the model file and its .json/.info sidecars.
+# A rescan only stats the tree; entries are rebuilt (via model_loader) only for files whose signature changed.
+# Entries are kept in memory for the life of the process and persisted to SQLite in data/ for cold starts.
+# LORAs are stored as compact LoraRecords (hot fields only); their sidecar metadata is loaded on demand.
+
+import os
+import copy
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from generator.model_loader import build_lora_record, build_model_entry, LoraRecord
+from generator.hash_cache import attach_hashes
+
+INDEX_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "model_index.db")
+
+INDEX_VERSION = 2  # bump when entry building changes so cached entries get rebuilt
+SIDECAR_EXTS = (".json", ".info")
+LORA_EXTS = (".safetensors",)
+MODEL_EXTS = (".safetensors", ".ckpt")
+
+# (db_path, kind, root) -> {path: (signature, entry)}
+_MEMORY = {}
+# (db_path, kind, root) -> number of scans this process that changed an entry
+_VERSIONS = {}
+_LOCK = threading.Lock()
+
+
+def _connect(db_path):
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+            kind TEXT NOT NULL,
+            root TEXT NOT NULL,
+            path TEXT NOT NULL,
+            signature TEXT NOT NULL,
+            entry TEXT NOT NULL,
+            PRIMARY KEY (kind, path)
+        )
+    """)
+    return conn
+
+
+def _stat_key(entry):
+    st = entry.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def walk_model_files(top, exts):
+    """
+    Yield (full_path, signature) for every model file under `top`, in os.walk order.
+    The signature covers the file itself and its sidecars, using the directory listing
+    we already have instead of extra os.path.exists calls.
+    """
+    try:
+        with os.scandir(top) as it:
+            dir_entries = list(it)
+    except OSError:
+        return
+
+    by_name = {e.name: e for e in dir_entries}
+    subdirs = []
+
+    for e in dir_entries:
+        try:
+            if e.is_dir():
+                if not e.is_symlink():  # os.walk doesn't follow links either
+                    subdirs.append(e.path)
+                continue
+        except OSError:
+            continue
+
+        if not e.name.endswith(exts):
+            continue
+
+        try:
+            stem = os.path.splitext(e.name)[0]
+            signature = [INDEX_VERSION, _stat_key(e)]
+            for ext in SIDECAR_EXTS:
+                sidecar = by_name.get(stem + ext)
+                signature.append(_stat_key(sidecar) if sidecar else None)
+        except OSError:
+            continue
+
+        yield e.path, json.dumps(signature)
+
+    for sub in subdirs:
+        yield from walk_model_files(sub, exts)
+
+
+def _encode(entry):
+    return json.dumps(entry.to_dict() if isinstance(entry, LoraRecord) else entry)
+
+
+def _decode(kind, raw):
+    entry = json.loads(raw)
+    return LoraRecord.from_entry(entry) if kind == "lora" else entry
+
+
+def _load_rows(conn, kind, root):
+    rows = conn.execute(
+        "SELECT path, signature, entry FROM entries WHERE kind = ? AND root = ?", (kind, root)
+    ).fetchall()
+    return {path: (signature, _decode(kind, entry)) for path, signature, entry in rows}
+
+
+def _scan(kind, root_dir, exts, builder, db_path, workers=None):
+    root = os.path.abspath(root_dir)
+
+    with _LOCK:
+        conn = _connect(db_path)
+        try:
+            cache = _MEMORY.get((db_path, kind, root))
+            if cache is None:
+                cache = _MEMORY[(db_path, kind, root)] = _load_rows(conn, kind, root)
+
+            files = list(walk_model_files(root_dir, exts))
+            to_build = [(path, signature) for path, signature in files
+                        if path not in cache or cache[path][0] != signature]
+
+            if workers and len(to_build) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    built = list(executor.map(lambda item: builder(item[0], root_dir), to_build))
+            else:
+                built = [builder(path, root_dir) for path, _ in to_build]
+
+            changed = []
+            for (path, signature), entry in zip(to_build, built):
+                cache[path] = (signature, entry)
+                changed.append((kind, root, path, signature, _encode(entry)))
+
+            seen = {path for path, _ in files}
+            stale = [path for path in cache if path not in seen]
+            for path in stale:
+                del cache[path]
+
+            if changed or stale:
+                _VERSIONS[(db_path, kind, root)] = _VERSIONS.get((db_path, kind, root), 0) + 1
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries (kind, root, path, signature, entry) VALUES (?, ?, ?, ?, ?)",
+                        changed
+                    )
+                    conn.executemany(
+                        "DELETE FROM entries WHERE kind = ? AND path = ?",
+                        [(kind, path) for path in stale]
+                    )
+
+            entries = [cache[path][1] for path, _ in files]
+        finally:
+            conn.close()
+
+    # Callers (e.g. the selector) tweak weights on the entries they get back, so hand out copies
+    return [copy.copy(entry) for entry in entries]
+
+
+def get_indexed_loras(lora_dir, db_path=INDEX_DB_PATH, workers=None, with_hashes=False):
+    """Same entries as model_loader.get_available_loras(compact=True), served from the index where unchanged."""
+    loras = _scan("lora", lora_dir, LORA_EXTS, build_lora_record, db_path, workers)
+    if with_hashes:
+        attach_hashes(loras, compute=True)
+    return loras
+
+
+def index_version(root_dir, kind="lora", db_path=INDEX_DB_PATH):
+    """Goes up whenever a scan of `root_dir` changes, adds or drops an entry (process-local)."""
+    return _VERSIONS.get((db_path, kind, os.path.abspath(root_dir)), 0)
+
+
+def get_indexed_models(model_dir, db_path=INDEX_DB_PATH, workers=None, with_hashes=False):
+    """Same entries as model_loader.get_available_models, served from the index where unchanged."""
+    models = _scan("model", model_dir, MODEL_EXTS, build_model_entry, db_path, workers)
+    if with_hashes:
+        attach_hashes(models, compute=True)
+    return models
+
+
+def clear_index(db_path=INDEX_DB_PATH):
+    with _LOCK:
+        for key in [k for k in _MEMORY if k[0] == db_path]:
+            del _MEMORY[key]
+        conn = _connect(db_path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM entries")
+        finally:
+            conn.close()
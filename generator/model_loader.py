@@ -1,5 +1,10 @@
 import os
 import json
+from dataclasses import dataclass, field, replace
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from generator.safetensors_header import summarize_header
+from generator.hash_cache import attach_hashes, autov2
 
 # --- Normalization & Alias Helpers ---
 
@@ -30,108 +35,312 @@ def normalize_model_name(name):
     return name
 
 
+# --- Sidecar Reading ---
+
+DEFAULT_SCAN_WORKERS = 8
+LARGE_SIDECAR_BYTES = 4 * 1024 * 1024  # civitai .info files past this get parsed in a worker process
+
+
+def read_json_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_json_reader(process_pool=None, threshold=LARGE_SIDECAR_BYTES):
+    """
+    Returns a sidecar reader. With a process pool, sidecars at or above `threshold` bytes are
+    parsed in another process so one huge civitai dump doesn't hold the GIL for every scan thread.
+    """
+    if process_pool is None:
+        return read_json_file
+
+    def reader(path):
+        if os.path.getsize(path) >= threshold:
+            return process_pool.submit(read_json_file, path).result()
+        return read_json_file(path)
+
+    return reader
+
+
+# --- Directory Walking ---
+
+def _list_dir(path):
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    if e.is_dir():
+                        if not e.is_symlink():
+                            dirs.append(e.path)
+                    else:
+                        files.append(e.name)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return files, dirs
+
+
+def walk_files_parallel(top, exts, executor):
+    """
+    Like os.walk filtered to `exts`, but sibling directories are listed concurrently.
+    Paths come back in the same top-down order os.walk would give, so results stay deterministic.
+    """
+    pending = {top: executor.submit(_list_dir, top)}
+    stack = [top]
+    paths = []
+
+    while stack:
+        current = stack.pop()
+        files, dirs = pending.pop(current).result()
+        for d in dirs:
+            pending[d] = executor.submit(_list_dir, d)
+        paths.extend(os.path.join(current, f) for f in files if f.endswith(exts))
+        stack.extend(reversed(dirs))
+
+    return paths
+
+
+def scan_parallel(root_dir, exts, builder, workers=DEFAULT_SCAN_WORKERS, process_workers=0):
+    """
+    Walk `root_dir` and build entries on a thread pool (stats and sidecar reads are I/O-bound).
+    `process_workers` > 0 adds a process pool for parsing very large sidecars.
+    """
+    process_pool = ProcessPoolExecutor(max_workers=process_workers) if process_workers else None
+    try:
+        reader = make_json_reader(process_pool)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            paths = walk_files_parallel(root_dir, exts, executor)
+            return list(executor.map(lambda p: builder(p, root_dir, read_json=reader), paths))
+    finally:
+        if process_pool:
+            process_pool.shutdown()
+
+
 # --- Model Loader ---
 
-def get_available_models(model_dir):
-    models = []
-
-    for root, _, files in os.walk(model_dir):
-        for file in files:
-            if file.endswith((".safetensors", ".ckpt")):
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, model_dir)
-                base_name = os.path.splitext(rel_path)[0].replace("\\", "/")
-
-                metadata = {}
-                for ext in [".json", ".info"]:
-                    meta_path = os.path.join(root, os.path.splitext(file)[0] + ext)
-                    if os.path.exists(meta_path):
-                        try:
-                            with open(meta_path, "r", encoding="utf-8") as f:
-                                metadata = json.load(f)
-                        except:
-                            pass
-
-                models.append({
-                    "name": base_name,
-                    "file": full_path,
-                    "metadata": metadata
-                })
+def load_sidecar_metadata(file_path, read_json=read_json_file):
+    """Read the .json/.info sidecars next to a model file, later files winning."""
+    root, file = os.path.split(file_path)
+    metadata = {}
+    for ext in [".json", ".info"]:
+        meta_path = os.path.join(root, os.path.splitext(file)[0] + ext)
+        if os.path.exists(meta_path):
+            try:
+                metadata = read_json(meta_path)
+            except:
+                pass
+    return metadata
+
+
+def build_model_entry(full_path, model_dir, read_json=read_json_file):
+    rel_path = os.path.relpath(full_path, model_dir)
+    base_name = os.path.splitext(rel_path)[0].replace("\\", "/")
+    header = summarize_header(full_path)  # header bytes only, never the tensors
+
+    return {
+        "name": base_name,
+        "file": full_path,
+        "base_model": normalize_model_name(header.get("base_model")) or normalize_model_name(base_name),
+        "header": header,
+        "metadata": load_sidecar_metadata(full_path, read_json)
+    }
 
+
+def get_available_models(model_dir, workers=None, process_workers=0, with_hashes=False):
+    if workers:
+        models = scan_parallel(model_dir, (".safetensors", ".ckpt"), build_model_entry, workers, process_workers)
+    else:
+        models = []
+
+        for root, _, files in os.walk(model_dir):
+            for file in files:
+                if file.endswith((".safetensors", ".ckpt")):
+                    models.append(build_model_entry(os.path.join(root, file), model_dir))
+
+    if with_hashes:
+        attach_hashes(models, compute=True)
     return models
 
 # --- LORA Loader ---
 
-def get_available_loras(lora_dir):
-    loras = []
-
-    for root, _, files in os.walk(lora_dir):
-        for file in files:
-            if file.endswith(".safetensors"):
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, lora_dir)
-                base_name = os.path.splitext(rel_path)[0].replace("\\", "/")
-
-                lora_entry = {
-                    "name": base_name,
-                    "file": full_path,
-                    "activation": None,
-                    "weight": 1.0,
-                    "base_model": "",
-                    "tags": [],
-                    "metadata": {}
-                }
-
-                for ext in [".json", ".info"]:
-                    meta_path = os.path.join(root, os.path.splitext(file)[0] + ext)
-                    if os.path.exists(meta_path):
-                        try:
-                            with open(meta_path, "r", encoding="utf-8") as f:
-                                meta_data = json.load(f)
-
-                            lora_entry["metadata"].update(meta_data)
-
-                            possible_keys = ["activation text", "activation_text", "trigger", "trained words"]
-                            for key in possible_keys:
-                                if key in meta_data:
-                                    value = meta_data[key]
-                                    if isinstance(value, list) and value:
-                                        lora_entry["activation"] = value[0]  # Use first alias
-                                    elif isinstance(value, str):
-                                        lora_entry["activation"] = value.strip()
-                                    break
-                            if "preferred weight" in meta_data:
-                                lora_entry["weight"] = meta_data["preferred weight"]
-
-                            # Try to extract baseModel from all known locations
-                            model_block = meta_data.get("model", {})
-                            base_model_candidates = [
-                                model_block.get("baseModel"),
-                                model_block.get("baseModelType"),
-                                meta_data.get("baseModel"),
-                                meta_data.get("baseModelType"),
-                                meta_data.get("sd version")
-                            ]
-
-                            # Pick the first normalized, non-empty value
-                            for candidate in base_model_candidates:
-                                if candidate and str(candidate).lower() != "unknown":
-                                    norm = normalize_model_name(candidate)
-                                    if norm:
-                                        lora_entry["base_model"] = norm
-                                        break
-
-                            # Final fallback if nothing usable was found
-                            if not lora_entry["base_model"]:
-                                lora_entry["base_model"] = normalize_model_name(base_name)
-                      
-
-                            if "tags" in meta_data:
-                                lora_entry["tags"] = meta_data["tags"]
-
-                        except Exception as e:
-                            print(f"Error parsing metadata from {meta_path}: {e}")
-
-                loras.append(lora_entry)
+def build_lora_entry(full_path, lora_dir, read_json=read_json_file):
+    root, file = os.path.split(full_path)
+    rel_path = os.path.relpath(full_path, lora_dir)
+    base_name = os.path.splitext(rel_path)[0].replace("\\", "/")
+
+    lora_entry = {
+        "name": base_name,
+        "file": full_path,
+        "activation": None,
+        "weight": 1.0,
+        "base_model": "",
+        "tags": [],
+        "header": summarize_header(full_path),
+        "metadata": {}
+    }
+
+    for ext in [".json", ".info"]:
+        meta_path = os.path.join(root, os.path.splitext(file)[0] + ext)
+        if os.path.exists(meta_path):
+            try:
+                meta_data = read_json(meta_path)
+
+                lora_entry["metadata"].update(meta_data)
+
+                possible_keys = ["activation text", "activation_text", "trigger", "trained words"]
+                for key in possible_keys:
+                    if key in meta_data:
+                        value = meta_data[key]
+                        if isinstance(value, list) and value:
+                            lora_entry["activation"] = value[0]  # Use first alias
+                        elif isinstance(value, str):
+                            lora_entry["activation"] = value.strip()
+                        break
+                if "preferred weight" in meta_data:
+                    lora_entry["weight"] = meta_data["preferred weight"]
+
+                # Try to extract baseModel from all known locations
+                model_block = meta_data.get("model", {})
+                base_model_candidates = [
+                    model_block.get("baseModel"),
+                    model_block.get("baseModelType"),
+                    meta_data.get("baseModel"),
+                    meta_data.get("baseModelType"),
+                    meta_data.get("sd version")
+                ]
+
+                # Pick the first normalized, non-empty value
+                for candidate in base_model_candidates:
+                    if candidate and str(candidate).lower() != "unknown":
+                        norm = normalize_model_name(candidate)
+                        if norm:
+                            lora_entry["base_model"] = norm
+                            break
+
+                if "tags" in meta_data:
+                    lora_entry["tags"] = meta_data["tags"]
+
+            except Exception as e:
+                print(f"Error parsing metadata from {meta_path}: {e}")
+
+    # Final fallback if nothing usable was found: trust the training metadata
+    # in the file itself before guessing from the filename
+    if not lora_entry["base_model"]:
+        header_base = normalize_model_name(lora_entry["header"].get("base_model"))
+        lora_entry["base_model"] = header_base or normalize_model_name(base_name)
+
+    return lora_entry
+
+
+def load_lora_metadata(full_path, read_json=read_json_file):
+    """Merged .json + .info sidecar content for a LORA, as build_lora_entry stores it under "metadata"."""
+    root, file = os.path.split(full_path)
+    metadata = {}
+    for ext in [".json", ".info"]:
+        meta_path = os.path.join(root, os.path.splitext(file)[0] + ext)
+        if os.path.exists(meta_path):
+            try:
+                metadata.update(read_json(meta_path))
+            except Exception as e:
+                print(f"Error parsing metadata from {meta_path}: {e}")
+    return metadata
+
+
+@dataclass(slots=True)
+class LoraRecord:
+    """
+    Compact LORA entry: only the fields the selector uses stay in memory.
+    The full sidecar content (civitai image lists, HTML descriptions...) is read from disk the first
+    time `.metadata` is accessed. Supports the dict-style access the rest of the app uses on entries.
+    """
+    name: str
+    file: str
+    activation: str = None
+    weight: float = 1.0
+    base_model: str = ""
+    tags: list = field(default_factory=list)
+    header: dict = field(default_factory=dict)  # safetensors training metadata summary
+    sha256: str = None  # filled in from the hash cache, see hash_cache.attach_hashes
+    _metadata: dict = field(default=None, repr=False, compare=False)
+
+    HOT_FIELDS = ("name", "file", "activation", "weight", "base_model", "tags", "header", "sha256")
+
+    @classmethod
+    def from_entry(cls, entry):
+        return cls(**{k: entry[k] for k in cls.HOT_FIELDS if k in entry})
+
+    @property
+    def autov2(self):
+        return autov2(self.sha256)
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = load_lora_metadata(self.file)
+        return self._metadata
+
+    def drop_metadata(self):
+        self._metadata = None
+
+    def to_dict(self, with_metadata=False):
+        entry = {k: getattr(self, k) for k in self.HOT_FIELDS}
+        if with_metadata:
+            entry["metadata"] = self.metadata
+        return entry
+
+    def copy(self):
+        return replace(self)
+
+    # --- dict-style access ---
+
+    def __getitem__(self, key):
+        if key in ("metadata", "autov2") or key in self.HOT_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.HOT_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in ("metadata", "autov2") or key in self.HOT_FIELDS
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.HOT_FIELDS
+
+
+def build_lora_record(full_path, lora_dir, read_json=read_json_file):
+    return LoraRecord.from_entry(build_lora_entry(full_path, lora_dir, read_json))
+
+
+def get_available_loras(lora_dir, workers=None, process_workers=0, compact=False, with_hashes=False):
+    """
+    Scan `lora_dir` for LORA entries. Pass `workers` to scan on a thread pool (same entries, same order),
+    and `process_workers` to also parse very large sidecars in separate processes.
+    With `compact`, entries are LoraRecords that load their sidecar metadata on demand.
+    With `with_hashes`, entries get "sha256"/"autov2" (only new or changed files are actually hashed).
+    """
+    builder = build_lora_record if compact else build_lora_entry
+
+    if workers:
+        loras = scan_parallel(lora_dir, (".safetensors",), builder, workers, process_workers)
+    else:
+        loras = []
+
+        for root, _, files in os.walk(lora_dir):
+            for file in files:
+                if file.endswith(".safetensors"):
+                    loras.append(builder(os.path.join(root, file), lora_dir))
 
+    if with_hashes:
+        attach_hashes(loras, compute=True)
     return loras
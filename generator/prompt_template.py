@@ -0,0 +1,279 @@
+# Compiled super-prompt templates. resolve_prompt re-runs the pipe and wildcard regexes over the
+# template and over every chosen wildcard line, at every depth, for every prompt. Here each template
+# and each wildcard line is parsed once into segments (literal text, {a|b} pipes, N$$^^name^^
+# wildcards) and prompts are generated by walking those, with the same random calls in the same
+# order as resolve_prompt, so a given seed produces exactly the same prompt.
+#
+# Text whose structure depends on what a pipe picks (a pipe inside ^^...^^, pipe options containing
+# ^ $ or braces, a pipe glued to ^ or to a N$$ prefix...) compiles to a dynamic node that simply
+# hands that text to resolve_prompt, so odd templates keep their exact current behaviour.
+# {{lora::...}} blocks are still a post-pass (resolve_lora_blocks) over the finished prompt.
+#
+# SeededPrompts gives every prompt its own RNG derived from (template, wildcard snapshot, genre, seed,
+# index), so prompt #4711 of a run can be regenerated without the 4710 before it.
+
+import random
+import hashlib
+from functools import lru_cache
+
+from generator.wildcard_loader import (
+    WILDCARD_PATTERN, PIPE_PATTERN, resolve_prompt, resolve_pipes, resolve_lora_blocks,
+)
+from generator.wildcard_store import WILDCARD_STORE
+from generator.wildcard_weights import sample_options, choose_option
+
+LITERAL, PIPE, WILDCARD = 0, 1, 2
+
+# Stands in for a pipe while the wildcard regex is run over the template; never matched as ^, $ or a digit
+_PLACEHOLDER = "\x00"
+_PREFIX_CHARS = frozenset("0123456789$")
+
+
+def _parse(text, line):
+    """
+    Segments for `text`, or None if the wildcard structure can depend on pipe choices.
+    `line=True` is for wildcard lines, which resolve_prompt runs through the pipe regex twice.
+    """
+    pipes = []
+    skeleton = []
+    last = 0
+    for m in PIPE_PATTERN.finditer(text):
+        options = m.group(1).split("|")
+        for option in options:
+            if "^" in option or "$" in option:
+                return None  # a pick could create or change a wildcard
+            # A brace in an option can form a new pipe for the second pass; without one it finds nothing
+            if line and ("{" in option or "}" in option):
+                return None
+        skeleton.append(text[last:m.start()])
+        skeleton.append(_PLACEHOLDER)
+        pipes.append(tuple(options))
+        last = m.end()
+    skeleton.append(text[last:])
+    skeleton = "".join(skeleton)
+
+    # Map placeholder positions back to their pipes, then check every wildcard is made of literal text only
+    holes = [i for i, ch in enumerate(skeleton) if ch == _PLACEHOLDER]
+    for i in holes:
+        if (i > 0 and skeleton[i - 1] == "^") or (i + 1 < len(skeleton) and skeleton[i + 1] == "^"):
+            return None  # an empty pick would glue ^ characters together
+
+    segments = []
+    pipe_at = dict(zip(holes, pipes))
+    pos = 0
+
+    def add_literal_span(start, end):
+        chunk_start = start
+        for i in range(start, end):
+            if i in pipe_at:
+                if i > chunk_start:
+                    segments.append((LITERAL, skeleton[chunk_start:i]))
+                segments.append((PIPE, pipe_at[i]))
+                chunk_start = i + 1
+        if end > chunk_start:
+            segments.append((LITERAL, skeleton[chunk_start:end]))
+
+    for m in WILDCARD_PATTERN.finditer(skeleton):
+        if _PLACEHOLDER in m.group(0):
+            return None  # the wildcard name comes from a pipe
+        j = m.start() - 1
+        while j >= 0 and skeleton[j] in _PREFIX_CHARS:
+            j -= 1
+        if j >= 0 and skeleton[j] == _PLACEHOLDER and j + 1 < len(skeleton) and skeleton[j + 1] in _PREFIX_CHARS:
+            return None  # a picked digit or $ could become part of the N$$ prefix
+
+        add_literal_span(pos, m.start())
+        prefix, inner = m.groups()
+        count = int(prefix[:-2]) if prefix else 1
+        segments.append((WILDCARD, count, inner, m.group(0)))
+        pos = m.end()
+    add_literal_span(pos, len(skeleton))
+
+    return tuple(segments)
+
+
+class CompiledText:
+    """
+    Parsed text: `parts` with a slot for every pipe and wildcard, the pipe options (already stripped —
+    resolve_pipes strips the pick, which is the same thing) and the wildcards in the order they expand.
+    """
+    __slots__ = ("parts", "pipes", "wildcards", "const")
+
+    def __init__(self, segments):
+        self.parts = []
+        self.pipes = []  # (slot, options)
+        self.wildcards = []  # (slot, count, name, raw)
+        for seg in segments:
+            if seg[0] == LITERAL:
+                self.parts.append(seg[1])
+            elif seg[0] == PIPE:
+                self.pipes.append((len(self.parts), tuple(o.strip() for o in seg[1])))
+                self.parts.append(None)
+            else:
+                self.wildcards.append((len(self.parts),) + seg[1:])
+                self.parts.append(seg[3])
+        # Text with nothing to resolve is returned as is
+        self.const = "".join(self.parts) if not self.pipes and not self.wildcards else None
+
+
+@lru_cache(maxsize=65536)
+def compile_line(text):
+    """Compiled form of one wildcard line (None = dynamic, resolved through resolve_prompt)."""
+    segments = _parse(text, line=True)
+    return CompiledText(segments) if segments is not None else None
+
+
+@lru_cache(maxsize=1024)
+def compile_template(text):
+    """Compiled form of a template (None = dynamic, resolved through resolve_prompt)."""
+    segments = _parse(text, line=False)
+    return CompiledText(segments) if segments is not None else None
+
+
+class _Lookup(dict):
+    """name -> options for one genre, asked from the store once per batch."""
+
+    def __init__(self, store, genre):
+        super().__init__()
+        self.store = store
+        self.genre = genre
+
+    def __missing__(self, name):
+        options = self[name] = self.store.lookup(name, self.genre)
+        return options
+
+
+def _render(compiled, lookup, depth, rng):
+    """
+    Text after one pipe pass, with wildcards expanded if depth > 0 (left raw otherwise) —
+    resolve_prompt(resolve_pipes(line), genre, depth) for a line, resolve_prompt(template) at the top.
+    """
+    if compiled.const is not None:
+        return compiled.const
+
+    # All pipes are picked before any wildcard is expanded, as in resolve_prompt
+    parts = compiled.parts.copy()
+    choice = rng.choice
+    for slot, options in compiled.pipes:
+        parts[slot] = choice(options)
+
+    if depth > 0:
+        for slot, count, name, _ in compiled.wildcards:
+            parts[slot] = _expand(count, name, lookup, depth, rng)
+
+    return "".join(parts)
+
+
+def _expand(count, name, lookup, depth, rng):
+    options = lookup[name]
+    if options is None:
+        return f"[MISSING:{name}]"
+
+    n = min(count, len(options))
+    if n == 1:
+        # random.sample(seq, 1) and random.choice(seq) make the same single _randbelow(len(seq)) call
+        return _expand_line(choose_option(rng, options), lookup, depth, rng)
+    return ", ".join(filter(None, [_expand_line(line, lookup, depth, rng) for line in sample_options(rng, options, n)]))
+
+
+def _expand_line(line, lookup, depth, rng):
+    compiled = compile_line(line)
+    if compiled is None:
+        return resolve_prompt(resolve_pipes(line, rng), lookup.genre, depth - 1, rng=rng, store=lookup.store)
+    if compiled.const is not None:
+        return compiled.const
+    return _render(compiled, lookup, depth - 1, rng)
+
+
+def generate_prompt(text, genre="fantasy", max_depth=10, resolve_loras=False, rng=random, store=WILDCARD_STORE,
+                    lookup=None):
+    """
+    Drop-in for resolve_prompt (same arguments, same output for the same random state).
+    Pass the same `lookup` (a _Lookup) for a batch to look each wildcard name up only once.
+    """
+    if max_depth <= 0:
+        return text
+    compiled = compile_template(text)
+    if compiled is None:
+        result = resolve_prompt(text, genre, max_depth, rng=rng, store=store)
+    else:
+        result = _render(compiled, lookup if lookup is not None else _Lookup(store, genre), max_depth, rng)
+    if resolve_loras:
+        result = resolve_lora_blocks(result, rng=rng, store=store)
+    return result
+
+
+class PromptTemplate:
+    """A super prompt compiled once for a genre, for generating many prompts from it."""
+
+    def __init__(self, text, genre="fantasy", max_depth=10, store=WILDCARD_STORE):
+        self.text = text
+        self.genre = genre
+        self.max_depth = max_depth
+        self.store = store
+        self.compiled = compile_template(text)
+
+    @property
+    def is_static(self):
+        return self.compiled is not None
+
+    def generate(self, rng=random, resolve_loras=False, lookup=None):
+        return generate_prompt(self.text, self.genre, self.max_depth, resolve_loras, rng, self.store, lookup)
+
+    def lookup(self):
+        """A fresh per-batch wildcard lookup to pass to generate()."""
+        return _Lookup(self.store, self.genre)
+
+    def generate_many(self, n, rng=random, resolve_loras=False):
+        """n prompts; wildcard files are looked up once for the batch, so edits made during it aren't seen."""
+        lookup = self.lookup()
+        return [self.generate(rng, resolve_loras, lookup) for _ in range(n)]
+
+
+def prompt_seed(template_hash, snapshot, genre, seed, index):
+    """RNG seed of prompt `index` in seed-addressable mode."""
+    material = f"{template_hash}:{snapshot}:{genre}:{seed}:{index}".encode("utf-8")
+    return int.from_bytes(hashlib.sha256(material).digest()[:8], "big")
+
+
+class SeededPrompts:
+    """
+    Seed-addressable prompts: prompt i is a pure function of (template, wildcard snapshot, genre, seed, i),
+    so any index can be regenerated on its own, ranges can be split across workers and a saved job
+    only needs source(i). The snapshot is taken once; edit wildcard files and old indexes change.
+    """
+
+    def __init__(self, text, genre="fantasy", seed=0, max_depth=10, store=WILDCARD_STORE, snapshot=None):
+        self.template = PromptTemplate(text, genre, max_depth, store)
+        self.genre = genre
+        self.seed = seed
+        self.snapshot = snapshot if snapshot is not None else store.snapshot()
+        self.template_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def seed_for(self, index):
+        return prompt_seed(self.template_hash, self.snapshot, self.genre, self.seed, index)
+
+    def rng(self, index):
+        return random.Random(self.seed_for(index))
+
+    def prompt(self, index, resolve_loras=False, lookup=None):
+        return self.template.generate(self.rng(index), resolve_loras, lookup)
+
+    def prompts(self, start=0, stop=None, resolve_loras=False):
+        """Prompts start..stop-1 (forever if stop is None), lazily."""
+        lookup = self.template.lookup()
+        index = start
+        while stop is None or index < stop:
+            yield self.prompt(index, resolve_loras, lookup)
+            index += 1
+
+    def source(self, index):
+        """What to store with a job instead of its prompt; see matches()."""
+        return {
+            "template_hash": self.template_hash, "snapshot": self.snapshot,
+            "genre": self.genre, "seed": self.seed, "index": index,
+        }
+
+    def matches(self, source):
+        """True if source(i) from another run regenerates the same prompt here."""
+        return all(source.get(k) == v for k, v in self.source(source.get("index")).items())
@@ -0,0 +1,111 @@
+# Reads training metadata straight out of .safetensors files without touching tensor data.
+# A safetensors file starts with an 8-byte little-endian header length followed by a JSON header;
+# kohya-style trainers put their settings (base model, tag frequencies...) under "__metadata__".
+# Only those first bytes are read, so this stays cheap even for multi-GB checkpoints.
+
+import json
+import struct
+from collections import Counter
+
+MAX_HEADER_BYTES = 100 * 1024 * 1024  # anything bigger is a corrupt/foreign file, not a real header
+TRIGGER_WORD_COUNT = 5
+
+
+def read_header_bytes(f):
+    """Raw JSON header bytes from an open .safetensors file (positioned at 0), or None."""
+    prefix = f.read(8)
+    if len(prefix) < 8:
+        return None
+    (length,) = struct.unpack("<Q", prefix)
+    if length <= 0 or length > MAX_HEADER_BYTES:
+        return None
+    raw = f.read(length)
+    if len(raw) < length:
+        return None
+    return raw
+
+
+def read_safetensors_header(path):
+    """Return the parsed JSON header of a .safetensors file, or None if it can't be read."""
+    try:
+        with open(path, "rb") as f:
+            raw = read_header_bytes(f)
+        if raw is None:
+            return None
+        return json.loads(raw.decode("utf-8"))
+    except (OSError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def read_safetensors_metadata(path):
+    """The "__metadata__" block (all string values) of a .safetensors file, {} if absent."""
+    header = read_safetensors_header(path)
+    if not isinstance(header, dict):
+        return {}
+    metadata = header.get("__metadata__")
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def base_model_from_metadata(metadata):
+    """Base model ("flux", "sdxl", "pony", or the raw version string) from training metadata, "" if unknown."""
+    # Pony LORAs report plain SDXL as their base version, the checkpoint name gives them away
+    model_name = str(metadata.get("ss_sd_model_name", "")).lower()
+    if "pony" in model_name:
+        return "pony"
+
+    for key in ("ss_base_model_version", "modelspec.architecture"):
+        value = str(metadata.get(key, "")).lower()
+        if not value:
+            continue
+        if "flux" in value:
+            return "flux"
+        if "xl" in value:
+            return "sdxl"
+        return value.split("/")[0]
+
+    return ""
+
+
+def trigger_words_from_metadata(metadata, limit=TRIGGER_WORD_COUNT):
+    """Most frequent caption tags from kohya's ss_tag_frequency (JSON string of {dataset: {tag: count}})."""
+    raw = metadata.get("ss_tag_frequency")
+    if not raw:
+        return []
+    try:
+        datasets = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return []
+    if not isinstance(datasets, dict):  # "null", a list... from a malformed header
+        return []
+
+    counts = Counter()
+    for tags in datasets.values():
+        if isinstance(tags, dict):
+            for tag, count in tags.items():
+                tag = tag.strip()
+                if tag and isinstance(count, (int, float)):
+                    counts[tag] += count
+    return [tag for tag, _ in counts.most_common(limit)]
+
+
+def summarize_header(path):
+    """
+    Compact summary of a file's training metadata, small enough to keep on every catalog entry.
+    Returns {} for non-safetensors files or files without metadata.
+    """
+    if not path.endswith(".safetensors"):
+        return {}
+    metadata = read_safetensors_metadata(path)
+    if not metadata:
+        return {}
+
+    summary = {
+        "base_model": base_model_from_metadata(metadata),
+        "base_model_version": metadata.get("ss_base_model_version") or metadata.get("modelspec.architecture", ""),
+        "trigger_words": trigger_words_from_metadata(metadata),
+    }
+    if metadata.get("modelspec.title"):
+        summary["title"] = metadata["modelspec.title"]
+    if metadata.get("ss_network_module"):
+        summary["network_module"] = metadata["ss_network_module"]
+    return summary
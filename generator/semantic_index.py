@@ -0,0 +1,280 @@
+# Offline "semantic" prompt -> LORA matching. Every LORA gets a small document built from its
+# lora_tags.json entry, activation/trained words, civitai description and example image prompts;
+# documents are turned into TF-IDF vectors over hashed character n-grams (plus whole words), so
+# near spellings ("cyberpunk"/"cyber-punk", "samurai"/"samurais") and words that only show up in
+# a LORA's description or example prompts ("ronin", "neon city") still find it.
+# The matrix is saved as a compressed .npz next to the model index and queried with one sparse
+# product per prompt; no network, no GPU, no model download.
+#
+# Usage: python -m generator.semantic_index <lora_folder> [--query "a ronin in the rain"]
+
+import os
+import re
+import sys
+import html
+import json
+import math
+import time
+import zlib
+import hashlib
+import argparse
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+
+from generator.lora_selector import TAGS, TAGS_PATH
+from generator.lora_tag_store import normalize_key
+
+SEMANTIC_INDEX_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "lora_semantic.npz")
+N_FEATURES = 2 ** 18
+NGRAM_RANGE = (3, 5)
+MIN_SEMANTIC_SCORE = 0.05  # cosine below this is noise, not a match
+EXAMPLE_PROMPTS = 5  # civitai example image prompts used per LORA
+TAG_REPEAT = 2  # curated tags count double against free-text descriptions
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _feature_id(text):
+    # crc32 rather than hash(): str hashes are salted per process and the index lives on disk
+    return zlib.crc32(text.encode("utf-8")) & (N_FEATURES - 1)
+
+
+@lru_cache(maxsize=100000)
+def _word_features(word):
+    """Feature ids for one word: the word itself plus its character n-grams (padded with spaces)."""
+    features = [_feature_id("w:" + word)]
+    padded = f" {word} "
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        features.extend(_feature_id(padded[i:i + n]) for i in range(len(padded) - n + 1))
+    return tuple(features)
+
+
+def text_features(text):
+    """Counter of hashed feature ids for a piece of text."""
+    counts = Counter()
+    for word in _TOKEN_RE.findall(text.lower()):
+        counts.update(_word_features(word))
+    return counts
+
+
+def _tag_values(entry):
+    values = []
+    for group in ("genre", "style", "subject", "tone"):
+        values.extend(str(tag) for tag in entry.get(group, []) if isinstance(tag, str))
+    if isinstance(entry.get("activation"), str):
+        values.append(entry["activation"])
+    return values
+
+
+def lora_document(lora, tags=TAGS):
+    """All the text we know about one LORA, as a single string."""
+    parts = [os.path.basename(lora["name"]).replace("_", " ").replace("-", " ")]
+
+    tag_entry = tags.get(normalize_key(lora["name"]))  # tag keys use backslashes
+    if isinstance(tag_entry, dict):
+        parts.extend(_tag_values(tag_entry) * TAG_REPEAT)
+
+    if lora.get("activation"):
+        parts.append(str(lora["activation"]))
+    parts.extend(str(tag) for tag in lora.get("tags") or [] if isinstance(tag, str))
+    parts.extend((lora.get("header") or {}).get("trigger_words", []))
+
+    metadata = lora.get("metadata") or {}
+    model_block = metadata.get("model") if isinstance(metadata.get("model"), dict) else {}
+    for value in (model_block.get("name"), metadata.get("description"), metadata.get("notes")):
+        if isinstance(value, str):
+            parts.append(html.unescape(_HTML_TAG_RE.sub(" ", value)))
+    for words in (metadata.get("trainedWords"), metadata.get("trained words")):
+        if isinstance(words, list):
+            parts.extend(str(w) for w in words)
+
+    for image in (metadata.get("images") or [])[:EXAMPLE_PROMPTS]:
+        meta = image.get("meta") if isinstance(image, dict) else None
+        if isinstance(meta, dict) and isinstance(meta.get("prompt"), str):
+            parts.append(meta["prompt"])
+
+    return " ".join(parts)
+
+
+def _sublinear(counts):
+    ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    return ids, 1.0 + np.log(tf)
+
+
+def library_signature(loras):
+    """Changes whenever a LORA, one of its sidecars or lora_tags.json changes."""
+    digest = hashlib.sha1()
+    for path in (TAGS_PATH,):
+        try:
+            digest.update(str(os.stat(path).st_mtime_ns).encode())
+        except OSError:
+            pass
+    for lora in sorted(loras, key=lambda l: l["name"]):
+        digest.update(lora["name"].encode("utf-8"))
+        stem = os.path.splitext(lora.get("file") or "")[0]
+        for path in (lora.get("file"), stem + ".json", stem + ".info"):
+            try:
+                st = os.stat(path)
+                digest.update(f"{st.st_mtime_ns}:{st.st_size}".encode())
+            except (OSError, TypeError):
+                digest.update(b"-")
+    return digest.hexdigest()
+
+
+def library_key(version):
+    """
+    Cheap stand-in for library_signature() between reruns: `version` of the LoraCatalog or model
+    index the LORAs came from, plus lora_tags.json's mtime. One stat instead of three per LORA.
+    """
+    try:
+        tags_mtime = os.stat(TAGS_PATH).st_mtime_ns
+    except OSError:
+        tags_mtime = None
+    return version, tags_mtime
+
+
+class SemanticIndex:
+    def __init__(self, names, matrix, idf, signature=""):
+        self.names = list(names)
+        self.rows = {name: i for i, name in enumerate(self.names)}
+        self.matrix = matrix.tocsr()  # LORAs x features, rows L2-normalized
+        self.idf = idf
+        self.signature = signature
+        # features x LORAs, so a query only touches the rows of the features it contains
+        self._by_feature = self.matrix.T.tocsr()
+
+    @classmethod
+    def build(cls, loras, tags=TAGS):
+        names, rows, cols, vals = [], [], [], []
+        doc_freq = Counter()
+        docs = []
+        for lora in loras:
+            counts = text_features(lora_document(lora, tags))
+            if not counts:
+                continue
+            names.append(lora["name"])
+            docs.append(counts)
+            doc_freq.update(counts.keys())
+
+        n_docs = len(docs)
+        idf = np.zeros(N_FEATURES, dtype=np.float32)
+        for feature, df in doc_freq.items():
+            idf[feature] = math.log((1 + n_docs) / (1 + df)) + 1.0
+
+        for row, counts in enumerate(docs):
+            ids, tf = _sublinear(counts)
+            weights = tf * idf[ids]
+            weights /= np.linalg.norm(weights) or 1.0
+            rows.append(np.full(len(ids), row, dtype=np.int64))
+            cols.append(ids)
+            vals.append(weights)
+
+        matrix = sparse.csr_matrix(
+            (np.concatenate(vals) if vals else np.zeros(0, dtype=np.float32),
+             (np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64),
+              np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64))),
+            shape=(n_docs, N_FEATURES), dtype=np.float32,
+        )
+        return cls(names, matrix, idf, library_signature(loras))
+
+    def save(self, path=SEMANTIC_INDEX_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(
+            path,
+            data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape), idf=self.idf,
+            names=np.array(json.dumps(self.names)), signature=np.array(self.signature),
+        )
+
+    @classmethod
+    def load(cls, path=SEMANTIC_INDEX_PATH):
+        with np.load(path) as f:
+            matrix = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            return cls(json.loads(str(f["names"])), matrix, f["idf"], str(f["signature"]))
+
+    def query_vector(self, text):
+        """(feature ids, weights) of the L2-normalized TF-IDF vector for `text`."""
+        counts = text_features(text)
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        ids, tf = _sublinear(counts)
+        weights = tf * self.idf[ids]
+        keep = weights > 0  # features no LORA has can't contribute
+        ids, weights = ids[keep], weights[keep]
+        norm = np.linalg.norm(weights)
+        return ids, (weights / norm if norm else weights)
+
+    def scores(self, text):
+        """Cosine similarity of `text` to every LORA, in self.names order."""
+        ids, weights = self.query_vector(text)
+        if not len(ids):
+            return np.zeros(len(self.names), dtype=np.float32)
+        return self._by_feature[ids].T @ weights
+
+    def top_k(self, text, k=10):
+        """[(name, score), ...] for the k best-matching LORAs, best first."""
+        scores = self.scores(text)
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.names[i], float(scores[i])) for i in best if scores[i] >= MIN_SEMANTIC_SCORE]
+
+    def score_pool(self, pool, scores, min_score=MIN_SEMANTIC_SCORE):
+        """[(lora, score), ...] for pool members scoring at least min_score, best first, ties in pool order."""
+        scored = []
+        for lora in pool:
+            row = self.rows.get(lora["name"])
+            if row is not None and scores[row] >= min_score:
+                scored.append((lora, float(scores[row])))
+        scored.sort(key=lambda x: -x[1])
+        return scored
+
+
+def load_or_build(loras, path=SEMANTIC_INDEX_PATH):
+    """The saved index if it still matches `loras` and lora_tags.json, otherwise a fresh (saved) one."""
+    if os.path.exists(path):
+        try:
+            index = SemanticIndex.load(path)
+            if index.signature == library_signature(loras):
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[⚠️ SEMANTIC] Could not load {path}: {e}")
+
+    index = SemanticIndex.build(loras)
+    index.save(path)
+    return index
+
+
+def main():
+    from generator.model_loader import get_available_loras
+
+    parser = argparse.ArgumentParser(description="Build the semantic LORA index and optionally query it.")
+    parser.add_argument("lora_folder")
+    parser.add_argument("--query", action="append", default=[])
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    loras = get_available_loras(args.lora_folder, compact=True)
+    start = time.perf_counter()
+    index = load_or_build(loras)
+    size_kb = os.path.getsize(SEMANTIC_INDEX_PATH) / 1024
+    print(f"[🔮] {len(index.names)} LORAs indexed ({index.matrix.nnz} weights, {size_kb:.0f} KB on disk) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    for query in args.query:
+        start = time.perf_counter()
+        best = index.top_k(query, args.k)
+        print(f"\n🔎 {query}  ({(time.perf_counter() - start) * 1000:.2f} ms)")
+        for name, score in best:
+            print(f"   {score:.3f}  {name}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# Inverted index over lora_tags.json so keyword scoring doesn't rebuild and scan a tag string
+# for every LORA in the pool on every pick. Built once from the tag data; each keyword is
+# resolved to the set of LORAs it matches the first time it is seen and memoized after that.
+#
+# substring=True reproduces score_lora_relevance exactly ("war" matches "warrior"),
+# substring=False matches whole tag tokens only, which is stricter but needs no scan at all.
+
+from collections import defaultdict
+
+from generator.lora_tag_store import normalize_key
+
+MAX_MEMO_KEYWORDS = 50000  # memoized keyword lookups before the memo is reset
+
+
+class TagIndex:
+    def __init__(self, tags, stop_words=(), substring=True):
+        self.substring = substring
+        self.stop_words = frozenset(stop_words)
+        self._tag_strings = {}
+        self._tokens = defaultdict(set)
+        self._memo = {}
+
+        # Keyed like LoraTagStore lookups, so "Flux/x" and "Flux\\x" name the same LORA (last one wins)
+        for key, entry in {normalize_key(k): v for k, v in tags.items()}.items():
+            if not isinstance(entry, dict) or not entry:
+                continue
+            all_tags = []
+            for group in ("genre", "style", "subject", "tone"):
+                all_tags.extend(entry.get(group, []))
+            tag_string = " ".join(str(tag).lower() for tag in all_tags)
+            self._tag_strings[key] = tag_string
+            for token in tag_string.split():
+                self._tokens[token].add(key)
+
+    @staticmethod
+    def key_for(lora):
+        return normalize_key(lora["name"])  # tag keys use backslashes
+
+    def lookup(self, keyword):
+        """Tag keys of every LORA the keyword matches."""
+        if not self.substring:
+            return self._tokens.get(keyword, frozenset())
+
+        hits = self._memo.get(keyword)
+        if hits is None:
+            if len(self._memo) >= MAX_MEMO_KEYWORDS:
+                self._memo.clear()
+            # A keyword has no spaces, so it can only ever match inside one token
+            hits = frozenset(
+                key for token, keys in self._tokens.items() if keyword in token for key in keys
+            )
+            self._memo[keyword] = hits
+        return hits
+
+    def _keyword_hits(self, keywords):
+        hits = {}
+        for kw in keywords:
+            if kw in self.stop_words:
+                continue
+            keys = self.lookup(kw)
+            if keys:
+                hits[kw] = keys
+        return hits
+
+    def score(self, lora, keywords):
+        """Same (count, matched_keywords) result as lora_selector.score_lora_relevance."""
+        key = self.key_for(lora)
+        if key not in self._tag_strings:
+            return 0, []
+        matched = [kw for kw, keys in self._keyword_hits(keywords).items() if key in keys]
+        return len(matched), matched
+
+    def score_pool(self, pool, keywords):
+        """[(lora, count, matched_keywords), ...] for a whole category pool, keyword lookups done once."""
+        hits = self._keyword_hits(keywords)
+        pool_keys = [self.key_for(lora) for lora in pool]
+
+        matched_by_key = defaultdict(list)
+        if hits:
+            in_pool = set(pool_keys)
+            for kw, keys in hits.items():
+                for key in keys & in_pool:
+                    matched_by_key[key].append(kw)
+
+        scored = []
+        for lora, key in zip(pool, pool_keys):
+            matched = list(matched_by_key.get(key, ()))
+            scored.append((lora, len(matched), matched))
+        return scored
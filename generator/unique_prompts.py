@@ -0,0 +1,255 @@
+# Batches without repeated prompts.
+# A prompt is identified by its choice vector: every pipe option and wildcard line picked while it
+# was generated, in order. unique_prompts() keeps the hashes of the vectors it has handed out and
+# skips repeats. TemplateSpace counts how many distinct vectors a template has (from the wildcard
+# file lengths) and, where the structure allows, maps a number in range(size) straight to its
+# prompt. When a batch asks for a good share of the space, rejection sampling would spend most of
+# its draws on repeats, so the ranks are sampled without replacement (or all enumerated) instead.
+#
+# Repeated lines in a wildcard file (the old way to bias a pick) are counted once, and a prompt text
+# that was already handed out is skipped whichever way it was produced.
+#
+# Prompts stay addressable: {"index": i} is SeededPrompts.prompt(i), {"rank": r} is unrank(r).
+
+import json
+import random
+import hashlib
+from bisect import bisect_right
+
+from generator.prompt_template import compile_line, compile_template
+from generator.wildcard_loader import resolve_lora_blocks
+
+ENUMERATE_FRACTION = 0.5  # enumerate once a batch needs this share of the space
+MAX_ATTEMPTS_PER_PROMPT = 50  # rejection sampling gives up after count * this many draws
+
+
+class ChoiceRecorder(random.Random):
+    """random.Random that also records what choice()/sample() returned; the random stream is unchanged."""
+
+    def __init__(self, x=None):
+        super().__init__(x)
+        self.choices = []
+        self.recording = True
+
+    def choice(self, seq):
+        picked = super().choice(seq)
+        if self.recording:
+            self.choices.append(picked)
+        return picked
+
+    def sample(self, population, k, **kwargs):
+        picked = super().sample(population, k, **kwargs)
+        if self.recording:
+            self.choices.append(tuple(picked))
+        return picked
+
+    def record(self, picked):
+        """Called by wildcard_weights for draws from weighted files, which don't go through choice()/sample()."""
+        if self.recording:
+            self.choices.append(picked)
+
+    def digest(self):
+        return hashlib.sha1(json.dumps(self.choices, ensure_ascii=False).encode("utf-8")).digest()
+
+
+def _elementary_symmetric(sizes, k):
+    """e_k of `sizes`: ways to pick k distinct lines, weighted by how many variants each line has."""
+    e = [1] + [0] * k
+    for s in sizes:
+        for j in range(k, 0, -1):
+            e[j] += e[j - 1] * s
+    return e[k]
+
+
+class TemplateSpace:
+    """
+    Number of distinct choice vectors of a template (`size`, None if it can't be counted because a
+    part of it resolves dynamically) and, if `enumerable`, unrank(r) for every r in range(size).
+    """
+
+    def __init__(self, text, genre="fantasy", max_depth=10, lookup=None):
+        self.text = text
+        self.genre = genre
+        self.max_depth = max_depth
+        self.lookup = lookup
+        self._line_memo = {}
+        self._wildcard_memo = {}
+        self._options_memo = {}
+        self.enumerable = True
+        self.weighted = False  # some list has line weights or repeats: ranks aren't equally likely prompts
+
+        if max_depth <= 0:
+            self.compiled, self.size = None, 1
+        else:
+            self.compiled = compile_template(text)
+            self.size = None if self.compiled is None else self._size(self.compiled, max_depth)
+        if self.size is None:
+            self.enumerable = False
+
+    def _size(self, compiled, depth):
+        size = 1
+        for _, options in compiled.pipes:
+            size *= len(options)
+        if depth > 0:
+            for _, count, name, _ in compiled.wildcards:
+                sub = self._wildcard(count, name, depth)[0]
+                if sub is None:
+                    return None
+                size *= sub
+        return size
+
+    def _line_size(self, line, depth):
+        key = (line, depth)
+        if key not in self._line_memo:
+            compiled = compile_line(line)
+            self._line_memo[key] = None if compiled is None else self._size(compiled, depth)
+        return self._line_memo[key]
+
+    def _options(self, name):
+        """(distinct lines of wildcard `name` in file order, whether some line repeats), or (None, False)."""
+        if name not in self._options_memo:
+            options = self.lookup[name]
+            if options is None:
+                self._options_memo[name] = (None, False)
+            else:
+                distinct = tuple(dict.fromkeys(options))
+                repeats = len(distinct) < len(options)
+                if repeats or getattr(options, "sampler", None) is not None:
+                    self.weighted = True
+                self._options_memo[name] = (distinct, repeats)
+        return self._options_memo[name]
+
+    def _wildcard(self, count, name, depth):
+        """(size, cumulative line sizes) of one N$$^^name^^ expanded at `depth`."""
+        key = (count, name, depth)
+        if key in self._wildcard_memo:
+            return self._wildcard_memo[key]
+
+        options, repeats = self._options(name)
+        n = min(count, len(options)) if options is not None else 0
+        if n > 1 and repeats:
+            self.enumerable = False  # sample() can pick a repeated line twice: "red, red" isn't counted
+        result = (1, None)
+        if n:
+            sizes = [self._line_size(line, depth - 1) for line in options]
+            if any(s is None for s in sizes):
+                result = (None, None)
+            elif n == 1:
+                cumulative, total = [], 0
+                for s in sizes:
+                    total += s
+                    cumulative.append(total)
+                result = (total, cumulative)
+            else:
+                # k lines in sample order; unranking is only implemented when no line has variants
+                total = _elementary_symmetric(sizes, n)
+                for i in range(n):
+                    total *= i + 1
+                if any(s != 1 for s in sizes):
+                    self.enumerable = False
+                result = (total, None)
+        self._wildcard_memo[key] = result
+        return result
+
+    def unrank(self, rank):
+        """The prompt with choice vector number `rank` (0 <= rank < size)."""
+        if not self.enumerable:
+            raise ValueError("template space can't be enumerated")
+        if self.compiled is None:
+            return self.text
+        return self._unrank(self.compiled, self.max_depth, rank)
+
+    def _unrank(self, compiled, depth, rank):
+        if compiled.const is not None:
+            return compiled.const
+        parts = compiled.parts.copy()
+        for slot, options in compiled.pipes:
+            rank, i = divmod(rank, len(options))
+            parts[slot] = options[i]
+        if depth > 0:
+            for slot, count, name, _ in compiled.wildcards:
+                size = self._wildcard(count, name, depth)[0]
+                rank, sub = divmod(rank, size)
+                parts[slot] = self._unrank_wildcard(count, name, depth, sub)
+        return "".join(parts)
+
+    def _unrank_wildcard(self, count, name, depth, rank):
+        options = self._options(name)[0]
+        if options is None:
+            return f"[MISSING:{name}]"
+        n = min(count, len(options))
+        if n == 0:
+            return ""
+        if n == 1:
+            cumulative = self._wildcard(count, name, depth)[1]
+            i = bisect_right(cumulative, rank)
+            rank -= cumulative[i - 1] if i else 0
+            return self._unrank(compile_line(options[i]), depth - 1, rank)
+
+        # Ordered pick of n distinct (constant) lines: mixed-radix digits over the lines still left
+        remaining = list(range(len(options)))
+        picked = []
+        for _ in range(n):
+            rank, i = divmod(rank, len(remaining))
+            picked.append(remaining.pop(i))
+        texts = (self._unrank(compile_line(options[i]), depth - 1, 0) for i in picked)
+        return ", ".join(filter(None, texts))
+
+
+def unique_prompts(source, count, resolve_loras=False, enumerate_fraction=ENUMERATE_FRACTION,
+                   max_attempts=None):
+    """
+    Up to `count` prompts from a SeededPrompts `source`, no two alike (same choice vector or same text).
+    Returns ([(prompt, address), ...], info); fewer prompts than asked if the space runs out.
+    info: {"space": size or None, "mode": "rejection" | "sampled" | "enumerated", "rejected": n}
+    """
+    lookup = source.template.lookup()
+    space = TemplateSpace(source.template.text, source.genre, source.template.max_depth, lookup)
+    info = {"space": space.size, "mode": "rejection", "rejected": 0}
+
+    # Sampling ranks would ignore line weights; enumerating the whole space doesn't care
+    if space.enumerable and count / enumerate_fraction >= space.size and (count >= space.size or not space.weighted):
+        # The space is at most count / enumerate_fraction ranks here, so shuffling all of them is cheap;
+        # ranks whose prompt text repeats an earlier one are skipped and the next ones used instead
+        ranks = list(range(space.size))
+        random.Random(source.seed_for("ranks")).shuffle(ranks)
+        info["mode"] = "enumerated" if count >= space.size else "sampled"
+
+        results = []
+        texts = set()
+        for r in ranks:
+            if len(results) >= count:
+                break
+            prompt = space.unrank(r)
+            if prompt in texts:
+                info["rejected"] += 1
+                continue
+            texts.add(prompt)
+            if resolve_loras:
+                prompt = resolve_lora_blocks(prompt, rng=source.rng(f"rank{r}"), store=source.template.store)
+            results.append((prompt, {"rank": r}))
+        return results, info
+
+    if space.size is not None:
+        count = min(count, space.size)
+    max_attempts = max_attempts if max_attempts is not None else count * MAX_ATTEMPTS_PER_PROMPT
+
+    seen = set()
+    texts = set()
+    results = []
+    index = 0
+    while len(results) < count and index < max_attempts:
+        rng = ChoiceRecorder(source.seed_for(index))
+        prompt = source.template.generate(rng, lookup=lookup)
+        digest = rng.digest()
+        if digest in seen or prompt in texts:
+            info["rejected"] += 1
+        else:
+            seen.add(digest)
+            texts.add(prompt)
+            if resolve_loras:
+                rng.recording = False
+                prompt = resolve_lora_blocks(prompt, rng=rng, store=source.template.store)
+            results.append((prompt, {"index": index}))
+        index += 1
+    return results, info
@@ -3,16 +3,19 @@
 # and writes the wildcards to text files in a specified directory.
 
 import os
-import json
 import yaml
 
+from generator.wildcard_store import WILDCARD_STORE
+from generator.lora_tag_store import LORA_TAGS, TAGS_PATH
+from generator.wildcard_weights import split_weight
+
 # --- CONFIG LOADING ---
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "config.yaml")
 
 with open(CONFIG_PATH, "r") as f:
     config = yaml.safe_load(f)
 
-LORA_TAGS_PATH = os.path.join(os.path.dirname(__file__), "lora_tags.json")
+LORA_TAGS_PATH = TAGS_PATH
 LORA_DIR = config["paths"]["lora_folder"]
 WILDCARD_BASE = os.path.abspath(os.path.join(
     os.path.dirname(CONFIG_PATH),
@@ -25,15 +28,12 @@ DEFAULT_WEIGHT = 0.7  # fallback if no weight set
 
 
 def load_lora_tags():
-    if not os.path.exists(LORA_TAGS_PATH):
-        return {}
-    with open(LORA_TAGS_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """A modifiable copy of the shared tags ({} if there's no lora_tags.json yet)."""
+    return LORA_TAGS.snapshot()
 
 
 def save_lora_tags(tags):
-    with open(LORA_TAGS_PATH, "w", encoding="utf-8") as f:
-        json.dump(tags, f, indent=2)
+    LORA_TAGS.save(tags)
 
 def normalize_tag_keys(tags):
     """Move any flat entries like preferred_weight into their correct nested keys."""
@@ -51,26 +51,33 @@ def normalize_tag_keys(tags):
             normalized[new_key].update(value)
     return normalized
 
+def lora_index_entry(full_path):
+    """Index key and metadata for a single LORA file, or (None, None) if it isn't model/category/lora."""
+    rel_path = os.path.relpath(full_path, LORA_DIR)
+    parts = rel_path.split(os.sep)
+    if len(parts) < 3:
+        return None, None  # Skip anything not model/category/lora
+    base_model = parts[0]
+    category = parts[1]
+    key = rel_path.replace("/", "\\\\").replace(".safetensors", "")  # for build_lora_index()
+    return key, {
+        "file": full_path,
+        "name": os.path.splitext(os.path.basename(full_path))[0],
+        "category": category,
+        "base_model": base_model,
+    }
+
+
 def build_lora_index():
     index = {}
     for root, _, files in os.walk(LORA_DIR):
         for f in files:
             if not f.endswith(".safetensors"):
                 continue
-            full_path = os.path.join(root, f)
-            rel_path = os.path.relpath(full_path, LORA_DIR)
-            parts = rel_path.split(os.sep)
-            if len(parts) < 3:
-                continue  # Skip anything not model/category/lora
-            base_model = parts[0]
-            category = parts[1]
-            key = rel_path.replace("/", "\\\\").replace(".safetensors", "")  # for build_lora_index()
-            index[key] = {
-                "file": full_path,
-                "name": os.path.splitext(f)[0],
-                "category": category,
-                "base_model": base_model,
-            }
+            key, meta = lora_index_entry(os.path.join(root, f))
+            if key is None:
+                continue
+            index[key] = meta
     return index
 
 
@@ -114,14 +121,17 @@ def write_wildcards(lora_index, tags):
             with open(out_path, "r", encoding="utf-8") as f:
                 existing = [line.strip() for line in f if line.strip() and not line.startswith("#")]
 
-        updated = [e for e in existing if e in entries]  # keep known
-        added = [e for e in entries if e not in updated]  # add new
+        # Lines are compared without their weight:: prefix, and kept with it
+        updated = [e for e in existing if split_weight(e)[1] in entries]  # keep known
+        kept = {split_weight(e)[1] for e in updated}
+        added = [e for e in entries if e not in kept]  # add new
         removed = len(existing) - len(updated)
         final = updated + added
 
         with open(out_path, "w", encoding="utf-8") as f:
             for line in final:
                 f.write(line + "\n")
+        WILDCARD_STORE.invalidate(out_path)
 
         total_added += len(added)
         total_removed += removed
@@ -129,6 +139,69 @@ def write_wildcards(lora_index, tags):
     return total_added, total_removed
 
 
+def _wildcard_file(meta):
+    model = meta["base_model"].lower()
+    category = meta["category"].lower().replace(" ", "_")
+    return os.path.join(WILDCARD_BASE, model, f"{category}.txt")
+
+
+def _read_wildcard_lines(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _write_wildcard_lines(path, lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+    WILDCARD_STORE.invalidate(path)
+
+
+def add_wildcard_entry(full_path, tags=None):
+    """
+    Incremental counterpart of main() for a single new LORA file: make sure it has a tag entry
+    and that its activation is listed in wildcards/loras/<model>/<category>.txt.
+    Returns True if the wildcard file changed.
+    """
+    key, meta = lora_index_entry(full_path)
+    if key is None:
+        return False
+
+    tags = load_lora_tags() if tags is None else tags
+    if update_tags_with_defaults({key: meta}, tags):
+        save_lora_tags(tags)
+
+    activation = tags[key]["activation"]
+    out_path = _wildcard_file(meta)
+    existing = _read_wildcard_lines(out_path)
+    if activation in {split_weight(e)[1] for e in existing}:  # "3::x" lists x
+        return False
+
+    _write_wildcard_lines(out_path, existing + [activation])
+    return True
+
+
+def remove_wildcard_entry(full_path, tags=None):
+    """Drop a deleted LORA's activation from its wildcard file. Returns True if the file changed."""
+    key, meta = lora_index_entry(full_path)
+    if key is None:
+        return False
+
+    tags = load_lora_tags() if tags is None else tags
+    activation = tags.get(key, {}).get("activation", meta["name"])
+    out_path = _wildcard_file(meta)
+    existing = _read_wildcard_lines(out_path)
+    remaining = [e for e in existing if split_weight(e)[1] != activation]  # "3::x" lists x
+    if len(remaining) == len(existing):
+        return False
+
+    _write_wildcard_lines(out_path, remaining)
+    return True
+
+
 def main():
     tags = load_lora_tags()
     tags = normalize_tag_keys(tags)
@@ -0,0 +1,313 @@
+# Packed, memory-mapped form of the wildcards/ tree.
+# Every .txt list (genre folders, common/, loras/<model>/...) is packed into one file: a table of
+# lists, a table of line offsets and a UTF-8 string heap. Opening it is one mmap plus reading the
+# list table; a line is only decoded when it is drawn, and worker processes share the pages.
+# The .txt files stay the source of truth: the bundle records a signature of the tree (path, mtime
+# and size of every file) and BundleStore rebuilds it when that changes. Each rebuild goes to a new
+# file named after the signature (data/wildcards.<signature>.bundle), so a file another process or
+# an earlier batch still has mapped is never replaced; a replaced bundle stays open until the last
+# list taken from it is gone, and old files are deleted once nothing maps them.
+#
+# Lines are stored with their `weight::` prefix already parsed (see wildcard_weights); lists with
+# weighted lines keep the weights in a separate f64 section and get their sampler on first draw.
+#
+# Layout (little-endian):
+#   header   MAGIC, version u32, n_lists u32, n_lines u32, n_weights u32, signature 32 bytes
+#   lists    n_lists x (name_start u32, name_len u32, first_line u32, line_count u32, first_weight i32 or -1)
+#   offsets  (n_lines + 1) x u64, heap offsets of each line (line i = heap[off[i]:off[i + 1]])
+#   weights  n_weights x f64
+#   heap     list names, then lines, UTF-8
+#
+# Usage: python -m generator.wildcard_bundle [--root wildcards] [--out data/wildcards.bundle]
+
+import os
+import re
+import sys
+import glob
+import mmap
+import time
+import struct
+import hashlib
+import argparse
+from collections.abc import Sequence
+
+from generator.wildcard_store import WILDCARD_ROOT, CHECK_INTERVAL, parse_wildcard_lines
+from generator.wildcard_weights import LineWeights, weighted_options
+
+BUNDLE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "wildcards.bundle")
+MAGIC = b"WCBUNDLE"
+FORMAT_VERSION = 2
+EXCLUDE = ("super_prompts",)  # templates, not lists
+_CASE_INSENSITIVE = os.path.normcase("A") == "a"
+
+_HEADER = struct.Struct("<8sIIII32s")
+_LIST = struct.Struct("<IIIIi")
+
+
+def _list_files(root):
+    """{name: path} for every list under root, name = relative path without .txt, "/"-separated."""
+    files = {}
+    top = True
+    for dirpath, dirnames, filenames in os.walk(root):
+        if top:
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDE]
+            top = False
+        for f in filenames:
+            if f.endswith(".txt"):
+                path = os.path.join(dirpath, f)
+                name = os.path.relpath(path, root)[:-4].replace(os.sep, "/")
+                files[name] = path
+    return files
+
+
+def tree_signature(root, files=None):
+    """sha256 over (name, mtime, size) of every list; changes whenever a .txt file is added, removed or edited."""
+    files = _list_files(root) if files is None else files
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        try:
+            st = os.stat(files[name])
+        except OSError:
+            continue
+        digest.update(f"{name}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+    return digest.digest()
+
+
+def build_bundle(root=WILDCARD_ROOT, out_path=BUNDLE_PATH):
+    """Pack the tree at `root` into `out_path`. Returns (lists, lines)."""
+    files = _list_files(root)
+    signature = tree_signature(root, files)
+
+    names = sorted(files)
+    heap = bytearray()
+    name_spans = []
+    for name in names:  # names first, so lines are contiguous and line i ends where line i + 1 starts
+        encoded = name.encode("utf-8")
+        name_spans.append((len(heap), len(encoded)))
+        heap += encoded
+
+    lists = []
+    offsets = []
+    weights = []
+    for name, (name_start, name_len) in zip(names, name_spans):
+        with open(files[name], "r", encoding="utf-8") as f:
+            lines = weighted_options(parse_wildcard_lines(f))
+        sampler = getattr(lines, "sampler", None)
+        lists.append((name_start, name_len, len(offsets), len(lines), len(weights) if sampler else -1))
+        if sampler:
+            weights.extend(sampler.weights)
+        for line in lines:
+            offsets.append(len(heap))
+            heap += line.encode("utf-8")
+    offsets.append(len(heap))
+    n_lines = len(offsets) - 1
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"  # workers may build the same version at the same time
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(lists), n_lines, len(weights), signature))
+        for entry in lists:
+            f.write(_LIST.pack(*entry))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        f.write(struct.pack(f"<{len(weights)}d", *weights))
+        f.write(heap)
+    try:
+        os.replace(tmp_path, out_path)
+    except OSError:
+        if not os.path.exists(out_path):
+            raise
+        os.remove(tmp_path)  # another process built it first and may have it mapped (Windows)
+    return len(lists), n_lines
+
+
+def versioned_path(path, signature):
+    """Bundle file for one tree signature: data/wildcards.bundle -> data/wildcards.<signature>.bundle."""
+    base, ext = os.path.splitext(path)
+    return f"{base}.{signature.hex()[:16]}{ext}"
+
+
+def _remove_stale(path, keep):
+    """Delete older versions of `path`; one still mapped somewhere (Windows) is left for a later rebuild."""
+    base, ext = os.path.splitext(path)
+    for old in glob.glob(f"{glob.escape(base)}.*{ext}"):
+        version = old[len(base) + 1:len(old) - len(ext)]
+        if re.fullmatch(r"[0-9a-f]{16}", version) and os.path.abspath(old) != os.path.abspath(keep):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+class BundleList(Sequence):
+    """One wildcard list inside a bundle; lines are decoded on access. Works with rng.choice/rng.sample."""
+    __slots__ = ("_bundle", "_first", "_count")
+
+    def __init__(self, bundle, first, count):
+        self._bundle = bundle
+        self._first = first
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("wildcard line index out of range")
+        return self._bundle.line(self._first + i)
+
+
+class WeightedBundleList(BundleList):
+    """A list with line weights; its alias table is built on first draw."""
+    __slots__ = ("_first_weight", "_sampler")
+
+    def __init__(self, bundle, first, count, first_weight):
+        super().__init__(bundle, first, count)
+        self._first_weight = first_weight
+        self._sampler = None
+
+    @property
+    def sampler(self):
+        if self._sampler is None:
+            self._sampler = LineWeights(self._bundle.weights(self._first_weight, self._count))
+        return self._sampler
+
+
+class WildcardBundle:
+    def __init__(self, path=BUNDLE_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_lists, n_lines, n_weights, self.signature = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} wildcard bundle")
+
+        pos = _HEADER.size
+        list_table = memoryview(self._mm)[pos:pos + n_lists * _LIST.size]
+        pos += n_lists * _LIST.size
+        self._offsets = memoryview(self._mm)[pos:pos + (n_lines + 1) * 8].cast("Q")
+        pos += (n_lines + 1) * 8
+        self._weights = memoryview(self._mm)[pos:pos + n_weights * 8].cast("d")
+        self._heap_start = pos + n_weights * 8
+
+        self.lists = {}
+        for name_start, name_len, first, count, first_weight in _LIST.iter_unpack(list_table):
+            start = self._heap_start + name_start
+            name = self._mm[start:start + name_len].decode("utf-8")
+            if first_weight < 0:
+                self.lists[name] = BundleList(self, first, count)
+            else:
+                self.lists[name] = WeightedBundleList(self, first, count, first_weight)
+        list_table.release()
+        # Case-insensitive filesystems find "^^Creatures^^" in creatures.txt
+        self._folded = {name.lower(): lines for name, lines in self.lists.items()}
+        self.n_lines = n_lines
+
+    def line(self, i):
+        start = self._heap_start + self._offsets[i]
+        end = self._heap_start + self._offsets[i + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def weights(self, first, count):
+        return self._weights[first:first + count].tolist()
+
+    def get(self, name):
+        """Lines of list `name` ("fantasy/creatures", "loras/flux/artist"), or None."""
+        lines = self.lists.get(name)
+        if lines is None and _CASE_INSENSITIVE:
+            lines = self._folded.get(name.lower())
+        return lines
+
+    def close(self):
+        """Unmap the file now; lists taken from the bundle stop working."""
+        self.lists = self._folded = {}
+        self._offsets.release()
+        self._weights.release()
+        self._mm.close()
+
+
+class BundleStore:
+    """
+    Drop-in for WildcardStore (pass as `store=` to resolve_prompt, generate_prompt...) serving lists
+    from a bundle. The tree is re-checked every `check_interval` seconds and a new bundle built
+    (see versioned_path) when a .txt file changed. `path` is the base name of the bundle files.
+    """
+
+    def __init__(self, root=WILDCARD_ROOT, path=BUNDLE_PATH, check_interval=CHECK_INTERVAL):
+        self.root = root
+        self.path = path
+        self.check_interval = check_interval
+        self._bundle = None
+        self._checked_at = None
+        self._root_abs = os.path.abspath(root)
+        self.rebuilds = 0
+
+    def bundle(self):
+        now = time.monotonic()
+        if self._bundle is not None and now - self._checked_at < self.check_interval:
+            return self._bundle
+
+        signature = tree_signature(self.root)
+        if self._bundle is None or self._bundle.signature != signature:
+            path = versioned_path(self.path, signature)
+            bundle = None
+            if os.path.exists(path):
+                try:
+                    bundle = WildcardBundle(path)
+                except (OSError, ValueError, struct.error) as e:
+                    print(f"[⚠️ BUNDLE] Could not open {path}, rebuilding: {e}")
+            if bundle is None:
+                build_bundle(self.root, path)
+                bundle = WildcardBundle(path)
+                self.rebuilds += 1
+                _remove_stale(self.path, keep=path)
+            # The old bundle isn't closed: a batch's lookup may still hold lists from it
+            self._bundle = bundle
+        self._checked_at = now
+        return self._bundle
+
+    def lookup(self, name, genre="fantasy"):
+        """Same resolution as WildcardStore.lookup: genre list, then common, or a path relative to root."""
+        bundle = self.bundle()
+        if "/" in name:
+            return bundle.get(name)
+        options = bundle.get(f"{genre}/{name}")
+        return options if options is not None else bundle.get(f"common/{name}")
+
+    def options(self, path):
+        """Lines of the list file at `path` (under root), or None."""
+        rel = os.path.relpath(os.path.abspath(path), self._root_abs)
+        if not rel.endswith(".txt") or rel.startswith(".."):
+            return None
+        return self.bundle().get(rel[:-4].replace(os.sep, "/"))
+
+    def current_path(self):
+        """File of the bundle currently served (after re-checking the tree)."""
+        return self.bundle().path
+
+    def invalidate(self, path=None):
+        """Re-check the tree (and rebuild if needed) on next use."""
+        self._checked_at = float("-inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the wildcard .txt files into one mmap-able bundle.")
+    parser.add_argument("--root", default=WILDCARD_ROOT)
+    parser.add_argument("--out", default=BUNDLE_PATH, help="base name; the file gets the tree signature added")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = BundleStore(args.root, args.out)
+    bundle = store.bundle()
+    size_kb = os.path.getsize(bundle.path) / 1024
+    state = "built" if store.rebuilds else "up to date"
+    print(f"[📦] {len(bundle.lists)} lists, {bundle.n_lines} lines -> {bundle.path} ({size_kb:.0f} KB), "
+          f"{state} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+# Dependency graph of super prompts and wildcard files.
+# resolve_prompt only finds out about a missing file when it draws it, and writes [MISSING:name]
+# into a prompt that then goes to Forge; a file that (indirectly) references itself just recurses
+# until max_depth and leaves raw ^^name^^ text behind. The graph follows every ^^name^^ and
+# {{lora::path}} reference from a template through the files it reaches, for one genre (names
+# resolve to the genre folder first, then common/), so both problems are reported before a batch
+# starts. Reading the files to build it is also the prefetch: afterwards every file the template
+# can draw from is in the store's memory.
+#
+# A file referenced both ways ({{lora::path}} and ^^name^^) is one node: its lines count as
+# activations for the lora block, and are followed for references because of the ^^name^^.
+#
+# A name built from pipes (^^{creatures|monsters}^^) is followed for every option. References that
+# only exist after a pipe is resolved (a pipe option holding half of a ^^...^^) can't be seen here.
+#
+# Usage: python -m generator.wildcard_graph [template ...] --genre fantasy
+
+import os
+import sys
+import argparse
+from itertools import product
+
+from generator.wildcard_store import WILDCARD_ROOT, WILDCARD_STORE
+from generator.wildcard_loader import WILDCARD_PATTERN, PIPE_PATTERN, LORA_BLOCK_PATTERN
+
+SUPER_PROMPT_DIR = os.path.join(WILDCARD_ROOT, "super_prompts")
+MAX_NAME_VARIANTS = 256  # pipe combinations followed for one ^^name^^
+
+
+def _name_variants(name):
+    """Every name ^^name^^ can resolve to once its pipes are picked, or None if there are too many."""
+    parts = PIPE_PATTERN.split(name)  # literal, options, literal, options, ...
+    if len(parts) == 1:
+        return [name]
+    choices = [[p] if i % 2 == 0 else [o.strip() for o in p.split("|")] for i, p in enumerate(parts)]
+    total = 1
+    for c in choices:
+        total *= len(c)
+    if total > MAX_NAME_VARIANTS:
+        return None
+    return sorted({"".join(combo) for combo in product(*choices)})
+
+
+def references(text):
+    """(wildcard names, lora paths, names with too many pipe variants) referenced in `text`."""
+    names, loras, dynamic = set(), set(), set()
+    for _, inner in WILDCARD_PATTERN.findall(text):
+        variants = _name_variants(inner)
+        if variants is None:
+            dynamic.add(inner)
+        else:
+            names.update(variants)
+    for block in LORA_BLOCK_PATTERN.findall(text):
+        path = block.split("::")[0].strip()
+        if path:
+            loras.add(path)
+    return names, loras, dynamic
+
+
+class WildcardGraph:
+    """
+    Files reachable from the templates added with add_template(), for one genre. Nodes are paths
+    relative to the wildcards root without .txt ("fantasy/creatures", "super_prompts/portrait").
+    """
+
+    def __init__(self, genre="fantasy", store=WILDCARD_STORE):
+        self.genre = genre
+        self.store = store
+        self.edges = {}  # node -> set of nodes it references, for every node followed so far
+        self.kinds = {}  # node -> {"wildcard", "lora"}, how it is referenced
+        self.missing = {}  # node -> set of names that resolve to no file
+        self.dynamic = {}  # node -> set of names not followed (see MAX_NAME_VARIANTS)
+        self.roots = []
+
+    def _path(self, node):
+        return os.path.join(self.store.root, *node.split("/")) + ".txt"
+
+    def _resolve(self, name):
+        """Node of wildcard `name` as store.lookup(name, genre) resolves it, or None."""
+        if "/" in name:
+            candidates = (name,)
+        else:
+            candidates = (f"{self.genre}/{name}", f"common/{name}")
+        for node in candidates:
+            if self.store.options(self._path(node)) is not None:
+                return node
+        return None
+
+    def add_template(self, name, text):
+        """Add a super prompt (its text, {genre} already filled in) and everything it reaches. Returns its node."""
+        node = f"super_prompts/{name[:-4] if name.endswith('.txt') else name}"
+        self.roots.append(node)
+        self._add(node, [text])
+        return node
+
+    def _add(self, node, lines):
+        queue = [(node, lines)]
+        while queue:
+            node, lines = queue.pop()
+            if node in self.edges:
+                continue
+            names, loras, dynamic = set(), set(), set()
+            for line in lines:
+                n, l, d = references(line)
+                names |= n
+                loras |= l
+                dynamic |= d
+
+            edges = self.edges[node] = set()
+            for name in sorted(names):
+                target = self._resolve(name)
+                if target is None:
+                    self.missing.setdefault(node, set()).add(name)
+                    continue
+                edges.add(target)
+                self.kinds.setdefault(target, set()).add("wildcard")
+                if target not in self.edges:
+                    queue.append((target, self.store.options(self._path(target))))
+            for path in sorted(loras):
+                target = path.replace("\\", "/")
+                if self.store.options(self._path(target)) is None:
+                    self.missing.setdefault(node, set()).add(f"lora::{path}")
+                    continue
+                edges.add(target)
+                # Activations, not followed further; a ^^name^^ reference to the same file still
+                # follows it, so it isn't marked as done here
+                self.kinds.setdefault(target, set()).add("lora")
+            if dynamic:
+                self.dynamic[node] = dynamic
+
+    def reachable(self, root=None):
+        """Nodes reachable from `root` (default: every template), templates included."""
+        stack = [root] if root is not None else list(self.roots)
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                stack.extend(self.edges.get(node, ()))
+        return seen
+
+    def files(self, root=None):
+        """Paths of the wildcard (and lora) files a template can draw from."""
+        return sorted(self._path(n) for n in self.reachable(root) if not n.startswith("super_prompts/"))
+
+    def cycles(self, root=None):
+        """Reference cycles as node lists ([a, b, a]), one per back edge found by a depth-first walk."""
+        found = []
+        state = {}  # node -> 1 on the current path, 2 done
+        for start in ([root] if root is not None else self.roots):
+            if state.get(start):
+                continue
+            path = [start]
+            stack = [iter(sorted(self.edges.get(start, ())))]
+            state[start] = 1
+            while stack:
+                target = next(stack[-1], None)
+                if target is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                elif state.get(target) == 1:
+                    found.append(path[path.index(target):] + [target])
+                elif not state.get(target):
+                    state[target] = 1
+                    path.append(target)
+                    stack.append(iter(sorted(self.edges.get(target, ()))))
+        return found
+
+    def problems(self, root=None):
+        """Human-readable warnings for what `root` (default: every template) reaches."""
+        nodes = self.reachable(root)
+        messages = []
+        for node in sorted(nodes & self.missing.keys()):
+            names = (n if n.startswith("lora::") else f"^^{n}^^" for n in sorted(self.missing[node]))
+            messages.append(f"{node}: missing {', '.join(names)}")
+        for cycle in self.cycles(root):
+            messages.append(f"cycle: {' → '.join(cycle)}")
+        for node in sorted(nodes & self.dynamic.keys()):
+            messages.append(f"{node}: not checked (too many pipe variants) {', '.join(sorted(self.dynamic[node]))}")
+        return messages
+
+    def prefetch(self, root=None):
+        """Load every file `root` reaches into the store (a no-op for files still in memory). Returns the count."""
+        files = self.files(root)
+        for path in files:
+            self.store.options(path)
+        return len(files)
+
+
+def template_graph(text, genre="fantasy", name="template", store=WILDCARD_STORE):
+    """Graph of one template; building it loads every file the template reaches into `store`."""
+    graph = WildcardGraph(genre, store)
+    graph.add_template(name, text)
+    return graph
+
+
+def super_prompt_graph(genre="fantasy", store=WILDCARD_STORE, folder=SUPER_PROMPT_DIR):
+    """Graph of every .txt super prompt in `folder`, with {genre} filled in."""
+    graph = WildcardGraph(genre, store)
+    for f in sorted(os.listdir(folder)):
+        if f.endswith(".txt"):
+            with open(os.path.join(folder, f), "r", encoding="utf-8") as fh:
+                graph.add_template(f, fh.read().replace("{genre}", genre))
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check super prompts for missing wildcard files and reference cycles.")
+    parser.add_argument("templates", nargs="*", help="super prompt files (default: all in wildcards/super_prompts)")
+    parser.add_argument("--genre", action="append", help="genre to check (repeatable, default: fantasy)")
+    args = parser.parse_args()
+
+    failed = False
+    for genre in args.genre or ["fantasy"]:
+        if args.templates:
+            graph = WildcardGraph(genre)
+            for name in args.templates:
+                path = name if os.path.isfile(name) else os.path.join(SUPER_PROMPT_DIR, name)
+                with open(path, "r", encoding="utf-8") as f:
+                    graph.add_template(os.path.basename(path), f.read().replace("{genre}", genre))
+        else:
+            graph = super_prompt_graph(genre)
+        problems = graph.problems()
+        print(f"[🕸️ {genre}] {len(graph.roots)} templates, {len(graph.files())} files, {len(problems)} problems")
+        for message in problems:
+            print(f"  [⚠️] {message}")
+        failed = failed or bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,30 +2,30 @@
 import os
 import random
 import re
-import json
 import yaml
 
-WILDCARD_ROOT = os.path.join(os.path.dirname(__file__), "..", "wildcards")
+from generator.wildcard_store import WILDCARD_ROOT, WILDCARD_STORE, parse_wildcard_lines
+from generator.lora_tag_store import LORA_TAGS
+from generator.wildcard_weights import sample_options, choose_option
 
 WILDCARD_PATTERN = re.compile(r"(\d+\$\$)?\^\^(.+?)\^\^")
 PIPE_PATTERN = re.compile(r"\{(.+?)\}")
 
-LORA_TAGS_PATH = os.path.join(os.path.dirname(__file__), "lora_tags.json")
 LORA_BLOCK_PATTERN = re.compile(r"\{+lora::([^\{\}]+?)\}+")
 
 
 def load_wildcard_file(path):
     with open(path, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        lines = parse_wildcard_lines(f)
     return lines
 
-def resolve_pipes(text):
+def resolve_pipes(text, rng=random):
     def replacer(match):
         options = match.group(1).split("|")
-        return random.choice(options).strip()
+        return rng.choice(options).strip()
     return PIPE_PATTERN.sub(replacer, text)
 
-def resolve_prompt(text, genre="fantasy", max_depth=10, resolve_loras=False):
+def resolve_prompt(text, genre="fantasy", max_depth=10, resolve_loras=False, rng=random, store=WILDCARD_STORE):
     if max_depth <= 0:
         return text  # prevent infinite recursion
 
@@ -38,42 +38,34 @@ def resolve_prompt(text, genre="fantasy", max_depth=10, resolve_loras=False):
             except ValueError:
                 pass
 
-        # Resolve path
-        path_parts = inner.split("/")
-        if len(path_parts) == 1:
-            genre_path = os.path.join(WILDCARD_ROOT, genre, inner + ".txt")
-            common_path = os.path.join(WILDCARD_ROOT, "common", inner + ".txt")
-            file_path = genre_path if os.path.exists(genre_path) else common_path
-        else:
-            file_path = os.path.join(WILDCARD_ROOT, *path_parts) + ".txt"
-
-        if not os.path.exists(file_path):
+        # Resolve path + options (cached, see wildcard_store)
+        options = store.lookup(inner, genre)
+        if options is None:
             return f"[MISSING:{inner}]"
 
-        options = load_wildcard_file(file_path)
-        chosen = random.sample(options, min(weighted, len(options)))
+        chosen = sample_options(rng, options, min(weighted, len(options)))
 
         return ", ".join(
     filter(None, map(str, [
-        resolve_prompt(resolve_pipes(c), genre, max_depth - 1)
+        resolve_prompt(resolve_pipes(c, rng), genre, max_depth - 1, rng=rng, store=store)
         for c in chosen
     ]))
 )
 
     # 1. Pipes
-    result = resolve_pipes(text)
+    result = resolve_pipes(text, rng)
 
     # 2. Wildcards
     result = WILDCARD_PATTERN.sub(wildcard_replacer, result)
 
     # 3. LORA resolution only if allowed
     if resolve_loras:
-        result = resolve_lora_blocks(result)
+        result = resolve_lora_blocks(result, rng=rng, store=store)
 
     return result
 
 
-def resolve_lora_blocks(prompt):
+def resolve_lora_blocks(prompt, rng=random, store=WILDCARD_STORE, tags=LORA_TAGS):
     """
     Process {{lora::path::weight}} blocks in prompts:
     1. Extract the path to a wildcard file
@@ -86,21 +78,18 @@ def resolve_lora_blocks(prompt):
         
         return prompt
 
-    if not os.path.exists(LORA_TAGS_PATH):
+    if not tags.exists():
        
         return prompt
 
-    with open(LORA_TAGS_PATH, "r", encoding="utf-8") as f:
-        tags = json.load(f)
-
     def parse_weight(raw_weight, json_key):
         if raw_weight == "?":
-            return round(random.uniform(0.35, 0.75), 2)
+            return round(rng.uniform(0.35, 0.75), 2)
 
         if "-" in raw_weight:
             try:
                 low, high = map(float, raw_weight.split("-"))
-                return round(random.uniform(low, high), 2)
+                return round(rng.uniform(low, high), 2)
             except:
                 
                 return 0.7
@@ -121,18 +110,16 @@ def resolve_lora_blocks(prompt):
         path = parts[0].strip()
         override_weight = parts[1].strip() if len(parts) == 2 else None
 
-        wildcard_path = os.path.join(WILDCARD_ROOT, path + ".txt")
+        wildcard_path = os.path.join(store.root, path + ".txt")
 
-        if not os.path.exists(wildcard_path):
+        candidates = store.options(wildcard_path)
+        if candidates is None:
             return f"[MISSING:{path}]"
 
-        with open(wildcard_path, "r", encoding="utf-8") as f:
-            candidates = [line.strip() for line in f if line.strip() and not line.startswith("#")]
-
         if not candidates:
             return "[EMPTY_LORA_FILE]"
 
-        activation = random.choice(candidates)
+        activation = choose_option(rng, candidates)
         json_key = path.replace("/", "\\\\") + "\\" + activation
         weight = parse_weight(override_weight, json_key)
 
@@ -0,0 +1,157 @@
+# In-memory cache of parsed wildcard files for wildcard_loader.
+# Each ^^name^^ used to cost two os.path.exists calls plus a full read and split of the .txt file,
+# at every recursion depth, for every prompt in a batch. The store resolves names to paths once,
+# keeps each file's option list in memory and only re-stats a file after `check_interval` seconds
+# to see if it changed (mtime + size), so a whole batch typically runs without touching the disk.
+# Code that writes wildcard files (refresher, cleaner, LORA wildcard sync) calls invalidate().
+
+import os
+import time
+import hashlib
+import threading
+
+from generator.wildcard_weights import weighted_options
+
+WILDCARD_ROOT = os.path.join(os.path.dirname(__file__), "..", "wildcards")
+CHECK_INTERVAL = 2.0  # seconds a cached file or path lookup is trusted before it is re-checked on disk
+
+
+def parse_wildcard_lines(f):
+    """Non-empty, non-comment lines of a wildcard file, stripped."""
+    return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class WildcardStore:
+    def __init__(self, root=WILDCARD_ROOT, check_interval=CHECK_INTERVAL):
+        self.root = root
+        self.check_interval = check_interval
+        self._files = {}  # path -> (signature, options tuple, checked_at)
+        self._paths = {}  # (genre, name) -> (path or None, checked_at)
+        self._digests = {}  # relative path -> (signature, sha256 of the file)
+        self._lock = threading.Lock()
+        self.hits = 0  # served from memory
+        self.misses = 0  # file read and parsed
+        self.stat_calls = 0  # os.stat revalidations
+
+    def _signature(self, path):
+        self.stat_calls += 1
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def resolve_path(self, name, genre="fantasy"):
+        """Path of wildcard `name` ("creatures" -> genre file, else common; "a/b" -> root/a/b), None if missing."""
+        key = (genre, name)
+        now = time.monotonic()
+        cached = self._paths.get(key)
+        if cached and now - cached[1] < self.check_interval:
+            return cached[0]
+
+        path_parts = name.split("/")
+        if len(path_parts) == 1:
+            genre_path = os.path.join(self.root, genre, name + ".txt")
+            common_path = os.path.join(self.root, "common", name + ".txt")
+            candidates = (genre_path, common_path)
+        else:
+            candidates = (os.path.join(self.root, *path_parts) + ".txt",)
+
+        path = next((p for p in candidates if os.path.isfile(p)), None)
+        self._paths[key] = (path, now)
+        return path
+
+    def options(self, path):
+        """Parsed option lines of the file at `path` (a tuple, WeightedOptions if weighted), or None if it doesn't exist."""
+        key = _key(path)
+        now = time.monotonic()
+        cached = self._files.get(key)
+        if cached and now - cached[2] < self.check_interval:
+            self.hits += 1
+            return cached[1]
+
+        signature = self._signature(path)
+        if signature is None:
+            with self._lock:
+                self._files.pop(key, None)
+            return None
+
+        if cached and cached[0] == signature:
+            self.hits += 1
+            with self._lock:
+                self._files[key] = (signature, cached[1], now)
+            return cached[1]
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                options = weighted_options(parse_wildcard_lines(f))
+        except OSError:
+            return None
+        self.misses += 1
+        with self._lock:
+            self._files[key] = (signature, options, now)
+        return options
+
+    def lookup(self, name, genre="fantasy"):
+        """Options for wildcard `name` as resolve_prompt sees it, or None if there's no such file."""
+        path = self.resolve_path(name, genre)
+        return self.options(path) if path else None
+
+    def invalidate(self, path=None):
+        """Forget one file (after it was written) or, with no path, everything."""
+        with self._lock:
+            if path is None:
+                self._files.clear()
+            else:
+                self._files.pop(_key(path), None)
+            # A new or deleted file can change which path a name resolves to
+            self._paths.clear()
+
+    def snapshot(self, exclude=("super_prompts",)):
+        """
+        sha256 over the relative path and content of every wildcard file under root (except `exclude`
+        folders). Only changes when some file's content does; unchanged files aren't re-read.
+        """
+        digest = hashlib.sha256()
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                dirnames[:] = [d for d in dirnames if d not in exclude]
+            files.extend(os.path.join(dirpath, f) for f in filenames if f.endswith(".txt"))
+
+        for path in sorted(files, key=lambda p: os.path.relpath(p, self.root).replace(os.sep, "/")):
+            rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+            signature = self._signature(path)
+            cached = self._digests.get(rel)
+            if cached and cached[0] == signature:
+                file_digest = cached[1]
+            else:
+                try:
+                    with open(path, "rb") as f:
+                        file_digest = hashlib.sha256(f.read()).hexdigest()
+                except OSError:
+                    continue
+                self._digests[rel] = (signature, file_digest)
+            digest.update(f"{rel}\0{file_digest}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "files": len(self._files),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stat_calls": self.stat_calls,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.stat_calls = 0
+
+
+# Shared by wildcard_loader and anything that writes wildcard files
+WILDCARD_STORE = WildcardStore()
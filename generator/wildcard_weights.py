@@ -0,0 +1,123 @@
+# Per-line weights for wildcard files.
+# A line written as `weight::text` ("3::red dragon", "0.5::goblin") is drawn in proportion to its
+# weight instead of uniformly; unweighted lines in the same file count as 1, and `0::text` switches a
+# line off. Before this, the only way to favour an entry was to repeat it.
+#
+# Weights are read when a file is loaded: a file with any weighted line becomes WeightedOptions
+# (the plain texts, plus LineWeights: an alias_sampler.AliasTable built once over them), so a draw
+# is O(1) and one rng.random() call. N$$ picks N distinct lines: draws that hit an already picked
+# line are retried, and if the picked lines hold most of the weight the remaining ones are drawn
+# from a cumulative-weight array instead (O(log n) per draw), which gives the same distribution as
+# removing each pick and renormalizing — without rebuilding the table the way
+# alias_sampler.WeightedSampler.remove() does.
+#
+# Files without weights stay plain tuples and keep using rng.sample/rng.choice, so their prompts
+# don't change for a given seed.
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+
+from generator.alias_sampler import AliasTable
+
+WEIGHT_PATTERN = re.compile(r"^(\d+(?:\.\d*)?|\.\d+)::(.*)$")
+MAX_RETRIES = 16  # rejected alias draws in a row before switching to the cumulative array
+
+
+def split_weight(line):
+    """(weight, text) of a wildcard line; lines without a weight prefix weigh 1."""
+    m = WEIGHT_PATTERN.match(line)
+    if m is None:
+        return 1.0, line
+    return float(m.group(1)), m.group(2).strip()
+
+
+class LineWeights:
+    """Alias table over the line indexes of one file (weights all > 0), plus picks without replacement."""
+    __slots__ = ("weights", "table")
+
+    def __init__(self, weights):
+        self.weights = tuple(weights)
+        self.table = AliasTable(range(len(self.weights)), self.weights)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def draw(self, rng):
+        """One index, P(i) = weights[i] / sum(weights)."""
+        # One random() per draw (AliasTable.draw_index uses two): the fraction of u picks between
+        # column i and its alias, so a given seed keeps giving the same weighted picks.
+        prob, alias = self.table.prob, self.table.alias
+        n = len(prob)
+        u = rng.random() * n
+        i = min(int(u), n - 1)  # random() * n can round up to n
+        return i if u - i < prob[i] else alias[i]
+
+    def sample(self, rng, k):
+        """k distinct indexes, each drawn in proportion to its weight among those not picked yet."""
+        if k == 1:
+            return [self.draw(rng)]
+        picked = []
+        seen = set()
+        retries = 0
+        while len(picked) < k:
+            i = self.draw(rng)
+            if i not in seen:
+                picked.append(i)
+                seen.add(i)
+                retries = 0
+            else:
+                retries += 1
+                if retries >= MAX_RETRIES:
+                    return picked + self._sample_rest(rng, k - len(picked), seen)
+        return picked
+
+    def _sample_rest(self, rng, k, seen):
+        remaining = [i for i in range(len(self.weights)) if i not in seen]
+        picked = []
+        for _ in range(k):
+            cumulative = list(accumulate(self.weights[i] for i in remaining))
+            j = bisect_right(cumulative, rng.random() * cumulative[-1])
+            picked.append(remaining.pop(min(j, len(remaining) - 1)))
+        return picked
+
+
+class WeightedOptions(tuple):
+    """Option texts of a file with weighted lines (weights stripped); `sampler` draws from them."""
+
+    def __new__(cls, texts, weights):
+        options = super().__new__(cls, texts)
+        options.sampler = LineWeights(weights)
+        return options
+
+
+def weighted_options(lines):
+    """Options of a file from its parsed lines: a plain tuple, or WeightedOptions if any line has a weight."""
+    if not any(WEIGHT_PATTERN.match(line) for line in lines):
+        return tuple(lines)
+    texts, weights = [], []
+    for line in lines:
+        weight, text = split_weight(line)
+        if weight > 0 and text:
+            texts.append(text)
+            weights.append(weight)
+    return WeightedOptions(texts, weights) if texts else ()
+
+
+def sample_options(rng, options, k):
+    """k distinct options: rng.sample for plain lists, the sampler for weighted ones."""
+    sampler = getattr(options, "sampler", None)
+    if sampler is None:
+        return rng.sample(options, k)
+    picked = [options[i] for i in sampler.sample(rng, k)]
+    record = getattr(rng, "record", None)  # see unique_prompts.ChoiceRecorder
+    if record is not None:
+        record(tuple(picked))
+    return picked
+
+
+def choose_option(rng, options):
+    """One option; rng.choice for plain lists (same random call as rng.sample(options, 1))."""
+    if getattr(options, "sampler", None) is None:
+        return rng.choice(options)
+    return sample_options(rng, options, 1)[0]
@@ -1,4 +1,3 @@
-import requests
 import base64
 import os
 import json
@@ -6,8 +5,11 @@ from datetime import datetime
 import streamlit as st
 import time
 
+from utils.http_client import client
 
-FORGE_API = "http://127.0.0.1:7860/queue/join"
+
+FORGE_API = "/queue/join"  # paths on the forge client (utils/http_client)
+FORGE_PROGRESS = "/internal/progress"
 FN_INDEX = 465
 SESSION_HASH = "uuhnqx1qqor"  # scrape from UI dynamically later
 
@@ -97,6 +99,7 @@ def send_jobs(jobs, output_dir, ui_config, on_job_progress=None, on_batch_progre
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
 
+    forge = client("forge")  # one keep-alive pool for every job and progress poll
     for idx, job in enumerate(jobs):
         # Respect pause toggle
         while st.session_state.get("batch_paused", False):
@@ -119,7 +122,7 @@ def send_jobs(jobs, output_dir, ui_config, on_job_progress=None, on_batch_progre
             on_batch_progress(idx, len(jobs))
 
         try:
-            res = requests.post(FORGE_API, json=payload)
+            res = forge.post(FORGE_API, json=payload)
             res.raise_for_status()
             data = res.json()
 
@@ -130,10 +133,9 @@ def send_jobs(jobs, output_dir, ui_config, on_job_progress=None, on_batch_progre
                 
             # Track real Forge progress
             if on_job_progress:
-                progress_url = "http://127.0.0.1:7860/internal/progress"
                 for _ in range(60):  # ~30 seconds
                     try:
-                        res = requests.post(progress_url, json={"id": 1})
+                        res = forge.post(FORGE_PROGRESS, json={"id": 1})
                         if res.ok:
                             prog_data = res.json()
                             pct = int(prog_data.get("progress", 0) * 100)
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from utils.http_client import DEFAULTS, ServiceClient, _settings
+
+
+def test_client_applies_settings():
+    c = ServiceClient("lm_studio", "http://127.0.0.1:1234/", connect_timeout=3, read_timeout=45, retries=4)
+    assert c.url("/v1/models") == "http://127.0.0.1:1234/v1/models"
+    assert c.url("v1/models") == "http://127.0.0.1:1234/v1/models"
+    assert c.timeout == (3, 45)
+    for prefix in ("http://", "https://"):
+        retry = c.session.get_adapter(prefix + "example").max_retries
+        assert retry.connect == 4
+        assert retry.read == 0  # a request that reached the server is never resent
+
+
+def test_request_uses_default_timeout(monkeypatch):
+    c = ServiceClient("forge", "http://127.0.0.1:7860", read_timeout=None)
+    seen = {}
+
+    class Response:
+        status_code = 200
+
+    def fake_request(method, url, **kwargs):
+        seen.update(kwargs, method=method, url=url)
+        return Response()
+
+    monkeypatch.setattr(c.session, "request", fake_request)
+    c.post("/sdapi/v1/txt2img", json={})
+    assert seen["url"] == "http://127.0.0.1:7860/sdapi/v1/txt2img"
+    assert seen["timeout"] == (5, None)
+    c.get("/ping", timeout=1)
+    assert seen["timeout"] == 1
+    assert c.stats()["requests"] == 2
+
+
+def test_settings_merge_config(tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text("http:\n  lm_studio:\n    base_url: http://gpu-box:1234\n    read_timeout: 90\n")
+    settings = _settings("lm_studio", str(config))
+    assert settings["base_url"] == "http://gpu-box:1234"
+    assert settings["read_timeout"] == 90
+    assert settings["connect_timeout"] == DEFAULTS["lm_studio"]["connect_timeout"]
+    assert _settings("lm_studio", str(tmp_path / "missing.yaml")) == DEFAULTS["lm_studio"]
+    assert DEFAULTS["lm_studio"]["read_timeout"] == 30
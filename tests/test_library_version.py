@@ -0,0 +1,42 @@
+import os
+
+from generator import model_index
+from generator.lora_watcher import LoraCatalog
+from generator.semantic_index import library_key
+
+
+def _touch(path, size=16):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+
+
+def test_index_version_moves_only_when_entries_change(tmp_path):
+    lora_dir = tmp_path / "loras"
+    lora_dir.mkdir()
+    db = str(tmp_path / "index.db")
+    _touch(lora_dir / "a.safetensors")
+
+    model_index.get_indexed_loras(str(lora_dir), db_path=db)
+    first = model_index.index_version(str(lora_dir), db_path=db)
+    model_index.get_indexed_loras(str(lora_dir), db_path=db)
+    assert model_index.index_version(str(lora_dir), db_path=db) == first  # nothing changed
+
+    _touch(lora_dir / "b.safetensors")
+    model_index.get_indexed_loras(str(lora_dir), db_path=db)
+    assert model_index.index_version(str(lora_dir), db_path=db) == first + 1
+
+
+def test_catalog_version_and_library_key(tmp_path):
+    path = tmp_path / "a.safetensors"
+    _touch(path)
+    catalog = LoraCatalog(str(tmp_path), loras=[], sync_wildcards=False)
+    key = library_key(catalog.version)
+    assert library_key(catalog.version) == key
+
+    catalog.upsert(str(path))
+    assert library_key(catalog.version) != key
+    version = catalog.version
+    catalog.remove(str(tmp_path / "missing.safetensors"))
+    assert catalog.version == version  # nothing removed
+    catalog.remove(str(path))
+    assert catalog.version == version + 1
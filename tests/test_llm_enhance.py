@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("streamlit")
+
+from utils import llm_enhance
+from utils.llm_enhance import LLMCache, cache_key, enhance_prompt_with_llm
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class FakeClient:
+    def __init__(self, models):
+        self.models = models
+        self.gets = 0
+        self.posted = []
+
+    def get(self, path, **kwargs):
+        self.gets += 1
+        return FakeResponse({"data": [{"id": m} for m in self.models]})
+
+    def post(self, path, json=None, **kwargs):
+        self.posted.append(json)
+        return FakeResponse({"choices": [{"text": f"enhanced by {json.get('model', 'default')}"}]})
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    fake = FakeClient(["model-a"])
+    monkeypatch.setattr(llm_enhance, "client", lambda name: fake)
+    monkeypatch.setattr(llm_enhance, "_SERVED_MODEL", {})
+    return fake
+
+
+def test_cache_key_depends_on_model():
+    assert cache_key("p", "fantasy", "text", "model-a") != cache_key("p", "fantasy", "text", "model-b")
+
+
+def test_served_model_keys_the_cache(tmp_path, fake_client):
+    cache = LLMCache(str(tmp_path / "cache.db"), variants=1)
+    enhance_prompt_with_llm("a knight", "fantasy", cache=cache)
+    enhance_prompt_with_llm("a knight", "fantasy", cache=cache)
+    assert fake_client.gets == 1  # asked once per run
+    assert len(fake_client.posted) == 1  # second call served from the cache
+
+    fake_client.models = ["model-b"]
+    llm_enhance._SERVED_MODEL.clear()
+    enhance_prompt_with_llm("a knight", "fantasy", cache=cache)
+    assert len(fake_client.posted) == 2  # another model misses
+
+
+def test_configured_model_is_sent_and_keyed(tmp_path, fake_client):
+    cache = LLMCache(str(tmp_path / "cache.db"), variants=1)
+    assert enhance_prompt_with_llm("a knight", "fantasy", model="model-b", cache=cache) == "enhanced by model-b"
+    assert enhance_prompt_with_llm("a knight", "fantasy", model="model-c", cache=cache) == "enhanced by model-c"
+    assert fake_client.gets == 0
+    assert [p["model"] for p in fake_client.posted] == ["model-b", "model-c"]
+
+
+class NoCache:
+    def get(self, key, rng=None):
+        raise AssertionError("cache read without a model")
+
+    def put(self, key, output, latency):
+        raise AssertionError("cache write without a model")
+
+
+def test_unknown_model_skips_the_cache(fake_client):
+    fake_client.models = []  # LM Studio running with nothing loaded
+    assert enhance_prompt_with_llm("a knight", "fantasy", cache=NoCache()) == "enhanced by default"
+    assert enhance_prompt_with_llm("a knight", "fantasy", cache=NoCache()) == "enhanced by default"
+    assert fake_client.gets == 2  # an empty reply isn't remembered
+
+    fake_client.models = ["model-a"]
+    assert llm_enhance.served_model() == "model-a"
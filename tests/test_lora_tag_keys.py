@@ -0,0 +1,26 @@
+import pytest
+
+from generator.tag_index import TagIndex
+from generator.lora_matrix import LoraTagMatrix
+
+TAGS = {
+    "Flux/Artist Styles/ink": {"style": ["ink wash"], "genre": ["fantasy"]},
+    "Flux\\\\Concepts\\\\armor": {"subject": ["plate armor"]},
+}
+
+
+@pytest.mark.parametrize("name", ["Flux/Artist Styles/ink", "Flux\\Artist Styles\\ink"])
+def test_tag_index_finds_keys_written_with_other_separators(name):
+    index = TagIndex(TAGS)
+    count, matched = index.score({"name": name}, ["ink", "fantasy"])
+    assert (count, sorted(matched)) == (2, ["fantasy", "ink"])
+    assert index.score({"name": "Flux/Concepts/armor"}, {"armor"})[0] == 1
+
+
+def test_tag_matrix_finds_keys_written_with_other_separators():
+    matrix = LoraTagMatrix(TAGS)
+    assert sorted(matrix.keys) == ["Flux\\Artist Styles\\ink", "Flux\\Concepts\\armor"]
+    scores = matrix.score_matrix([{"armor"}, {"ink"}])[0]
+    armor = matrix.keys.index(LoraTagMatrix.key_for({"name": "Flux/Concepts/armor"}))
+    ink = matrix.keys.index(LoraTagMatrix.key_for({"name": "Flux/Artist Styles/ink"}))
+    assert scores[0][armor] == 1 and scores[1][ink] == 1
@@ -0,0 +1,13 @@
+import pytest
+
+from generator.safetensors_header import trigger_words_from_metadata
+
+
+def test_trigger_words_by_frequency():
+    metadata = {"ss_tag_frequency": '{"set": {"knight": 5, " armor ": 9}, "other": {"knight": 7}}'}
+    assert trigger_words_from_metadata(metadata) == ["knight", "armor"]
+
+
+@pytest.mark.parametrize("raw", ["null", "[1, 2]", '"text"', "42", "{broken", '{"set": null, "b": ["x"]}'])
+def test_malformed_tag_frequency(raw):
+    assert trigger_words_from_metadata({"ss_tag_frequency": raw}) == []
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from generator.wildcard_store import WildcardStore
+from generator.prompt_template import SeededPrompts
+from generator.unique_prompts import TemplateSpace, unique_prompts
+
+
+@pytest.fixture
+def store(tmp_path):
+    os.makedirs(tmp_path / "common")
+    (tmp_path / "common" / "color.txt").write_text("red\nred\nred\nblue\n", encoding="utf-8")
+    (tmp_path / "common" / "size.txt").write_text("big\nsmall\nbig\n", encoding="utf-8")
+    return WildcardStore(str(tmp_path))
+
+
+def test_repeated_lines_are_counted_once(store):
+    source = SeededPrompts("a ^^color^^ cat", store=store, snapshot="test")
+    space = TemplateSpace(source.template.text, lookup=source.template.lookup())
+    assert space.size == 2
+
+    prompts, info = unique_prompts(source, 4)
+    assert sorted(p for p, _ in prompts) == ["a blue cat", "a red cat"]
+    assert info["mode"] == "enumerated"
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 10])
+def test_no_prompt_text_is_handed_out_twice(store, count):
+    source = SeededPrompts("a ^^size^^ ^^color^^ cat", store=store, seed=count, snapshot="test")
+    prompts, info = unique_prompts(source, count)
+    texts = [p for p, _ in prompts]
+    assert len(texts) == len(set(texts)) == min(count, 4)
+
+
+def test_rejection_mode_skips_repeated_texts(store):
+    source = SeededPrompts("a ^^color^^ cat", store=store, snapshot="test")
+    prompts, info = unique_prompts(source, 2, enumerate_fraction=1e9)  # never enumerate
+    texts = [p for p, _ in prompts]
+    assert info["mode"] == "rejection" and len(texts) == len(set(texts))
@@ -0,0 +1,40 @@
+import os
+import random
+
+from generator.wildcard_bundle import BundleStore
+from generator.prompt_template import PromptTemplate
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_lists_held_by_a_batch_survive_a_rebuild(tmp_path):
+    root = tmp_path / "wildcards"
+    write(str(root / "common" / "color.txt"), "red\nblue\n")
+    store = BundleStore(str(root), str(tmp_path / "wildcards.bundle"), check_interval=0)
+    template = PromptTemplate("a ^^color^^ cat", store=store)
+    lookup = template.lookup()
+    assert template.generate(random.Random(1), lookup=lookup) in ("a red cat", "a blue cat")
+    first = store.current_path()
+
+    write(str(root / "common" / "color.txt"), "green\nyellow\nviolet\n")
+    assert store.current_path() != first
+    assert store.rebuilds == 2
+
+    # The batch's lookup still holds lists from the first bundle
+    rng = random.Random(2)
+    assert {template.generate(rng, lookup=lookup) for _ in range(20)} <= {"a red cat", "a blue cat"}
+    assert template.generate(rng) in ("a green cat", "a yellow cat", "a violet cat")
+
+
+def test_unchanged_tree_reuses_the_bundle_file(tmp_path):
+    root = tmp_path / "wildcards"
+    write(str(root / "common" / "color.txt"), "red\n")
+    base = str(tmp_path / "wildcards.bundle")
+    path = BundleStore(str(root), base).current_path()
+    store = BundleStore(str(root), base)
+    assert store.current_path() == path and store.rebuilds == 0
+    assert [f for f in os.listdir(tmp_path) if f.endswith(".bundle")] == [os.path.basename(path)]
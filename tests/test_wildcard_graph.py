@@ -0,0 +1,27 @@
+from generator.wildcard_graph import template_graph
+from generator.wildcard_store import WildcardStore
+
+
+def _write(root, rel, text):
+    path = root.joinpath(*rel.split("/")).with_suffix(".txt")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def test_file_referenced_as_lora_and_wildcard_is_followed(tmp_path):
+    _write(tmp_path, "common/styles", "ink ^^styles_extra^^")
+    _write(tmp_path, "common/styles_extra", "^^missing_thing^^")
+    store = WildcardStore(str(tmp_path))
+    # Reached as lora:: first, then as ^^name^^: the wildcard references must still be followed
+    graph = template_graph("{lora::common/styles} ^^common/styles^^", store=store)
+    assert graph.kinds["common/styles"] == {"lora", "wildcard"}
+    assert "common/styles_extra" in graph.reachable()
+    assert graph.problems() == ["common/styles_extra: missing ^^missing_thing^^"]
+
+
+def test_mixed_reference_cycle_is_reported(tmp_path):
+    _write(tmp_path, "common/a", "^^b^^")
+    _write(tmp_path, "common/b", "^^common/a^^")
+    store = WildcardStore(str(tmp_path))
+    graph = template_graph("{lora::common/a} ^^a^^", store=store)
+    assert graph.cycles() == [["common/a", "common/b", "common/a"]]
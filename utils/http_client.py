@@ -0,0 +1,117 @@
+# Shared HTTP clients for the local services (LM Studio, Forge).
+# Every call site used to do its own requests.post with a hard-coded URL and timeout, which opens a
+# new TCP connection per request. Here each endpoint gets one requests.Session with a keep-alive
+# connection pool, so a batch reuses its connections, and base URL, timeouts and retries come from
+# the `http:` section of config.yaml (defaults below if it's missing):
+#
+#   http:
+#     lm_studio: {base_url: "http://127.0.0.1:1234", connect_timeout: 5, read_timeout: 30, retries: 2, pool_size: 8}
+#     forge: {base_url: "http://127.0.0.1:7860", read_timeout: null}
+#
+# read_timeout 30 is what prompt enhancement always used; the LORA tagger and the wildcard cleaner
+# wait for longer replies and pass their own timeout=60 as before.
+#
+# Retries only cover failed connections (and 502/503/504 on GET): a POST that reached the server
+# is never resent, so Forge can't queue a job twice. Each client counts requests, errors and
+# latency for the sidebar.
+
+import os
+import time
+import threading
+
+import yaml
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "config.yaml")
+
+DEFAULTS = {
+    "lm_studio": {"base_url": "http://127.0.0.1:1234", "connect_timeout": 5, "read_timeout": 30,
+                  "retries": 2, "backoff": 0.5, "pool_size": 8},
+    "forge": {"base_url": "http://127.0.0.1:7860", "connect_timeout": 5, "read_timeout": None,
+              "retries": 2, "backoff": 0.5, "pool_size": 4},
+}
+
+
+class ServiceClient:
+    """Pooled session for one service; paths are relative to `base_url`."""
+
+    def __init__(self, name, base_url, connect_timeout=5, read_timeout=30, retries=2, backoff=0.5, pool_size=8):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(total=retries, connect=retries, read=0, status=retries, backoff_factor=backoff,
+                      status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.requests += 1
+                self.errors += failed
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": self.total_seconds / self.requests * 1000 if self.requests else 0.0,
+            "max_ms": self.max_seconds * 1000,
+        }
+
+
+_CLIENTS = {}
+_LOCK = threading.Lock()
+
+
+def _settings(name, config_path=CONFIG_PATH):
+    settings = dict(DEFAULTS.get(name, {}))
+    try:
+        with open(config_path, "r") as f:
+            config = yaml.safe_load(f) or {}
+    except OSError:
+        config = {}
+    settings.update((config.get("http") or {}).get(name) or {})
+    return settings
+
+
+def client(name):
+    """The shared ServiceClient for `name` ("lm_studio", "forge"), created on first use."""
+    with _LOCK:
+        if name not in _CLIENTS:
+            _CLIENTS[name] = ServiceClient(name, **_settings(name))
+        return _CLIENTS[name]
+
+
+def http_stats():
+    """{name: stats} of every client created so far."""
+    with _LOCK:
+        clients = dict(_CLIENTS)
+    return {name: c.stats() for name, c in clients.items()}
@@ -3,13 +3,188 @@
 # The enhancement is done by sending a request to the LLM server with a specific prompt format.
 # The script is designed to be used in a Streamlit application, and is intended for use in a local environment where the LLM server is running.
 # The script also includes a function to randomly load flair addons from a text file.
+#
+# enhance_prompts_with_llm() enhances a whole batch at once, `max_workers` requests in flight (match it
+# to the number of parallel slots LM Studio is serving). Results come back in input order; a prompt
+# whose requests all fail falls back to its raw text without holding up the others. Streamlit calls
+# only work on the script thread, so the workers collect their warnings and the caller shows them.
+#
+# Enhancements are cached in SQLite (data/llm_cache.db), keyed by a hash of the raw prompt, genre,
+# the full instruction text, model and temperature (rounded to 0.1). The model is `llm.model` from
+# config.yaml when it's set (it's also sent with the request), otherwise whatever LM Studio reports
+# on GET /v1/models, asked once per run; switching models then misses the cache instead of serving
+# another model's outputs. While neither names a model (nothing loaded, no reply) the cache is
+# neither read nor written. Each key keeps up to CACHE_VARIANTS outputs: until it has them all, the
+# LLM is still called and the output added; after that a stored variant is picked at random, so
+# repeated prompts keep some variety. Entries
+# expire after CACHE_TTL_DAYS and the least recently used ones go once there are more than
+# CACHE_MAX_ROWS.
 
+import os
 import re
 import json
+import hashlib
+import sqlite3
+import threading
 import requests
 import streamlit as st
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.http_client import client
+
+LLM_WORKERS = 4  # default concurrent requests for a batch
+
+LLM_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "llm_cache.db")
+CACHE_VARIANTS = 3  # outputs kept per key
+CACHE_TTL_DAYS = 30
+CACHE_MAX_ROWS = 20000
+
+
+def cache_key(prompt, genre, instructions, model=None, temperature=0.9):
+    """Cache key of one enhancement request; `instructions` is the full text sent to the LLM."""
+    material = json.dumps([prompt, genre, instructions, model or "", round(temperature, 1)], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Enhanced prompts by cache_key, several variants per key, with TTL and LRU eviction."""
+
+    def __init__(self, db_path=LLM_CACHE_PATH, variants=CACHE_VARIANTS, ttl_days=CACHE_TTL_DAYS,
+                 max_rows=CACHE_MAX_ROWS):
+        self.db_path = db_path
+        self.variants = variants
+        self.ttl = ttl_days * 86400
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0  # LLM latency of the variants served from the cache
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS enhancements (
+                key TEXT NOT NULL,
+                variant INTEGER NOT NULL,
+                output TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (key, variant)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS enhancements_last_used ON enhancements (last_used)")
+        return conn
+
+    def get(self, key, rng=random):
+        """A stored output for `key` once it has all its variants, else None (call the LLM and put())."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT variant, output, latency FROM enhancements WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl)
+                ).fetchall()
+                if len(rows) < self.variants:
+                    self.misses += 1
+                    return None
+                variant, output, latency = rng.choice(rows)
+                with conn:
+                    conn.execute("UPDATE enhancements SET last_used = ? WHERE key = ? AND variant = ?",
+                                 (now, key, variant))
+            finally:
+                conn.close()
+            self.hits += 1
+            self.saved_seconds += latency
+        return output
+
+    def put(self, key, output, latency):
+        """Store a new variant for `key` (replacing the oldest once there are `variants`) and evict."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    rows = conn.execute(
+                        "SELECT variant, created FROM enhancements WHERE key = ? ORDER BY created", (key,)
+                    ).fetchall()
+                    used = {variant for variant, _ in rows}
+                    free = [v for v in range(self.variants) if v not in used]
+                    variant = free[0] if free else rows[0][0]
+                    conn.execute(
+                        "INSERT OR REPLACE INTO enhancements (key, variant, output, latency, created, last_used) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, variant, output, latency, now, now)
+                    )
+                    self._evict(conn, now)
+            finally:
+                conn.close()
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM enhancements WHERE created < ?", (now - self.ttl,))
+        (rows,) = conn.execute("SELECT COUNT(*) FROM enhancements").fetchone()
+        if rows > self.max_rows:
+            conn.execute(
+                "DELETE FROM enhancements WHERE rowid IN "
+                "(SELECT rowid FROM enhancements ORDER BY last_used LIMIT ?)", (rows - self.max_rows,)
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows, keys = conn.execute("SELECT COUNT(*), COUNT(DISTINCT key) FROM enhancements").fetchone()
+            finally:
+                conn.close()
+        return {
+            "entries": rows,
+            "keys": keys,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM enhancements")
+            finally:
+                conn.close()
+
+
+# Shared by the single and batch enhancement paths
+LLM_CACHE = LLMCache()
+
+_SERVED_MODEL = {}
+_SERVED_LOCK = threading.Lock()
+
+
+def served_model():
+    """
+    Model id(s) LM Studio serves, from GET /v1/models (several ids are joined), or None if it can't
+    tell. Only an id is remembered for the run: an error reply or no model loaded is asked again on
+    the next call.
+    """
+    with _SERVED_LOCK:
+        if "id" not in _SERVED_MODEL:
+            try:
+                response = client("lm_studio").get("/v1/models")
+                response.raise_for_status()
+                ids = sorted({m["id"] for m in response.json().get("data", [])})
+            except (requests.exceptions.RequestException, ValueError, KeyError, TypeError, AttributeError):
+                return None
+            if not ids:
+                return None
+            _SERVED_MODEL["id"] = ",".join(ids)
+        return _SERVED_MODEL["id"]
 
 
 
@@ -22,7 +197,13 @@ import random
 
 # flair = random.choice(load_flair_addons())
 
-def enhance_prompt_with_llm(prompt, genre="", retries=3, base_delay=1.5):
+def enhance_prompt_with_llm(prompt, genre="", retries=3, base_delay=1.5, warn=None, model=None, temperature=0.9,
+                            cache=LLM_CACHE):
+    """
+    Enhanced prompt, or `prompt` itself if every attempt fails. `warn` receives warnings (default: st.warning).
+    `model` is sent to LM Studio and keys the cache (default: served_model(); no model, no cache). Pass cache=None to always ask the LLM.
+    """
+    warn = warn or st.warning
     style_guide = {
         "fantasy": "Describe rich dark fantasy characters in a scene, using poetic language, ancient influences, occult and mystical elements.",
         "sci-fi": "Describe futuristic characters in a scene with advanced tech, cyberpunk imagery, and speculative design.",
@@ -48,29 +229,66 @@ def enhance_prompt_with_llm(prompt, genre="", retries=3, base_delay=1.5):
         return re.sub(r"^(Enhanced Prompt|Extended Prompt|Output|Rewritten Prompt)\s*:\s*", "", text.strip(), flags=re.IGNORECASE)
 
 
+    # Without a known model the output can't be attributed to one, so the cache is skipped
+    key_model = (model or served_model()) if cache is not None else None
+    key = cache_key(prompt, genre, full_prompt, key_model, temperature) if key_model else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
     for attempt in range(1, retries + 1):
         try:
-            response = requests.post(
-                "http://localhost:1234/v1/completions",  # LM Studio uses /completions for raw prompts
-                headers={"Content-Type": "application/json"},
+            started = time.perf_counter()
+            response = client("lm_studio").post(
+                "/v1/completions",  # LM Studio uses /completions for raw prompts
                 json={
                     "prompt": full_prompt,
                     "max_tokens": 600,
-                    "temperature": 0.9,
-                    "stop": ["###"]
+                    "temperature": temperature,
+                    "stop": ["###"],
+                    **({"model": model} if model else {}),
                 },
-                timeout=30
             )
             response.raise_for_status()
             result = response.json()
             raw_output = result["choices"][0]["text"].strip()
             cleaned_output = strip_llm_headers(raw_output)
+            if key is not None and cleaned_output:
+                cache.put(key, cleaned_output, time.perf_counter() - started)
             return cleaned_output
         except requests.exceptions.RequestException as e:
-            st.warning(f"⚠️ GPT enhancement failed (attempt {attempt}): {e}")
+            warn(f"⚠️ GPT enhancement failed (attempt {attempt}): {e}")
             if attempt < retries:
                 wait_time = base_delay * attempt
                 time.sleep(wait_time)
             else:
-                st.warning("⚠️ All GPT enhancement attempts failed. Using raw prompt.")
-                return prompt
\ No newline at end of file
+                warn("⚠️ All GPT enhancement attempts failed. Using raw prompt.")
+                return prompt
+
+
+def enhance_prompts_with_llm(prompts, genre="", max_workers=LLM_WORKERS, retries=3, base_delay=1.5, model=None):
+    """
+    Enhance every prompt in `prompts` with up to `max_workers` requests at a time.
+    Returns (enhanced prompts in the same order, warnings); a failed prompt comes back unchanged.
+    """
+    warnings = []
+
+    def enhance_one(args):
+        i, prompt = args
+
+        def warn(message):
+            warnings.append((i, message))  # list.append is thread-safe
+
+        try:
+            return enhance_prompt_with_llm(prompt, genre, retries, base_delay, warn=warn, model=model)
+        except Exception as e:  # bad response shape etc. — keep the raw prompt
+            warn(f"⚠️ GPT enhancement failed: {e}. Using raw prompt.")
+            return prompt
+
+    prompts = list(prompts)
+    if not prompts:
+        return [], warnings
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as pool:
+        enhanced = list(pool.map(enhance_one, enumerate(prompts)))  # map() keeps input order
+    return enhanced, [f"Prompt {i + 1}: {message}" for i, message in sorted(warnings, key=lambda w: w[0])]
\ No newline at end of file
@@ -8,6 +8,7 @@ import sys
 import glob
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from generator.model_loader import get_available_loras  # ✅ load real lora entries
+from generator.text_analysis import normalize_lora_name
 import yaml
 import re
 import json
@@ -76,19 +77,8 @@ def get_used_lora_identifiers_from_raw_db():
 def get_unused_loras_grouped_by_model_and_category():
     used_ids = get_used_lora_ids_from_raw_db()  # Get activation names used
     
-    # Add normalization to the matching function
-    def normalize_for_matching(name):
-        """Normalize names for better matching between DB and filesystem"""
-        if not name:
-            return ""
-        # Remove common prefixes/suffixes, standardize separators
-        name = name.lower().strip()
-        name = re.sub(r'[_\-\s]+', '_', name)  # Standardize separators
-        name = re.sub(r'_+flux.*?(_lora.*?)?$', '', name)  # Remove model suffixes
-        return name
-    
     # Normalize all used IDs
-    normalized_used_ids = {normalize_for_matching(id) for id in used_ids}
+    normalized_used_ids = {normalize_lora_name(id) for id in used_ids}
     
     all_loras = get_available_loras(LORA_DIR)
     grouped = {}
@@ -108,14 +98,14 @@ def get_unused_loras_grouped_by_model_and_category():
         filename = os.path.basename(lora_path)
         
         # Normalize for better matching
-        norm_filename = normalize_for_matching(filename)
-        norm_activation = normalize_for_matching(activation)
+        norm_filename = normalize_lora_name(filename)
+        norm_activation = normalize_lora_name(activation)
         
         # Also try with common variations
         aliases = [
             norm_filename,
             norm_activation,
-            normalize_for_matching(filename.replace("_", " ")),  # Some users may add spaces instead of underscores
+            normalize_lora_name(filename.replace("_", " ")),  # Some users may add spaces instead of underscores
             # Add any other common variations
         ]
         
@@ -6,6 +6,9 @@ import streamlit as st
 import tiktoken  # optional, for accurate token count (or use estimate)
 import re
 from utils.wildcard_clean_prompts import wildcard_cleanup_templates
+from utils.http_client import client
+
+LLM_TIMEOUT = 60  # seconds; a cleanup reply runs up to 2000 tokens, longer than the client's default read timeout
 
 
 
@@ -136,15 +139,14 @@ def clean_wildcards_with_llm(entries, genre, category, retries=3, base_delay=1.5
 
     for attempt in range(1, retries + 1):
         try:
-            response = requests.post(
-                "http://localhost:1234/v1/completions",
-                headers={"Content-Type": "application/json"},
+            response = client("lm_studio").post(
+                "/v1/completions",
                 json={
                     "prompt": prompt,
                     "max_tokens": 2000,
                     "temperature": 0.9
                 },
-                timeout=60
+                timeout=LLM_TIMEOUT,
             )
             response.raise_for_status()
             result = response.json()
@@ -3,6 +3,8 @@ import anthropic
 import os
 import streamlit as st
 
+from generator.wildcard_weights import split_weight
+
 
 def refresh_wildcards_claude(api_key, genre, category, wildcard_dir, n_entries=15):
     client = anthropic.Anthropic(api_key=api_key)
@@ -31,7 +33,7 @@ def refresh_wildcards_claude(api_key, genre, category, wildcard_dir, n_entries=1
     # Load existing entries
     if os.path.exists(category_file):
         with open(category_file, "r", encoding="utf-8") as f:
-            existing = set(line.strip() for line in f if line.strip())
+            existing = set(split_weight(line.strip())[1] for line in f if line.strip())  # "3::x" is x
     else:
         existing = set()
 
@@ -75,7 +77,7 @@ def refresh_wildcards_openai(api_key, genre, category, wildcard_dir, n_entries=1
     # Load existing entries
     if os.path.exists(category_file):
         with open(category_file, "r", encoding="utf-8") as f:
-            existing = set(line.strip() for line in f if line.strip())
+            existing = set(split_weight(line.strip())[1] for line in f if line.strip())  # "3::x" is x
     else:
         existing = set()
 